@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Linux App Cleaner - Benchmarks
+Erzeugt synthetische Home- und System-Verzeichnisse sowie Fake-Paketmanager
+(dpkg-query, flatpak, snap, pip, npm) und misst die wichtigsten Abläufe.
+Ergebnisse landen als JSON und können mit einem früheren Lauf verglichen werden.
+
+Beispiele:
+    python benchmark_app_cleaner.py --size small -o results.json
+    python benchmark_app_cleaner.py --size medium --compare results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+
+# Vordefinierte Größen: Pakete pro Paketmanager, Dateien pro Paket-Ordner, Tiefe
+SIZES = {
+    'small': {'packages': 50, 'files': 10, 'depth': 2},
+    'medium': {'packages': 500, 'files': 20, 'depth': 3},
+    'large': {'packages': 3000, 'files': 30, 'depth': 4},
+}
+
+BENCHMARKS = [
+    'get_all_packages',
+    'find_package_files',
+    'deep_search_files',
+    'dir_size',
+    'filter_packages',
+    'thorough_delete',
+    'package_memory',
+]
+
+# Paket nach dem bei den Such-Benchmarks gesucht wird
+TARGET = 'pkg00007'
+
+# Anzahl Pakete für den Speicher-Vergleich dict vs. PackageRecord
+MEMORY_PACKAGES = 50000
+
+
+def package_name(index):
+    return f"pkg{index:05d}"
+
+
+def write_files(directory, rng, count, depth):
+    """Legt count kleine Dateien verteilt auf depth Ebenen an"""
+    directory.mkdir(parents=True, exist_ok=True)
+    current = directory
+    for index in range(count):
+        if depth > 1 and index % max(1, count // depth) == 0 and index:
+            current = current / f"sub{index}"
+            current.mkdir(exist_ok=True)
+        (current / f"file{index}.dat").write_bytes(b'x' * rng.randint(0, 4096))
+
+
+def generate_tree(base, packages, files, depth, seed=42):
+    """Erzeugt home/ und root/ mit typischen Überresten für alle Pakete"""
+    rng = random.Random(seed)
+    home = base / 'home'
+    root = base / 'root'
+
+    for index in range(packages):
+        name = package_name(index)
+        app_id = f"org.example.{name}"
+
+        write_files(home / '.config' / name, rng, files, depth)
+        write_files(home / '.cache' / name, rng, files, depth)
+        write_files(home / '.local' / 'share' / name, rng, files // 2, depth)
+        write_files(home / '.var' / 'app' / app_id / 'cache', rng, files // 2, depth)
+
+        if index % 5 == 0:
+            (home / f'.{name}rc').write_text('# config\n')
+
+        applications = home / '.local' / 'share' / 'applications'
+        applications.mkdir(parents=True, exist_ok=True)
+        (applications / f"{name}.desktop").write_text(
+            f"[Desktop Entry]\nName={name}\nExec={name}\nIcon={name}\n"
+        )
+
+        system_applications = root / 'usr' / 'share' / 'applications'
+        system_applications.mkdir(parents=True, exist_ok=True)
+        (system_applications / f"{app_id}.desktop").write_text(
+            f"[Desktop Entry]\nName={name}\nExec=/usr/bin/{name}\nIcon={app_id}\n"
+        )
+
+        for size in ('48x48', '128x128', 'scalable'):
+            icon_dir = root / 'usr' / 'share' / 'icons' / 'hicolor' / size / 'apps'
+            icon_dir.mkdir(parents=True, exist_ok=True)
+            (icon_dir / f"{app_id}.png").write_bytes(b'\x89PNG' + b'\0' * 64)
+
+        write_files(root / 'etc' / name, rng, 2, 1)
+        log_dir = root / 'var' / 'log'
+        log_dir.mkdir(parents=True, exist_ok=True)
+        (log_dir / f"{name}.log").write_text('log line\n' * rng.randint(1, 50))
+
+        if index % 10 == 0:
+            downloads = home / 'Downloads'
+            downloads.mkdir(parents=True, exist_ok=True)
+            appimage = downloads / f"{name}.AppImage"
+            appimage.write_bytes(b'\x7fELF\x02\x01\x01\x00AI\x02' + b'\0' * 1024)
+            write_files(root / 'opt' / name, rng, files, depth)
+
+    for directory in ('tmp', 'var/tmp'):
+        (root / directory).mkdir(parents=True, exist_ok=True)
+
+    return home, root
+
+
+def write_stub(bin_dir, name, output_file):
+    """Fake-Programm das nur eine vorbereitete Ausgabe liefert"""
+    stub = bin_dir / name
+    stub.write_text(f"#!/bin/sh\ncat '{output_file}'\n")
+    stub.chmod(0o755)
+
+
+def generate_stubs(base, packages):
+    """Legt dpkg-query, flatpak, snap, pip und npm mit realistischer Ausgabemenge an"""
+    bin_dir = base / 'bin'
+    data_dir = base / 'stub-output'
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    # apt ist auf echten Systemen die größte Liste
+    dpkg_lines = []
+    for index in range(packages * 4):
+        dpkg_lines.append(f"ii \t{package_name(index)}\t1.{index % 10}.{index % 7}-1\t{index % 5000}")
+
+    flatpak_lines = []
+    snap_lines = ["Name  Version  Rev  Tracking  Publisher  Notes"]
+    pip_lines = []
+    npm_lines = ["/usr/lib"]
+    for index in range(packages):
+        name = package_name(index)
+        flatpak_lines.append(f"{name}\torg.example.{name}\t{index % 5}.0")
+        snap_lines.append(f"{name}  {index % 9}.1  {100 + index}  latest/stable  someone  -")
+        pip_lines.append(f"{name}==0.{index}")
+        npm_lines.append(f"/usr/lib/node_modules/{name}:{name}@{index % 3}.0.0:undefined")
+
+    outputs = {
+        'dpkg-query': "\n".join(dpkg_lines) + "\n",
+        'flatpak': "\n".join(flatpak_lines) + "\n",
+        'snap': "\n".join(snap_lines) + "\n",
+        'pip': "\n".join(pip_lines) + "\n",
+        'npm': "\n".join(npm_lines) + "\n",
+    }
+    for name, output in outputs.items():
+        output_file = data_dir / f"{name}.txt"
+        output_file.write_text(output)
+        write_stub(bin_dir, name, output_file)
+
+    return bin_dir
+
+
+def read_proc_io():
+    """read/write-Syscalls des eigenen Prozesses (Linux)"""
+    counters = {}
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                key, value = line.split(':')
+                counters[key] = int(value)
+    except OSError:
+        pass
+    return counters
+
+
+def measure(func):
+    """Misst Laufzeit, CPU-Zeit (user/sys), Syscalls und RSS einer Funktion"""
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    io_before = read_proc_io()
+
+    start = time.perf_counter()
+    func()
+    wall = time.perf_counter() - start
+
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    io_after = read_proc_io()
+
+    return {
+        'wall': wall,
+        'user': usage_after.ru_utime - usage_before.ru_utime,
+        'sys': usage_after.ru_stime - usage_before.ru_stime,
+        'children_cpu': (children_after.ru_utime - children_before.ru_utime
+                         + children_after.ru_stime - children_before.ru_stime),
+        'syscr': io_after.get('syscr', 0) - io_before.get('syscr', 0),
+        'syscw': io_after.get('syscw', 0) - io_before.get('syscw', 0),
+        'major_faults': usage_after.ru_majflt - usage_before.ru_majflt,
+        'context_switches': (usage_after.ru_nvcsw - usage_before.ru_nvcsw
+                             + usage_after.ru_nivcsw - usage_before.ru_nivcsw),
+        'maxrss_kb_before': usage_before.ru_maxrss,
+        'maxrss_kb': usage_after.ru_maxrss,
+    }
+
+
+def run_one(name, tree):
+    """Führt einen einzelnen Benchmark im aktuellen (frischen) Prozess aus"""
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import linux_app_cleaner
+
+    home = tree / 'home'
+    cleaner = linux_app_cleaner.LinuxAppCleaner(home=home, system_root=tree / 'root')
+
+    if name == 'get_all_packages':
+        return measure(cleaner.get_all_packages)
+
+    if name == 'find_package_files':
+        return measure(lambda: cleaner.find_package_files(TARGET))
+
+    if name == 'deep_search_files':
+        return measure(lambda: cleaner.deep_search_files(TARGET))
+
+    if name == 'dir_size':
+        return measure(lambda: linux_app_cleaner._dir_size(str(home)))
+
+    if name == 'filter_packages':
+        packages = cleaner.get_all_packages()
+        fake_gui = SimpleNamespace(
+            packages=packages,
+            filtered_packages=[],
+            search_box=SimpleNamespace(text=lambda: 'pkg000'),
+            source_filter=SimpleNamespace(currentText=lambda: 'Alle'),
+            sort_order=SimpleNamespace(currentIndex=lambda: 0),
+            display_packages=lambda: None,
+        )
+
+        def filter_many():
+            for _ in range(100):
+                linux_app_cleaner.AppCleanerGUI.filter_packages(fake_gui)
+        return measure(filter_many)
+
+    if name == 'thorough_delete':
+        # Löscht echte Dateien - der Baum wird pro Lauf neu kopiert
+        package = linux_app_cleaner.PackageRecord(
+            'pkg00000',
+            version='AppImage',
+            source='appimage',
+            path=str(home / 'Downloads' / 'pkg00000.AppImage'),
+        )
+        result = measure(lambda: cleaner.uninstall_package(package, mode='thorough'))
+        cleaner.audit.sync()
+        return result
+
+    if name == 'package_memory':
+        return measure_package_memory(linux_app_cleaner)
+
+    raise ValueError(f"Unbekannter Benchmark: {name}")
+
+
+def measure_package_memory(linux_app_cleaner):
+    """Speicherbedarf der Paketliste: dict pro Paket (alt) vs. PackageRecord"""
+    sources = ['apt', 'pip', 'npm', 'flatpak', 'snap']
+    lines = [f"{package_name(i)}\t{i % 40}.{i % 7}.0\t{sources[i % 5]}" for i in range(MEMORY_PACKAGES)]
+
+    def build_dicts():
+        packages = []
+        for line in lines:
+            name, version, source = line.split('\t')
+            packages.append({'name': name, 'version': version, 'source': source, 'protected': False})
+        return packages
+
+    def build_records():
+        return [linux_app_cleaner.PackageRecord(*line.split('\t')) for line in lines]
+
+    sizes = {}
+    for label, build in (('dict', build_dicts), ('record', build_records)):
+        tracemalloc.start()
+        packages = build()
+        sizes[label] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del packages
+
+    records = build_records()
+    result = measure(lambda: [p for p in records if 'pkg000' in p.search_name and p.source != 'snap'])
+    result['dict_bytes'] = sizes['dict']
+    result['record_bytes'] = sizes['record']
+    return result
+
+
+def run_in_subprocess(name, tree, bin_dir):
+    """Jeder Lauf in einem neuen Prozess, damit RSS-Spitzen vergleichbar sind"""
+    env = dict(os.environ)
+    env['PATH'] = f"{bin_dir}{os.pathsep}{env.get('PATH', '')}"
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), '--run-one', name, '--tree', str(tree)],
+        capture_output=True, text=True, env=env
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Benchmark {name} fehlgeschlagen:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    summary = {'runs': runs}
+    for key in runs[0]:
+        values = [run[key] for run in runs]
+        summary[key] = statistics.median(values)
+    summary['wall_min'] = min(run['wall'] for run in runs)
+    return summary
+
+
+def run_suite(args):
+    spec = dict(SIZES[args.size])
+    for key in ('packages', 'files', 'depth'):
+        if getattr(args, key) is not None:
+            spec[key] = getattr(args, key)
+
+    work_dir = Path(tempfile.mkdtemp(prefix='app-cleaner-bench-'))
+    try:
+        print(f"Erzeuge Testdaten in {work_dir} ({spec})...", file=sys.stderr)
+        template = work_dir / 'template'
+        generate_tree(template, spec['packages'], spec['files'], spec['depth'], seed=args.seed)
+        bin_dir = generate_stubs(work_dir, spec['packages'])
+
+        results = {}
+        for name in args.benchmarks:
+            runs = []
+            for repeat in range(args.repeat):
+                # Jeder Lauf bekommt eine frische Kopie (Löschen verändert den Baum)
+                tree = work_dir / f"run-{name}-{repeat}"
+                shutil.copytree(template, tree, symlinks=True)
+                runs.append(run_in_subprocess(name, tree, bin_dir))
+                shutil.rmtree(tree, ignore_errors=True)
+            results[name] = summarize(runs)
+            print(f"  {name:<20} {results[name]['wall'] * 1000:9.1f} ms  "
+                  f"sys {results[name]['sys'] * 1000:7.1f} ms  "
+                  f"rss {results[name]['maxrss_kb'] / 1024:6.1f} MB", file=sys.stderr)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'size': args.size,
+            'spec': spec,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Vergleicht Median-Laufzeiten, gibt Liste der Verschlechterungen zurück"""
+    regressions = []
+    for name, result in current['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if not old:
+            continue
+        ratio = result['wall'] / old['wall'] if old['wall'] else float('inf')
+        marker = "⚠️" if ratio > 1 + threshold else "  "
+        print(f"{marker} {name:<20} {old['wall'] * 1000:9.1f} ms -> {result['wall'] * 1000:9.1f} ms "
+              f"({(ratio - 1) * 100:+.1f}%)")
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks für Linux App Cleaner")
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--packages', type=int, help="Pakete pro Paketmanager")
+    parser.add_argument('--files', type=int, help="Dateien pro Paket-Ordner")
+    parser.add_argument('--depth', type=int, help="Verschachtelungstiefe der Ordner")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--benchmarks', nargs='+', choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument('-o', '--output', help="Ergebnisse als JSON speichern")
+    parser.add_argument('--compare', help="Mit früherem JSON-Ergebnis vergleichen")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="Erlaubte Verschlechterung (0.2 = 20%%)")
+    parser.add_argument('--keep', action='store_true', help="Testdaten nicht löschen")
+    parser.add_argument('--run-one', help=argparse.SUPPRESS)
+    parser.add_argument('--tree', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        print(json.dumps(run_one(args.run_one, Path(args.tree))))
+        return
+
+    results = run_suite(args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Ergebnisse gespeichert: {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+    elif not args.output:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
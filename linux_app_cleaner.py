@@ -6,44 +6,2801 @@ Läuft komplett in venv - keine System-Pakete nötig!
 """
 
 import os
+import argparse
+import atexit
 import subprocess
 import shutil
 import json
+import csv
+import ctypes
+import fnmatch
+import glob
+import hashlib
+import re
+import sqlite3
 import sys
+import tempfile
 from pathlib import Path
+from contextlib import contextmanager
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import threading
+import time
+import queue
+import heapq
+import bisect
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QTableWidget, QTableWidgetItem, QLineEdit, QLabel,
     QComboBox, QTextEdit, QMessageBox, QTabWidget, QHeaderView,
-    QFileDialog, QProgressDialog
+    QFileDialog, QProgressDialog, QTreeWidget, QTreeWidgetItem, QCheckBox
 )
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QColor, QFont
 
 
+def _path_mtime(path):
+    """mtime eines Pfads oder None wenn er nicht existiert"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _write_json(path, data):
+    """
+    Schreibt JSON atomar über eine eindeutige Temp-Datei im Zielordner -
+    mehrere Cleaner (z.B. scan_roots) kommen sich so nicht in die Quere.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=path.parent, prefix=path.name + '.',
+                                     suffix='.tmp', delete=False) as f:
+        tmp = f.name
+        try:
+            json.dump(data, f)
+        except BaseException:
+            f.close()
+            os.unlink(tmp)
+            raise
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        os.unlink(tmp)
+        raise
+
+
+class IOThrottle:
+    """
+    Schonender Modus: begrenzt Verzeichnis-/stat-Zugriffe pro Sekunde
+    (Token-Bucket) und bremst zusätzlich, wenn /proc/pressure/io oder die
+    Systemlast steigt. Die gebremste Zeit wird mitgezählt. Leerlauf-I/O und
+    niedrigste CPU-Priorität bekommen nur die Durchlauf-Threads
+    (_walk_executor, _run_walk) - Paketmanager laufen normal weiter.
+    """
+
+    IOPRIO_WHO_PROCESS = 1
+    IOPRIO_CLASS_IDLE = 3
+    IOPRIO_CLASS_SHIFT = 13
+    # Syscall-Nummer von ioprio_set je Architektur
+    IOPRIO_SET = {'x86_64': 251, 'i386': 289, 'i686': 289, 'aarch64': 30, 'riscv64': 30,
+                  'armv7l': 314, 'ppc64le': 273, 's390x': 282}
+
+    def __init__(self, rate=5000, pressure_limit=10.0, load_limit=1.0, min_factor=1 / 16):
+        self.rate = rate
+        self.burst = rate
+        self.pressure_limit = pressure_limit
+        self.load_limit = load_limit * (os.cpu_count() or 1)
+        self.min_factor = min_factor
+        self.factor = 1.0
+        self.tokens = float(rate)
+        self.throttled_time = 0.0
+        self.waits = 0
+        self.ops = 0
+        self._last = time.monotonic()
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @staticmethod
+    def read_pressure(path='/proc/pressure/io'):
+        """'some avg10' aus der Pressure-Stall-Information oder None"""
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.startswith('some'):
+                        for field in line.split():
+                            if field.startswith('avg10='):
+                                return float(field[6:])
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _adjust(self, now):
+        """Halbiert die Rate bei Druck, verdoppelt sie wieder wenn es ruhig ist"""
+        self._last_check = now
+        pressure = self.read_pressure()
+        try:
+            load = os.getloadavg()[0]
+        except OSError:
+            load = 0.0
+        busy = (pressure is not None and pressure >= self.pressure_limit) or load >= self.load_limit
+        if busy:
+            self.factor = max(self.min_factor, self.factor / 2)
+        else:
+            self.factor = min(1.0, self.factor * 2)
+
+    def prioritize_current_thread(self):
+        """Leerlauf-I/O und Nice 19 für den aufrufenden Thread (einmal pro Thread)"""
+        if getattr(self._local, 'prioritized', False):
+            return
+        self._local.prioritized = True
+        tid = threading.get_native_id()
+        try:
+            os.setpriority(os.PRIO_PROCESS, tid, 19)
+        except OSError:
+            pass
+        number = self.IOPRIO_SET.get(os.uname().machine)
+        if number is not None:
+            try:
+                libc = ctypes.CDLL(None, use_errno=True)
+                libc.syscall(number, self.IOPRIO_WHO_PROCESS, tid,
+                             self.IOPRIO_CLASS_IDLE << self.IOPRIO_CLASS_SHIFT)
+            except (OSError, AttributeError):
+                pass
+
+    def acquire(self, count=1):
+        """Wartet bis count Zugriffe erlaubt sind"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_check >= 1.0:
+                self._adjust(now)
+            rate = self.rate * self.factor
+            self.tokens = min(self.burst, self.tokens + (now - self._last) * rate)
+            self._last = now
+            self.ops += count
+            # Reservierung: der Bestand darf negativ werden, Nachfolger warten länger
+            self.tokens -= count
+            wait = -self.tokens / rate if self.tokens < 0 else 0.0
+            if wait:
+                self.throttled_time += wait
+                self.waits += 1
+        if wait:
+            time.sleep(wait)
+
+    def scandir(self, path):
+        return _ThrottledScandir(self, path)
+
+    def stats(self):
+        return {
+            'throttled_seconds': self.throttled_time,
+            'waits': self.waits,
+            'ops': self.ops,
+            'factor': self.factor,
+        }
+
+
+class _ThrottledScandir:
+    """os.scandir mit einem Token pro Verzeichnis und pro Eintrag"""
+
+    def __init__(self, throttle, path):
+        self._throttle = throttle
+        throttle.acquire()
+        self._it = os.scandir(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+    def __iter__(self):
+        for entry in self._it:
+            self._throttle.acquire()
+            yield entry
+
+
+# Aktiver IOThrottle (schonender Modus) oder None - gilt für alle Durchläufe
+_io_throttle = None
+
+
+def set_io_throttle(throttle):
+    global _io_throttle
+    _io_throttle = throttle
+
+
+def _scandir(path):
+    """Zentraler Einstieg für alle Verzeichnis-Durchläufe (ggf. gebremst)"""
+    throttle = _io_throttle
+    if throttle is None:
+        return os.scandir(path)
+    return throttle.scandir(path)
+
+
+def _prioritize_walker():
+    """Initializer für Durchlauf-Threads: im schonenden Modus niedrige Priorität"""
+    throttle = _io_throttle
+    if throttle is not None:
+        throttle.prioritize_current_thread()
+
+
+def _walk_executor(max_workers=None):
+    """
+    Pool für Verzeichnis-Durchläufe und Größenberechnung. Die Priorität lässt
+    sich ohne Rechte nicht wieder anheben - deshalb nur eigene, kurzlebige
+    Worker absenken, nie den aufrufenden Thread.
+    """
+    return ThreadPoolExecutor(max_workers=max_workers, initializer=_prioritize_walker)
+
+
+def _run_walk(func, *args, **kwargs):
+    """Führt einen Durchlauf im schonenden Modus in einem abgesenkten Worker aus"""
+    if _io_throttle is None:
+        return func(*args, **kwargs)
+    with _walk_executor(1) as executor:
+        return executor.submit(func, *args, **kwargs).result()
+
+
+def _glob_walk(base_path, pattern, recursive=False, prune=None):
+    """
+    Wie Path.glob/rglob für ein einzelnes Namensmuster, aber über _scandir.
+    prune(pfad) -> True: Ordner nicht betreten.
+    """
+    stack = [str(base_path)]
+    while stack:
+        try:
+            with _scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if fnmatch.fnmatchcase(entry.name, pattern):
+                        yield Path(entry.path)
+                    if recursive and not (prune and prune(entry.path)):
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                        except OSError:
+                            pass
+        except OSError:
+            pass
+
+
+def _read_passwd(path):
+    """Benutzer aus einer passwd-Datei: [{'name', 'uid', 'home', 'shell'}]"""
+    users = []
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                parts = line.rstrip('\n').split(':')
+                if len(parts) < 7 or not parts[2].isdigit():
+                    continue
+                users.append({'name': parts[0], 'uid': int(parts[2]), 'home': parts[5], 'shell': parts[6]})
+    except OSError:
+        pass
+    return users
+
+
+def _read_keyfile(path):
+    """GLib-Keyfile (Flatpak-metadata) als {gruppe: {schlüssel: wert}}"""
+    groups = {}
+    current = None
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.startswith('[') and line.endswith(']'):
+                    current = groups.setdefault(line[1:-1], {})
+                elif current is not None and '=' in line:
+                    key, value = line.split('=', 1)
+                    current[key.strip()] = value.strip()
+    except OSError:
+        pass
+    return groups
+
+
+def _dir_size(path, span=None):
+    """Größe aller Dateien unter path (ohne Symlinks zu folgen)"""
+    total = 0
+    visited = 0
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        try:
+            with _scandir(current) as entries:
+                for entry in entries:
+                    visited += 1
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    if span is not None:
+        span.add(entries=visited, bytes=total)
+    return total
+
+
+class DuplicateFinder:
+    """
+    Findet identische Dateien in mehreren Schritten:
+    gleiche Größe -> gleicher Anfang/Ende -> gleicher Hash der ganzen Datei.
+    Nur Kandidaten, die einen Schritt überstehen, werden weiter gelesen.
+    Symlinks und zusätzliche Hardlinks derselben Datei werden übersprungen.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+    READ_SIZE = 1024 * 1024
+
+    def __init__(self, min_size=4096, max_workers=None, exclude=None):
+        self.min_size = min_size
+        self.max_workers = max_workers or min(8, (os.cpu_count() or 2) * 2)
+        # exclude(pfad) -> True: Ordner/Datei nicht ansehen (z.B. Quarantäne)
+        self.exclude = exclude
+
+    def _group_by_size(self, roots, span=None):
+        by_size = {}
+        seen_inodes = set()
+        visited = 0
+        stack = [str(root) for root in roots]
+        while stack:
+            current = stack.pop()
+            try:
+                with _scandir(current) as entries:
+                    for entry in entries:
+                        visited += 1
+                        if self.exclude and self.exclude(entry.path):
+                            continue
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                                continue
+                            if not entry.is_file(follow_symlinks=False):
+                                continue
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if st.st_size < self.min_size:
+                            continue
+                        inode = (st.st_dev, st.st_ino)
+                        if inode in seen_inodes:
+                            continue
+                        seen_inodes.add(inode)
+                        by_size.setdefault(st.st_size, []).append(entry.path)
+            except OSError:
+                pass
+        if span is not None:
+            span.add(entries=visited)
+        return {size: paths for size, paths in by_size.items() if len(paths) > 1}
+
+    def _partial_hash(self, path, size):
+        """Hash über ersten und letzten Block"""
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read(self.BLOCK_SIZE))
+                if size > self.BLOCK_SIZE:
+                    f.seek(max(self.BLOCK_SIZE, size - self.BLOCK_SIZE))
+                    digest.update(f.read(self.BLOCK_SIZE))
+        except OSError:
+            return None
+        return digest.digest()
+
+    def _full_hash(self, path):
+        digest = hashlib.blake2b()
+        buffer = bytearray(self.READ_SIZE)
+        view = memoryview(buffer)
+        try:
+            with open(path, 'rb', buffering=0) as f:
+                while True:
+                    count = f.readinto(buffer)
+                    if not count:
+                        break
+                    digest.update(view[:count])
+        except OSError:
+            return None
+        return digest.digest()
+
+    def _refine(self, executor, groups, hash_func):
+        """Teilt jede Gruppe nach hash_func auf und verwirft Einzelgänger"""
+        jobs = [(key, path, executor.submit(hash_func, path, key[0]))
+                for key, paths in groups.items() for path in paths]
+        refined = {}
+        for key, path, future in jobs:
+            digest = future.result()
+            if digest is not None:
+                refined.setdefault((key[0], digest), []).append(path)
+        return {key: paths for key, paths in refined.items() if len(paths) > 1}
+
+    def find(self, roots, tracer=None, progress_callback=None):
+        """Gibt Duplikat-Gruppen zurück, sortiert nach freizugebenden Bytes"""
+        tracer = tracer or Tracer()
+        with tracer.span('duplicates:size', category='duplicates') as span:
+            by_size = self._group_by_size(roots, span)
+        groups = {(size, None): paths for size, paths in by_size.items()}
+
+        with _walk_executor(self.max_workers) as executor:
+            if progress_callback:
+                progress_callback(f"Vergleiche Anfang/Ende von {sum(map(len, groups.values()))} Dateien...")
+            with tracer.span('duplicates:partial', category='duplicates') as span:
+                groups = self._refine(executor, groups, self._partial_hash)
+                span.add(entries=sum(map(len, groups.values())))
+
+            # Kleine Dateien sind durch Anfang+Ende schon vollständig gelesen
+            complete = {key: paths for key, paths in groups.items() if key[0] <= 2 * self.BLOCK_SIZE}
+            pending = {key: paths for key, paths in groups.items() if key[0] > 2 * self.BLOCK_SIZE}
+            if progress_callback and pending:
+                progress_callback(f"Prüfe {sum(map(len, pending.values()))} Dateien vollständig...")
+            with tracer.span('duplicates:full', category='duplicates') as span:
+                complete.update(self._refine(executor, pending, lambda path, _size: self._full_hash(path)))
+                span.add(bytes=sum(key[0] * len(paths) for key, paths in pending.items()))
+
+        result = []
+        for (size, digest), paths in complete.items():
+            result.append({
+                'size': size,
+                'hash': digest.hex(),
+                'paths': sorted(paths),
+                'reclaimable': size * (len(paths) - 1),
+            })
+        result.sort(key=lambda group: group['reclaimable'], reverse=True)
+        return result
+
+
+class AppImageIndex:
+    """
+    Findet AppImages am Inhalt statt an der Endung: ELF-Header und die
+    AppImage-Kennung 'AI' + Typ (1 oder 2) ab Byte 8. Pro Ordner werden
+    mtime, Fundstellen und Unterordner gespeichert - ein unveränderter
+    Ordner kostet beim nächsten Scan nur ein stat().
+    """
+
+    MIN_SIZE = 1024
+    MAGIC_TYPES = (b'AI\x01', b'AI\x02')
+
+    def __init__(self, cache_file, log=None):
+        self.cache_file = Path(cache_file)
+        # log(text): Meldung wenn der Cache nicht gespeichert werden kann
+        self.log = log
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def keeps_atime(st):
+        """O_NOATIME geht nur für eigene Dateien (oder als root)"""
+        return hasattr(os, 'O_NOATIME') and (os.geteuid() == 0 or st.st_uid == os.geteuid())
+
+    @classmethod
+    def is_appimage(cls, path):
+        """Liest nur die ersten 11 Bytes - wenn möglich ohne die atime zu ändern"""
+        try:
+            try:
+                fd = os.open(path, os.O_RDONLY | getattr(os, 'O_NOATIME', 0))
+            except PermissionError:
+                fd = os.open(path, os.O_RDONLY)
+            try:
+                header = os.read(fd, 11)
+            finally:
+                os.close(fd)
+        except OSError:
+            return False
+        return header[:4] == b'\x7fELF' and header[8:11] in cls.MAGIC_TYPES
+
+    @staticmethod
+    def _is_candidate(name, st):
+        """Nur Dateien öffnen, die ein AppImage sein könnten"""
+        lower = name.lower()
+        return lower.endswith('.appimage') or '.' not in name or bool(st.st_mode & 0o111)
+
+    def _load(self):
+        try:
+            with open(self.cache_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, cache):
+        _write_json(self.cache_file, cache)
+
+    def _scan_dir(self, path):
+        found = []
+        subdirs = []
+        with _scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith('.'):
+                            subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        if (st.st_size >= self.MIN_SIZE and self._is_candidate(entry.name, st)
+                                and self.is_appimage(entry.path)):
+                            found.append([entry.name, st.st_size])
+                except OSError:
+                    pass
+        return found, subdirs
+
+    def discover(self, roots, span=None):
+        """roots: [(Ordner, maximale Tiefe)] -> [(Pfad, Größe)]"""
+        with self._lock:
+            old_cache = self._load()
+            cache = {}
+            results = []
+            scanned = 0
+
+            for root, max_depth in roots:
+                stack = [(str(root), 0)]
+                while stack:
+                    path, depth = stack.pop()
+                    if path in cache:
+                        continue
+                    mtime = _path_mtime(path)
+                    if mtime is None:
+                        continue
+
+                    entry = old_cache.get(path)
+                    if entry is None or entry['mtime'] != mtime:
+                        try:
+                            found, subdirs = self._scan_dir(path)
+                        except OSError:
+                            continue
+                        entry = {'mtime': mtime, 'found': found, 'subdirs': subdirs}
+                        scanned += 1
+                    cache[path] = entry
+
+                    results.extend((os.path.join(path, name), size) for name, size in entry['found'])
+                    if depth < max_depth:
+                        stack.extend((os.path.join(path, name), depth + 1) for name in entry['subdirs'])
+
+            if span is not None:
+                span.add(entries=len(cache))
+                span.add(scanned_dirs=scanned)
+            if cache != old_cache:
+                try:
+                    self._save(cache)
+                except OSError as e:
+                    if self.log:
+                        self.log(f"AppImage-Cache nicht gespeichert ({self.cache_file}): {e}")
+        return results
+
+
+class DesktopEntryIndex:
+    """
+    Index aller .desktop-Dateien (Starter und Autostart) und aller Icons.
+    Pro Ordner werden mtime und Inhalt gespeichert; beim nächsten Aufruf
+    kostet ein unveränderter Ordner nur ein stat(). Ein Paket wird über
+    X-Flatpak, Datei-ID, Exec/TryExec und StartupWMClass zugeordnet,
+    seine Icons über den Icon-Schlüssel statt über Suchmuster.
+    """
+
+    KEYS = ('Name', 'Exec', 'TryExec', 'Icon', 'StartupWMClass', 'X-Flatpak')
+    ICON_EXTENSIONS = ('.png', '.svg', '.svgz', '.xpm')
+
+    def __init__(self, cache_file, log=None):
+        self.cache_file = Path(cache_file)
+        self.log = log
+        self._lock = threading.Lock()
+        self._dirs = None
+        self._signature = None
+        self._entries = []
+        self._by_key = {}
+        self._icons = {}
+        self._icon_users = {}
+
+    @classmethod
+    def parse(cls, path):
+        """Relevante Schlüssel aus der [Desktop Entry]-Gruppe"""
+        keys = {}
+        in_group = False
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith('['):
+                        in_group = line == '[Desktop Entry]'
+                        continue
+                    if not in_group:
+                        continue
+                    key, sep, value = line.partition('=')
+                    key = key.strip()
+                    if sep and key in cls.KEYS and key not in keys:
+                        keys[key] = value.strip()
+        except OSError:
+            pass
+        return keys
+
+    @staticmethod
+    def exec_targets(command):
+        """Programmname bzw. Flatpak-ID aus einer Exec-Zeile"""
+        tokens = [token.strip('"\'') for token in command.split()]
+        while tokens and (tokens[0] == 'env' or ('=' in tokens[0] and not tokens[0].startswith('/'))):
+            tokens.pop(0)
+        if not tokens:
+            return []
+        program = os.path.basename(tokens[0])
+        if program == 'flatpak' and 'run' in tokens:
+            for token in tokens[tokens.index('run') + 1:]:
+                if not token.startswith('-'):
+                    return [token]
+            return []
+        return [program]
+
+    def _load(self):
+        try:
+            with open(self.cache_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        try:
+            _write_json(self.cache_file, self._dirs)
+        except OSError as e:
+            if self.log:
+                self.log(f"Starter-Cache nicht gespeichert ({self.cache_file}): {e}")
+
+    def _scan_dir(self, path, kind):
+        items = []
+        subdirs = []
+        with _scandir(path) as entries:
+            for entry in entries:
+                try:
+                    # Icon-Themes verlinken Ordner untereinander - nicht folgen
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif kind == 'icon':
+                        if entry.name.endswith(self.ICON_EXTENSIONS):
+                            items.append(entry.name)
+                    elif entry.name.endswith('.desktop'):
+                        items.append([entry.name, self.parse(entry.path)])
+                except OSError:
+                    pass
+        return items, subdirs
+
+    def refresh(self, roots):
+        """roots: [(Ordner, 'launcher' | 'autostart' | 'icon')]"""
+        with self._lock:
+            old = self._dirs if self._dirs is not None else self._load()
+            dirs = {}
+            changed = self._dirs is None
+            for root, kind in roots:
+                stack = [str(root)]
+                while stack:
+                    path = stack.pop()
+                    key = f"{kind}:{path}"
+                    mtime = _path_mtime(path)
+                    if mtime is None or key in dirs:
+                        continue
+                    cached = old.get(key)
+                    if cached is None or cached['mtime'] != mtime:
+                        try:
+                            items, subdirs = self._scan_dir(path, kind)
+                        except OSError:
+                            continue
+                        cached = {'mtime': mtime, 'items': items, 'subdirs': subdirs}
+                        changed = True
+                    dirs[key] = cached
+                    stack.extend(os.path.join(path, name) for name in cached['subdirs'])
+
+            if changed or dirs.keys() != old.keys():
+                self._dirs = dirs
+                self._rebuild()
+                self._save()
+
+    def _rebuild(self):
+        entries = []
+        by_key = {}
+        icons = {}
+        icon_users = {}
+        for key, cached in self._dirs.items():
+            kind, path = key.split(':', 1)
+            if kind == 'icon':
+                for name in cached['items']:
+                    icons.setdefault(name.rsplit('.', 1)[0].lower(), []).append(os.path.join(path, name))
+                continue
+            for name, keys in cached['items']:
+                index = len(entries)
+                entries.append({'path': os.path.join(path, name), 'kind': kind, 'keys': keys})
+                if keys.get('Icon'):
+                    icon_users.setdefault(keys['Icon'].lower(), set()).add(index)
+                lookups = {name[:-len('.desktop')]}
+                for exec_key in ('Exec', 'TryExec'):
+                    lookups.update(self.exec_targets(keys.get(exec_key, '')))
+                for extra in ('StartupWMClass', 'X-Flatpak'):
+                    if keys.get(extra):
+                        lookups.add(keys[extra])
+                for lookup in lookups:
+                    by_key.setdefault(lookup.lower(), []).append(index)
+        self._entries = entries
+        self._by_key = by_key
+        self._icons = icons
+        self._icon_users = icon_users
+
+    def lookup(self, terms, path=None):
+        """Starter, Autostart-Einträge und Icons zu den Namensvarianten eines Pakets"""
+        terms = {term.lower() for term in terms if term}
+        matches = set()
+        with self._lock:
+            for term in terms:
+                matches.update(self._by_key.get(term, ()))
+            if path:
+                matches.update(i for i, entry in enumerate(self._entries)
+                               if path in entry['keys'].get('Exec', ''))
+
+            result = {'launcher': [], 'autostart': [], 'icon': []}
+            icon_names = set(terms)
+            for index in sorted(matches):
+                entry = self._entries[index]
+                result[entry['kind']].append(entry['path'])
+                icon = entry['keys'].get('Icon')
+                # Allgemeine Theme-Icons (z.B. 'utilities-terminal') nur übernehmen,
+                # wenn kein fremder Starter sie benutzt oder der Name zum Paket passt
+                if icon and not (self._icon_users.get(icon.lower(), set()) <= matches
+                                 or any(term in icon.lower() for term in terms)):
+                    continue
+                if icon and icon.startswith('/'):
+                    result['icon'].append(icon)
+                elif icon:
+                    icon_names.add(icon.lower())
+            for name in icon_names:
+                result['icon'].extend(self._icons.get(name, ()))
+        return result
+
+
+class DpkgOwnershipIndex:
+    """
+    Welche Datei gehört zu welchem dpkg-Paket? Aufgebaut aus
+    var/lib/dpkg/info/*.list und *.conffiles als sortierte Tabelle
+    internierter Pfade (Abfrage per bisect). Geänderte Listen werden
+    anhand ihrer mtime einzeln neu gelesen; solange sich der info-Ordner
+    nicht ändert, kostet ein refresh() nur ein stat().
+    """
+
+    def __init__(self, info_dir):
+        self.info_dir = str(info_dir)
+        self._lock = threading.Lock()
+        self._dir_mtime = None
+        self._files = {}        # Dateiname -> (mtime, Paket, Pfade)
+        self._paths = []        # sortiert, ein Eintrag pro (Pfad, Besitzer)
+        self._owners = []       # Paket-Index parallel zu _paths
+        self._packages = []
+        self._package_paths = {}
+
+    @staticmethod
+    def _package_name(filename):
+        """'libc6:amd64.list' -> 'libc6'"""
+        return filename.rsplit('.', 1)[0].split(':', 1)[0]
+
+    def refresh(self):
+        with self._lock:
+            mtime = _path_mtime(self.info_dir)
+            if mtime is None or mtime == self._dir_mtime:
+                return
+            files = {}
+            changed = False
+            try:
+                with _scandir(self.info_dir) as entries:
+                    for entry in entries:
+                        if not entry.name.endswith(('.list', '.conffiles')):
+                            continue
+                        try:
+                            file_mtime = entry.stat().st_mtime_ns
+                        except OSError:
+                            continue
+                        cached = self._files.get(entry.name)
+                        if cached is None or cached[0] != file_mtime:
+                            cached = (file_mtime, self._package_name(entry.name), self._read_list(entry.path))
+                            changed = True
+                        files[entry.name] = cached
+            except OSError:
+                return
+            if changed or files.keys() != self._files.keys():
+                self._files = files
+                self._rebuild()
+            self._dir_mtime = mtime
+
+    @staticmethod
+    def _read_list(path):
+        paths = []
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    line = line.rstrip('\n')
+                    # conffiles kann "remove-on-upgrade /pfad" enthalten
+                    if ' ' in line and not line.startswith('/'):
+                        line = line.split(' ', 1)[1]
+                    if line.startswith('/') and line != '/.':
+                        paths.append(sys.intern(line.rstrip('/') or '/'))
+        except OSError:
+            pass
+        return paths
+
+    def _rebuild(self):
+        packages = sorted({package for _mtime, package, _paths in self._files.values()})
+        index = {package: i for i, package in enumerate(packages)}
+        package_paths = {}
+        table = set()
+        for _mtime, package, paths in self._files.values():
+            owner = index[package]
+            package_paths.setdefault(package, set()).update(paths)
+            table.update((path, owner) for path in paths)
+        table = sorted(table)
+        self._paths = [path for path, _owner in table]
+        self._owners = [owner for _path, owner in table]
+        self._packages = packages
+        self._package_paths = {package: sorted(paths) for package, paths in package_paths.items()}
+
+    def who_owns(self, path):
+        """Pakete, die genau diesen Pfad installiert haben"""
+        path = path.rstrip('/') or '/'
+        i = bisect.bisect_left(self._paths, path)
+        owners = []
+        while i < len(self._paths) and self._paths[i] == path:
+            owners.append(self._packages[self._owners[i]])
+            i += 1
+        return owners
+
+    def paths_of(self, package):
+        """Alle von einem Paket installierten Pfade (sortiert)"""
+        return self._package_paths.get(package, [])
+
+    def classify(self, path, package):
+        """
+        'owned': Pfad (und alles darunter) gehört nur zu package,
+        'foreign': mindestens ein Teil gehört zu einem anderen Paket,
+        'unowned': kein dpkg-Paket hat hier etwas installiert.
+        """
+        path = path.rstrip('/') or '/'
+        owners = set(self.who_owns(path))
+        prefix = path + '/'
+        i = bisect.bisect_left(self._paths, prefix)
+        while i < len(self._paths) and self._paths[i].startswith(prefix):
+            owners.add(self._packages[self._owners[i]])
+            if owners - {package}:
+                break
+            i += 1
+        if not owners:
+            return 'unowned'
+        return 'owned' if owners == {package} else 'foreign'
+
+
+class UsageEstimator:
+    """
+    Schätzt, wann ein Paket zuletzt benutzt wurde - nur aus Zeitstempeln,
+    die ohnehin auf der Platte liegen: atime der Programmdateien (relatime
+    setzt sie beim Start höchstens einmal am Tag) und mtime der Config-,
+    Cache- und Daten-Ordner und Starter. Ordner-atimes zählen nicht, die
+    ändern schon Suche und Größenberechnung. Alle Pfade werden in einem
+    Durchlauf parallel geprüft, das Ergebnis pro Paket in usage.json
+    gespeichert und MAX_AGE Sekunden wiederverwendet.
+    """
+
+    MAX_AGE = 6 * 3600
+
+    def __init__(self, cache_file, max_workers=8):
+        self.cache_file = Path(cache_file)
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.cache_file, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, cache):
+        _write_json(self.cache_file, cache)
+
+    @staticmethod
+    def _timestamp(path, use_atime):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return max(st.st_atime, st.st_mtime) if use_atime else st.st_mtime
+
+    def estimate(self, candidates, force=False, span=None):
+        """
+        candidates: {schlüssel: [(pfad, signal, atime_zählt)]}
+        -> {schlüssel: (zuletzt_benutzt oder None, signal)}
+        """
+        now = time.time()
+        with self._lock:
+            cache = self._load()
+            results = {}
+            todo = {}
+            for key, paths in candidates.items():
+                entry = cache.get(key)
+                if entry and not force and now - entry[0] < self.MAX_AGE:
+                    results[key] = (entry[1], entry[2])
+                else:
+                    todo[key] = paths
+
+            unique = {}
+            for paths in todo.values():
+                for path, _signal, use_atime in paths:
+                    unique[str(path)] = unique.get(str(path), False) or use_atime
+            with _walk_executor(self.max_workers) as executor:
+                times = dict(zip(unique, executor.map(lambda item: self._timestamp(*item), unique.items())))
+            if span:
+                span.add(entries=len(unique))
+
+            for key, paths in todo.items():
+                best = (None, None)
+                for path, signal, _use_atime in paths:
+                    timestamp = times.get(str(path))
+                    if timestamp is not None and (best[0] is None or timestamp > best[0]):
+                        best = (timestamp, signal)
+                results[key] = best
+                cache[key] = [now, best[0], best[1]]
+            if todo:
+                try:
+                    self._save(cache)
+                except OSError:
+                    pass
+        return results
+
+
+class PythonEnvFinder:
+    """
+    Findet virtuelle Python-Umgebungen (pyvenv.cfg) und conda-Umgebungen
+    (conda-meta) mit einer begrenzten Suche, die bekannte große Ordner
+    ohne Umgebungen überspringt und nicht in gefundene Umgebungen absteigt.
+    Die Umgebungen werden danach parallel ausgewertet.
+    """
+
+    PRUNE = {
+        'node_modules', '.git', '.hg', '.svn', '__pycache__', 'site-packages',
+        '.npm', '.cargo', '.rustup', '.gradle', '.m2', '.mozilla', '.thunderbird',
+        '.steam', '.wine', 'Trash', 'proc', 'sys', 'dev',
+    }
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+
+    def find_roots(self, roots, span=None):
+        """roots: [(Ordner, maximale Tiefe)] -> [(Pfad, 'venv' oder 'conda')]"""
+        found = []
+        seen = set()
+        visited = 0
+        for root, max_depth in roots:
+            stack = [(str(root), 0)]
+            while stack:
+                path, depth = stack.pop()
+                if path in seen:
+                    continue
+                seen.add(path)
+                try:
+                    with _scandir(path) as entries:
+                        files = set()
+                        subdirs = []
+                        for entry in entries:
+                            visited += 1
+                            try:
+                                if entry.is_dir(follow_symlinks=False):
+                                    subdirs.append(entry.name)
+                                else:
+                                    files.add(entry.name)
+                            except OSError:
+                                pass
+                except OSError:
+                    continue
+
+                if 'pyvenv.cfg' in files:
+                    found.append((path, 'venv'))
+                    continue
+                if 'conda-meta' in subdirs:
+                    found.append((path, 'conda'))
+                    # Basis-Installation: benannte Umgebungen liegen unter envs/
+                    if 'envs' in subdirs:
+                        stack.append((os.path.join(path, 'envs'), max_depth - 1))
+                    continue
+                if depth >= max_depth:
+                    continue
+                stack.extend((os.path.join(path, name), depth + 1)
+                             for name in subdirs if name not in self.PRUNE)
+        if span is not None:
+            span.add(entries=visited)
+        return found
+
+    @staticmethod
+    def _read_cfg(path):
+        cfg = {}
+        try:
+            with open(os.path.join(path, 'pyvenv.cfg'), encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    key, sep, value = line.partition('=')
+                    if sep:
+                        cfg[key.strip().lower()] = value.strip()
+        except OSError:
+            pass
+        return cfg
+
+    @staticmethod
+    def _kind(path, base_kind):
+        """Wer hat die Umgebung angelegt? (grob aus dem Pfad geschlossen)"""
+        parts = Path(path).parts
+        if base_kind == 'conda':
+            return 'conda'
+        if '.tox' in parts or '.nox' in parts:
+            return 'tox'
+        if 'pypoetry' in parts:
+            return 'poetry'
+        if 'pipx' in parts:
+            return 'pipx'
+        if 'virtualenvs' in parts:
+            return 'pipenv'
+        return 'venv'
+
+    @staticmethod
+    def _env_size(path, base_kind):
+        """Größe ohne die unter envs/ liegenden conda-Umgebungen (die zählen selbst)"""
+        if base_kind != 'conda' or not os.path.isdir(os.path.join(path, 'envs')):
+            return _dir_size(path)
+        total = 0
+        try:
+            with _scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name != 'envs':
+                                total += _dir_size(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return total
+
+    def inspect(self, path, base_kind):
+        """Interpreter, Paketanzahl, Größe und letzte Nutzung einer Umgebung"""
+        interpreter = None
+        package_count = 0
+        usage_paths = [path, os.path.join(path, 'bin')]
+
+        if base_kind == 'venv':
+            cfg = self._read_cfg(path)
+            interpreter = cfg.get('version') or cfg.get('version_info')
+            usage_paths.append(os.path.join(path, 'pyvenv.cfg'))
+            lib_dirs = [os.path.join(path, 'lib'), os.path.join(path, 'lib64')]
+            for lib_dir in lib_dirs:
+                try:
+                    with _scandir(lib_dir) as entries:
+                        python_dirs = [e.path for e in entries if e.name.startswith('python')]
+                except OSError:
+                    continue
+                for python_dir in python_dirs:
+                    site_packages = os.path.join(python_dir, 'site-packages')
+                    usage_paths.append(site_packages)
+                    try:
+                        with _scandir(site_packages) as entries:
+                            package_count += sum(1 for e in entries
+                                                 if e.name.endswith(('.dist-info', '.egg-info')))
+                    except OSError:
+                        pass
+                if python_dirs:
+                    break
+        else:
+            meta = os.path.join(path, 'conda-meta')
+            usage_paths.append(meta)
+            try:
+                with _scandir(meta) as entries:
+                    for entry in entries:
+                        if not entry.name.endswith('.json'):
+                            continue
+                        package_count += 1
+                        if entry.name.startswith('python-') and entry.name[7:8].isdigit():
+                            interpreter = entry.name[7:].split('-')[0]
+            except OSError:
+                pass
+
+        last_used = 0
+        for usage_path in usage_paths:
+            try:
+                st = os.stat(usage_path)
+                last_used = max(last_used, st.st_atime, st.st_mtime)
+            except OSError:
+                pass
+
+        return {
+            'path': path,
+            'name': os.path.basename(path),
+            'kind': self._kind(path, base_kind),
+            'interpreter': interpreter,
+            'packages': package_count,
+            'size': self._env_size(path, base_kind),
+            'last_used': last_used,
+        }
+
+    def find(self, roots, tracer=None):
+        tracer = tracer or Tracer()
+        with tracer.span('python_envs:find', category='python_envs') as span:
+            found = self.find_roots(roots, span)
+        with tracer.span('python_envs:inspect', category='python_envs') as span:
+            with _walk_executor(self.max_workers) as executor:
+                envs = list(executor.map(lambda item: self.inspect(*item), found))
+            span.add(entries=len(envs), bytes=sum(env['size'] for env in envs))
+        envs.sort(key=lambda env: env['size'], reverse=True)
+        return envs
+
+
+class RuntimeReclaimer:
+    """
+    Was die Paketverwaltungen liegen lassen: Flatpak-Runtimes, Extensions
+    und GL-Treiber, auf die keine installierte App (mehr) verweist, und
+    deaktivierte alte Snap-Revisionen. Alles wird aus den Dateien auf der
+    Platte gelesen, flatpak/snap werden nicht aufgerufen.
+    """
+
+    def __init__(self, flatpak_installations, snap_root, snap_mount, snap_data):
+        self.flatpak_installations = flatpak_installations   # [(Ordner, 'system'|'user')]
+        self.snap_root = Path(snap_root)                     # var/lib/snapd/snaps
+        self.snap_mount = Path(snap_mount)                   # snap/<name>/current
+        self.snap_data = Path(snap_data)                     # var/snap/<name>/<rev>
+
+    @staticmethod
+    def _listdirs(path):
+        try:
+            with _scandir(path) as entries:
+                return sorted(entry.name for entry in entries if entry.is_dir(follow_symlinks=False))
+        except OSError:
+            return []
+
+    def flatpak_refs(self):
+        """Alle Deployments: {(scope, 'kind/id/arch/branch'): info}"""
+        refs = {}
+        for installation, scope in self.flatpak_installations:
+            installation = Path(installation)
+            shared_links = 2 if (installation / 'repo' / 'objects').is_dir() else 1
+            for kind in ('app', 'runtime'):
+                for ref_id in self._listdirs(installation / kind):
+                    for arch in self._listdirs(installation / kind / ref_id):
+                        for branch in self._listdirs(installation / kind / ref_id / arch):
+                            deploy = installation / kind / ref_id / arch / branch
+                            metadata = _read_keyfile(deploy / 'active' / 'metadata')
+                            if not metadata:
+                                continue
+                            refs[(scope, f"{kind}/{ref_id}/{arch}/{branch}")] = {
+                                'kind': kind, 'id': ref_id, 'arch': arch, 'branch': branch,
+                                'scope': scope, 'path': str(deploy), 'metadata': metadata,
+                                'shared_links': shared_links,
+                            }
+        return refs
+
+    @staticmethod
+    def _runtime_targets(metadata):
+        """runtime=/sdk= einer App oder Runtime als Ref-Strings"""
+        group = metadata.get('Application') or metadata.get('Runtime') or {}
+        return [f"runtime/{group[key]}" for key in ('runtime', 'sdk') if group.get(key)]
+
+    @staticmethod
+    def _extension_points(info):
+        """[Extension NAME]-Gruppen: (NAME, erlaubte Branches)"""
+        points = []
+        for group, values in info['metadata'].items():
+            if not group.startswith('Extension '):
+                continue
+            versions = values.get('versions') or values.get('version') or info['branch']
+            points.append((group[len('Extension '):], set(versions.split(';')) - {''}))
+        return points
+
+    def flatpak_dependencies(self, refs):
+        """
+        App -> alles, was sie zum Laufen braucht (Runtime, SDK, Extensions
+        der App und ihrer Runtimes, GL-Treiber, Locale-/Debug-Erweiterungen)
+        """
+        by_ref = {}
+        for key in refs:
+            by_ref.setdefault(key[1], []).append(key)
+        extension_of = {}
+        runtimes = [key for key, info in refs.items() if info['kind'] == 'runtime']
+        for key in runtimes:
+            parent = refs[key]['metadata'].get('ExtensionOf', {}).get('ref')
+            if parent:
+                extension_of.setdefault(parent, []).append(key)
+
+        dependencies = {}
+        for app_key, app in refs.items():
+            if app['kind'] != 'app':
+                continue
+            needed = set()
+            stack = [app_key]
+            while stack:
+                key = stack.pop()
+                if key in needed:
+                    continue
+                needed.add(key)
+                info = refs[key]
+                for target in self._runtime_targets(info['metadata']):
+                    stack.extend(by_ref.get(target, []))
+                stack.extend(extension_of.get(key[1], []))
+                for name, versions in self._extension_points(info):
+                    for candidate in runtimes:
+                        other = refs[candidate]
+                        if (other['id'] == name or other['id'].startswith(name + '.')) \
+                                and other['branch'] in versions:
+                            stack.append(candidate)
+            needed.discard(app_key)
+            dependencies[app_key] = needed
+        return dependencies
+
+    @staticmethod
+    def _sizes(path, shared_links):
+        """
+        (Gesamtgröße, frei werdende Größe). Dateien, die per Hardlink auch in
+        anderen Deployments stecken, werden beim Entfernen nicht frei.
+        """
+        total = reclaimable = 0
+        seen = set()
+        stack = [path]
+        while stack:
+            try:
+                with _scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                                continue
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if (st.st_dev, st.st_ino) in seen:
+                            continue
+                        seen.add((st.st_dev, st.st_ino))
+                        total += st.st_size
+                        if st.st_nlink <= shared_links:
+                            reclaimable += st.st_size
+            except OSError:
+                pass
+        return total, reclaimable
+
+    @staticmethod
+    def _flatpak_kind(info):
+        ref_id = info['id']
+        if '.GL.' in ref_id or '.GL32.' in ref_id or ref_id.endswith(('.GL', '.GL32')):
+            return 'GL-Treiber'
+        if 'ExtensionOf' in info['metadata'] or ref_id.endswith(('.Locale', '.Debug', '.Sources')):
+            return 'Extension'
+        return 'Runtime'
+
+    def unused_flatpak(self, refs=None, dependencies=None):
+        """Runtimes/Extensions, die keine App braucht"""
+        refs = refs if refs is not None else self.flatpak_refs()
+        dependencies = dependencies if dependencies is not None else self.flatpak_dependencies(refs)
+        used = set().union(*dependencies.values()) if dependencies else set()
+        items = []
+        for key, info in sorted(refs.items()):
+            if info['kind'] != 'runtime' or key in used:
+                continue
+            size, reclaimable = self._sizes(info['path'], info['shared_links'])
+            items.append({
+                'manager': 'flatpak', 'kind': self._flatpak_kind(info), 'name': info['id'],
+                'ref': key[1], 'scope': info['scope'], 'version': info['branch'],
+                'path': info['path'], 'size': size, 'reclaimable': reclaimable,
+            })
+        return items
+
+    def disabled_snap_revisions(self):
+        """Alte Snap-Revisionen neben der aktiven (current-Symlink)"""
+        revisions = {}
+        try:
+            names = sorted(os.listdir(self.snap_root))
+        except OSError:
+            names = []
+        for filename in names:
+            name, sep, revision = filename[:-len('.snap')].rpartition('_')
+            if filename.endswith('.snap') and sep:
+                revisions.setdefault(name, []).append(revision)
+
+        items = []
+        for name, revs in sorted(revisions.items()):
+            try:
+                current = os.readlink(self.snap_mount / name / 'current')
+            except OSError:
+                # Ohne eindeutige aktive Revision lieber nichts anbieten
+                continue
+            for revision in sorted(revs):
+                if revision == current:
+                    continue
+                snap_file = self.snap_root / f"{name}_{revision}.snap"
+                data_dir = self.snap_data / name / revision
+                try:
+                    size = snap_file.stat().st_size
+                except OSError:
+                    continue
+                if data_dir.is_dir():
+                    size += _dir_size(data_dir)
+                items.append({
+                    'manager': 'snap', 'kind': 'Snap-Revision', 'name': name, 'ref': revision,
+                    'scope': 'system', 'version': f"r{revision} (aktiv: r{current})",
+                    'path': str(snap_file), 'size': size, 'reclaimable': size,
+                })
+        return items
+
+    def analyze(self, span=None):
+        refs = self.flatpak_refs()
+        dependencies = self.flatpak_dependencies(refs)
+        items = self.unused_flatpak(refs, dependencies) + self.disabled_snap_revisions()
+        if span:
+            span.add(entries=len(refs), bytes=sum(item['reclaimable'] for item in items))
+        return {
+            'items': items,
+            'dependencies': {app[1]: sorted(ref for _scope, ref in needed)
+                             for app, needed in dependencies.items()},
+            'reclaimable': sum(item['reclaimable'] for item in items),
+        }
+
+
+class SearchResults(dict):
+    """
+    Treffer der gründlichen Suche ({pfad: info} wie bisher). Treffer unter
+    einem bereits gefundenen Ordner werden in diesem zusammengefasst
+    (info['matches'] zählt sie), ein später gefundener Ordner schluckt
+    seine schon vorhandenen Unter-Treffer. Ab max_entries Einträgen wird
+    nur noch je Kategorie gezählt (overflow), damit Speicher und Anzeige
+    mit der Zahl der Fundorte wachsen und nicht mit der Zahl der Dateien.
+    """
+
+    MAX_ENTRIES = 5000
+
+    def __init__(self, max_entries=None):
+        super().__init__()
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self._keys = []         # sortiert, für Unterpfad-Bereiche per bisect
+        self.collapsed = 0
+        self.overflow = {}      # Kategorie -> {'count': n, 'size': bytes}
+        self._overflow_dirs = set()
+
+    def covering(self, path):
+        """Bereits gefundener Ordner, in dem path liegt (oder None)"""
+        parent = path
+        while True:
+            parent = parent.rpartition('/')[0]
+            if not parent:
+                return None
+            info = dict.get(self, parent)
+            if info is not None and info['type'] == 'directory' or parent in self._overflow_dirs:
+                return parent
+
+    def covers(self, path):
+        """path ist selbst ein gefundener Ordner oder liegt in einem"""
+        return dict.__contains__(self, path) or path in self._overflow_dirs or self.covering(path) is not None
+
+    def add(self, path, info):
+        path = str(path)
+        if dict.__contains__(self, path) or path in self._overflow_dirs:
+            return
+        ancestor = self.covering(path)
+        if ancestor is not None:
+            if ancestor not in self._overflow_dirs:
+                dict.__getitem__(self, ancestor)['matches'] += 1
+            self.collapsed += 1
+            return
+        if info['type'] == 'directory':
+            prefix = path + '/'
+            lo = bisect.bisect_left(self._keys, prefix)
+            hi = lo
+            while hi < len(self._keys) and self._keys[hi].startswith(prefix):
+                hi += 1
+            nested = self._keys[lo:hi]
+            del self._keys[lo:hi]
+            info['matches'] = 1 + sum(dict.pop(self, key).get('matches', 1) for key in nested)
+            self.collapsed += len(nested)
+        if len(self) >= self.max_entries:
+            summary = self.overflow.setdefault(info['category'], {'count': 0, 'size': 0})
+            summary['count'] += 1
+            summary['size'] += info['size']
+            if info['type'] == 'directory':
+                # Inhalt übergelaufener Ordner nicht nochmal einzeln zählen
+                self._overflow_dirs.add(path)
+            return
+        dict.__setitem__(self, path, info)
+        bisect.insort(self._keys, path)
+
+    def __setitem__(self, path, info):
+        self.add(path, info)
+
+    def update(self, other=(), **kwargs):
+        items = other.items() if hasattr(other, 'items') else other
+        for path, info in items:
+            self.add(path, info)
+        for path, info in kwargs.items():
+            self.add(path, info)
+
+    def __delitem__(self, path):
+        dict.__delitem__(self, path)
+        self._keys.pop(bisect.bisect_left(self._keys, path))
+
+    def pop(self, path, *default):
+        if not dict.__contains__(self, path):
+            return dict.pop(self, path, *default)
+        info = dict.pop(self, path)
+        self._keys.pop(bisect.bisect_left(self._keys, path))
+        return info
+
+    @property
+    def overflow_count(self):
+        return sum(summary['count'] for summary in self.overflow.values())
+
+    def overflow_text(self):
+        """Zusammenfassung der nicht übernommenen Treffer ('' wenn keine)"""
+        if not self.overflow:
+            return ""
+        parts = [f"{category}: {summary['count']} ({summary['size'] / (1024*1024):.1f} MB)"
+                 for category, summary in sorted(self.overflow.items())]
+        return (f"{self.overflow_count} weitere Treffer über dem Limit von {self.max_entries} "
+                f"nicht übernommen - " + ", ".join(parts))
+
+
+class TermMatcher:
+    """
+    Alle Schreibweisen eines Programmnamens als EIN regulärer Ausdruck.
+    Wird einmal gebaut und von allen Such-Threads gemeinsam benutzt.
+    """
+
+    def __init__(self, terms):
+        terms = sorted({term.lower() for term in terms if term}, key=len, reverse=True)
+        alternatives = '|'.join(re.escape(term) for term in terms)
+        self.terms = terms
+        self._search = re.compile(alternatives).search
+        self._prefix = re.compile(f'\\.(?:{alternatives})').match
+
+    def matches(self, name):
+        """Name enthält eine der Schreibweisen"""
+        return self._search(name.lower()) is not None
+
+    def matches_dotfile(self, name):
+        """Versteckte Datei, die mit einer der Schreibweisen beginnt"""
+        return self._prefix(name.lower()) is not None
+
+
+class CacheAnalyzer:
+    """
+    Sucht große, lange unbenutzte Teilbäume in Cache-Ordnern.
+    Ein Durchlauf (Post-Order) berechnet pro Ordner Größe und letzte Nutzung
+    (neueste mtime/atime der Dateien darunter; Ordner-mtimes ändern sich auch
+    durch Entpacken oder Löschen und zählen daher nicht). Gemeldet werden nur die obersten
+    veralteten Ordner, in einem Heap der N größten. Pro offenem Ordner werden
+    höchstens N veraltete Kinder gehalten; der Speicherbedarf wächst mit Tiefe
+    und Breite der gerade offenen Ordner (deren Unterordner-Listen), nicht mit
+    der Gesamtzahl der Dateien.
+    """
+
+    AGE_BUCKETS = [
+        (7, "< 1 Woche"),
+        (30, "1 Woche - 1 Monat"),
+        (90, "1 - 3 Monate"),
+        (180, "3 - 6 Monate"),
+        (365, "6 - 12 Monate"),
+        (None, "> 1 Jahr"),
+    ]
+
+    def __init__(self, stale_days=90, top=20, now=None):
+        self.stale_days = stale_days
+        self.top = top
+        self.now = now or time.time()
+
+    def _bucket(self, last_used):
+        age_days = (self.now - last_used) / 86400
+        for index, (limit, _label) in enumerate(self.AGE_BUCKETS):
+            if limit is None or age_days < limit:
+                return index
+        return len(self.AGE_BUCKETS) - 1
+
+    def _is_stale(self, last_used):
+        return self.now - last_used >= self.stale_days * 86400
+
+    def _open(self, path, buckets, stale_bytes):
+        """
+        Liest einen Ordner: [Pfad, Größe, letzte Nutzung, Unterordner, veraltete Kinder].
+        stale_bytes[0] zählt die Bytes veralteter Dateien (genau, nicht pro Altersstufe).
+        """
+        size = 0
+        last_used = 0
+        subdirs = []
+        try:
+            with _scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            st = entry.stat(follow_symlinks=False)
+                            used = max(st.st_mtime, st.st_atime)
+                            size += st.st_size
+                            last_used = max(last_used, used)
+                            buckets[self._bucket(used)] += st.st_size
+                            if self._is_stale(used):
+                                stale_bytes[0] += st.st_size
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return [path, size, last_used, subdirs, []]
+
+    def _push(self, heap, size, path, last_used):
+        item = (size, path, last_used)
+        if len(heap) < self.top:
+            heapq.heappush(heap, item)
+        elif size > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    def analyze(self, roots, span=None):
+        heap = []
+        buckets = [0] * len(self.AGE_BUCKETS)
+        stale_bytes = [0]
+        visited = 0
+
+        for root in roots:
+            stack = [self._open(str(root), buckets, stale_bytes)]
+            while stack:
+                frame = stack[-1]
+                if frame[3]:
+                    stack.append(self._open(frame[3].pop(), buckets, stale_bytes))
+                    visited += 1
+                    continue
+
+                path, size, last_used, _subdirs, stale_children = stack.pop()
+                if not last_used:
+                    # Leerer Teilbaum: nur die mtime des Ordners selbst zählt
+                    mtime = _path_mtime(path)
+                    last_used = mtime / 1e9 if mtime else self.now
+                stale = self._is_stale(last_used)
+                if stack:
+                    parent = stack[-1]
+                    parent[1] += size
+                    parent[2] = max(parent[2], last_used)
+                    if stale:
+                        # Der Elternordner entscheidet, ob er selbst veraltet ist -
+                        # gemeldet werden höchstens N, also auch nur N merken
+                        self._push(parent[4], size, path, last_used)
+                        continue
+                elif stale:
+                    self._push(heap, size, path, last_used)
+                    continue
+
+                for child in stale_children:
+                    self._push(heap, *child)
+
+        if span is not None:
+            span.add(entries=visited, bytes=sum(buckets))
+
+        return {
+            'top': [
+                {'path': path, 'size': size, 'last_used': last_used,
+                 'age_days': int((self.now - last_used) / 86400)}
+                for size, path, last_used in sorted(heap, reverse=True)
+            ],
+            'buckets': [(label, buckets[i]) for i, (_limit, label) in enumerate(self.AGE_BUCKETS)],
+            'total': sum(buckets),
+            'stale_bytes': stale_bytes[0],
+        }
+
+
+class TraceSpan:
+    """Ein gemessener Abschnitt mit Zählern (Einträge, Bytes, Subprozess-Zeit)"""
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.counters = {}
+        self.start = 0
+        self.duration = 0
+
+    def add(self, **counters):
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+
+class Tracer:
+    """
+    Sammelt Zeit-Abschnitte (Spans) für Scans, Suchen, Größenberechnung
+    und Deinstallation. Export als Chrome/Perfetto Trace-Event-JSON.
+    """
+
+    MAX_EVENTS = 200000
+
+    def __init__(self):
+        self.events = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter_ns()
+
+    def reset(self):
+        with self._lock:
+            self.events = []
+            self.dropped = 0
+
+    def current(self):
+        """Innerster aktiver Span des aktuellen Threads (oder None)"""
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(self, name, category='scan', **args):
+        span = TraceSpan(name, category, args)
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(span)
+        span.start = time.perf_counter_ns()
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter_ns() - span.start
+            stack.pop()
+            self._add_event(span)
+
+    def _add_event(self, span):
+        event = {
+            'name': span.name,
+            'cat': span.category,
+            'ph': 'X',
+            'ts': (span.start - self._origin) / 1000,
+            'dur': span.duration / 1000,
+            'pid': os.getpid(),
+            'tid': threading.get_native_id(),
+            'args': dict(span.args, **span.counters),
+        }
+        with self._lock:
+            if len(self.events) < self.MAX_EVENTS:
+                self.events.append(event)
+            else:
+                self.dropped += 1
+
+    def export_chrome(self, path):
+        """Schreibt eine Datei für chrome://tracing bzw. ui.perfetto.dev"""
+        with self._lock:
+            events = list(self.events)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                       'otherData': {'dropped_events': self.dropped}}, f)
+
+    def summary(self, category=None, top=5):
+        """Summiert Dauer und Zähler pro Span-Name, langsamste zuerst"""
+        totals = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            if category and event['cat'] != category:
+                continue
+            entry = totals.setdefault(event['name'], {'name': event['name'], 'count': 0, 'seconds': 0.0})
+            entry['count'] += 1
+            entry['seconds'] += event['dur'] / 1e6
+            for key in ('entries', 'bytes', 'subprocess_time'):
+                if key in event['args']:
+                    entry[key] = entry.get(key, 0) + event['args'][key]
+        ranked = sorted(totals.values(), key=lambda e: e['seconds'], reverse=True)
+        return ranked[:top] if top else ranked
+
+    def format_summary(self, category=None, top=3):
+        """Kurzfassung für Statusleiste und Kommandozeile"""
+        return ", ".join(f"{e['name']} {e['seconds']:.2f}s" for e in self.summary(category, top))
+
+
 class PackageScanner(QThread):
     """Thread zum Scannen von Paketen im Hintergrund"""
     finished = pyqtSignal(list)
     progress = pyqtSignal(str)
     
     def __init__(self, cleaner):
-        super().__init__()
+        super().__init__()
+        self.cleaner = cleaner
+    
+    def run(self):
+        """Scannt alle Pakete"""
+        packages = self.cleaner.get_all_packages(progress_callback=self.progress.emit)
+        self.finished.emit(packages)
+
+
+class CommandResult:
+    """Ergebnis eines externen Befehls"""
+
+    def __init__(self, returncode, stdout='', stderr='', timed_out=False):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.timed_out = timed_out
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out
+
+
+class CommandRunner:
+    """
+    Führt Befehle OHNE Shell als Argument-Liste aus.
+    stdout wird zeilenweise an einen Parser gereicht statt komplett gepuffert,
+    jeder Befehl hat sein eigenes Timeout, mehrere Befehle laufen über einen
+    begrenzten Thread-Pool parallel. Ob ein Paketmanager überhaupt installiert
+    ist wird einmal geprüft und zwischengespeichert.
+    """
+
+    # Timeouts pro Programm (Sekunden) - Deinstallationen dürfen länger dauern
+    TIMEOUTS = {
+        'dpkg-query': 30,
+        'flatpak': 60,
+        'snap': 60,
+        'pip': 60,
+        'npm': 120,
+        'sudo': 900,
+    }
+    DEFAULT_TIMEOUT = 30
+
+    def __init__(self, tracer, max_workers=4):
+        self.tracer = tracer
+        self.max_workers = max_workers
+        self._probe_cache = {}
+        self._probe_lock = threading.Lock()
+
+    def available(self, program):
+        """Ist das Programm im PATH? (Ergebnis wird pro PATH zwischengespeichert)"""
+        key = (program, os.environ.get('PATH', ''))
+        with self._probe_lock:
+            if key not in self._probe_cache:
+                self._probe_cache[key] = shutil.which(program) is not None
+            return self._probe_cache[key]
+
+    def warm_up(self, programs):
+        """Prüft alle Programme auf einmal vorab"""
+        return {program: self.available(program) for program in programs}
+
+    def run(self, argv, on_line=None, timeout=None):
+        """
+        Führt argv aus. Mit on_line wird jede stdout-Zeile sofort geparst
+        (und nicht gespeichert), sonst wird stdout gesammelt zurückgegeben.
+        """
+        if timeout is None:
+            timeout = self.TIMEOUTS.get(argv[0], self.DEFAULT_TIMEOUT)
+
+        parent = self.tracer.current()
+        with self.tracer.span(f"exec:{argv[0]}", category='subprocess', command=' '.join(argv)) as span:
+            try:
+                return self._run(argv, on_line, timeout, span)
+            except OSError as e:
+                return CommandResult(127, stderr=str(e))
+            finally:
+                if parent is not None:
+                    parent.add(subprocess_time=(time.perf_counter_ns() - span.start) / 1e9)
+
+    def _run(self, argv, on_line, timeout, span):
+        proc = subprocess.Popen(
+            argv,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors='replace',
+            bufsize=1
+        )
+
+        # stderr parallel lesen, sonst kann der Prozess blockieren
+        stderr_chunks = []
+        stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+        stderr_reader.start()
+
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            proc.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+
+        stdout_lines = []
+        lines = 0
+        try:
+            for line in proc.stdout:
+                lines += 1
+                if on_line is not None:
+                    on_line(line.rstrip('\n'))
+                else:
+                    stdout_lines.append(line)
+            proc.wait()
+        finally:
+            timer.cancel()
+            proc.stdout.close()
+            stderr_reader.join(timeout=5)
+            span.add(entries=lines)
+
+        stderr = ''.join(stderr_chunks)
+        if timed_out.is_set():
+            stderr += f"\nTimeout nach {timeout}s"
+        return CommandResult(proc.returncode, ''.join(stdout_lines), stderr, timed_out.is_set())
+
+    def run_many(self, jobs):
+        """
+        Führt mehrere Aufgaben parallel im begrenzten Pool aus.
+        jobs: Liste von (Funktion, Argumente); Ergebnisse in gleicher Reihenfolge.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(func, *args) for func, args in jobs]
+            return [future.result() for future in futures]
+
+
+class Quarantine:
+    """
+    Quarantäne für Programm-Überreste.
+    Statt rekursiv zu löschen wird jeder Ordner mit EINEM rename() in einen
+    Bereich auf demselben Dateisystem verschoben - egal wie groß er ist.
+    Ein Manifest pro Deinstallation erlaubt das Wiederherstellen,
+    ein Hintergrund-Aufräumer löscht alte Einträge nach Alter und Gesamtgröße.
+    """
+
+    # Name der Quarantäne-Ordner auf anderen Dateisystemen (+ UID)
+    STAGING_PREFIX = '.app_cleaner_quarantine-'
+
+    def __init__(self, home, max_age_days=30, max_bytes=5 * 1024 ** 3):
+        self.base_dir = home / '.local' / 'share' / 'app_cleaner' / 'quarantine'
+        self.manifest_dir = self.base_dir / 'manifests'
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._collector = None
+
+    def _staging_dir(self, path):
+        """Findet einen Quarantäne-Ordner auf demselben Dateisystem wie path"""
+        device = path.lstat().st_dev
+
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        if self.base_dir.stat().st_dev == device:
+            return self.base_dir / 'items'
+
+        # Anderes Dateisystem: Einhängepunkt suchen und dort einen Ordner anlegen
+        mount_point = path.parent
+        while mount_point.parent != mount_point and mount_point.parent.stat().st_dev == device:
+            mount_point = mount_point.parent
+
+        staging = mount_point / f'{self.STAGING_PREFIX}{os.getuid()}'
+        try:
+            staging.mkdir(mode=0o700, exist_ok=True)
+        except OSError:
+            # Kein Schreibrecht (z.B. /etc ohne sudo)
+            return None
+        return staging
+
+    def _write_manifest(self, manifest):
+        """Schreibt ein Manifest atomar"""
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+        target = self.manifest_dir / f"{manifest['id']}.json"
+        tmp = target.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, target)
+
+    def _read_manifest(self, transaction_id):
+        with open(self.manifest_dir / f"{transaction_id}.json") as f:
+            return json.load(f)
+
+    def move_to_quarantine(self, package, package_files):
+        """
+        Verschiebt alle gefundenen Pfade in die Quarantäne.
+        Gibt (transaction_id, moved, errors) zurück. Pfade, für die es auf
+        ihrem Dateisystem keinen beschreibbaren Quarantäne-Ordner gibt,
+        landen in errors und werden NICHT gelöscht.
+        """
+        transaction_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        manifest = {
+            'id': transaction_id,
+            'created': datetime.now().timestamp(),
+            'package': package['name'],
+            'source': package['source'],
+            'entries': []
+        }
+        moved = []
+        errors = []
+
+        # Eltern zuerst - Unterordner sind danach schon mitverschoben
+        try:
+            for index, file_path in enumerate(sorted(package_files)):
+                path = Path(file_path)
+                if not os.path.lexists(path):
+                    continue
+                try:
+                    staging = self._staging_dir(path)
+                    if staging is None:
+                        errors.append(f"Keine Quarantäne auf diesem Dateisystem möglich: {file_path}")
+                        continue
+                    target_dir = staging / transaction_id
+                    target_dir.mkdir(parents=True, exist_ok=True)
+                    target = target_dir / f"{index}_{path.name}"
+                    os.rename(path, target)
+
+                    manifest['entries'].append({
+                        'original': file_path,
+                        'stored': str(target),
+                        'size': package_files[file_path].get('size', 0)
+                    })
+                    moved.append(file_path)
+                except OSError as e:
+                    errors.append(f"Fehler beim Verschieben von {file_path}: {str(e)}")
+        finally:
+            if manifest['entries']:
+                with self._lock:
+                    self._write_manifest(manifest)
+
+        return (transaction_id if moved else None), moved, errors
+
+    def list_transactions(self):
+        """Alle Quarantäne-Einträge, neueste zuerst"""
+        transactions = []
+        if not self.manifest_dir.exists():
+            return transactions
+
+        for manifest_file in self.manifest_dir.glob('*.json'):
+            try:
+                with open(manifest_file) as f:
+                    transactions.append(json.load(f))
+            except (OSError, ValueError):
+                pass
+
+        transactions.sort(key=lambda m: m['created'], reverse=True)
+        return transactions
+
+    def restore(self, transaction_id):
+        """Stellt eine komplette Deinstallation wieder her"""
+        results = {'restored': [], 'errors': []}
+
+        with self._lock:
+            try:
+                manifest = self._read_manifest(transaction_id)
+            except (OSError, ValueError) as e:
+                results['errors'].append(f"Manifest nicht lesbar: {str(e)}")
+                return results
+
+            remaining = []
+            for entry in manifest['entries']:
+                original = Path(entry['original'])
+                try:
+                    if os.path.lexists(original):
+                        raise FileExistsError(f"{original} existiert bereits")
+                    original.parent.mkdir(parents=True, exist_ok=True)
+                    os.rename(entry['stored'], original)
+                    results['restored'].append(entry['original'])
+                except OSError as e:
+                    remaining.append(entry)
+                    results['errors'].append(f"Fehler beim Wiederherstellen von {entry['original']}: {str(e)}")
+
+            if remaining:
+                manifest['entries'] = remaining
+                self._write_manifest(manifest)
+            else:
+                self._remove_transaction(manifest)
+
+        return results
+
+    def _remove_transaction(self, manifest):
+        """Löscht Quarantäne-Dateien und Manifest einer Transaktion endgültig"""
+        for entry in manifest['entries']:
+            stored = Path(entry['stored'])
+            try:
+                if stored.is_dir() and not stored.is_symlink():
+                    shutil.rmtree(stored)
+                elif os.path.lexists(stored):
+                    stored.unlink()
+            except OSError:
+                pass
+            try:
+                stored.parent.rmdir()
+            except OSError:
+                pass
+
+        try:
+            (self.manifest_dir / f"{manifest['id']}.json").unlink()
+        except OSError:
+            pass
+
+    def collect_garbage(self):
+        """Löscht Einträge die zu alt sind bzw. das Größenlimit überschreiten"""
+        with self._lock:
+            transactions = self.list_transactions()
+            cutoff = datetime.now().timestamp() - self.max_age_days * 86400
+            purged = []
+
+            kept = []
+            for manifest in transactions:
+                if manifest['created'] < cutoff:
+                    self._remove_transaction(manifest)
+                    purged.append(manifest['id'])
+                else:
+                    kept.append(manifest)
+
+            # Älteste zuerst löschen bis das Größenlimit passt
+            total = sum(e.get('size', 0) for m in kept for e in m['entries'])
+            while kept and total > self.max_bytes:
+                oldest = kept.pop()
+                total -= sum(e.get('size', 0) for e in oldest['entries'])
+                self._remove_transaction(oldest)
+                purged.append(oldest['id'])
+
+        return purged
+
+    def start_collector(self, interval=3600):
+        """Startet den Aufräumer als Hintergrund-Thread"""
+        if self._collector and self._collector.is_alive():
+            return
+
+        def run():
+            while not self._stop_event.is_set():
+                try:
+                    self.collect_garbage()
+                except Exception:
+                    pass
+                self._stop_event.wait(interval)
+
+        self._stop_event.clear()
+        self._collector = threading.Thread(target=run, name='quarantine-gc', daemon=True)
+        self._collector.start()
+
+    def stop_collector(self):
+        self._stop_event.set()
+
+
+class AuditLog:
+    """
+    Strukturiertes Protokoll als JSON-Lines (~/.app_cleaner_log.jsonl).
+    Einträge werden gepuffert von einem Hintergrund-Thread geschrieben,
+    regelmäßig geflusht und an Transaktionsgrenzen mit fsync gesichert.
+    Die Datei wird nach Größe rotiert (höchstens max_files Rotationen
+    .1 bis .max_files), Rotationen älter als max_age_days werden beim
+    Öffnen und an Transaktionsgrenzen gelöscht.
+    """
+
+    def __init__(self, path, max_bytes=5 * 1024 ** 2, max_files=5,
+                 max_age_days=90, flush_interval=1.0):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.max_age_days = max_age_days
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._file = None
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        # Beim Beenden nichts verlieren was noch im Puffer liegt
+        atexit.register(self.sync, 2)
+
+    def _ensure_writer(self):
+        with self._writer_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name='audit-log', daemon=True)
+                self._writer.start()
+
+    def record(self, action, package=None, path=None, size=None, duration=None, result='ok', **extra):
+        """Fügt einen Eintrag hinzu (blockiert nicht); size steht im Protokoll als 'bytes'"""
+        entry = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'action': action,
+            'package': package,
+            'path': path,
+            'bytes': size,
+            'duration': round(duration, 6) if duration is not None else None,
+            'result': result,
+        }
+        entry.update(extra)
+        self._ensure_writer()
+        self._queue.put(entry)
+
+    def sync(self, timeout=10):
+        """Wartet bis alles geschrieben und per fsync gesichert ist"""
+        done = threading.Event()
+        self._ensure_writer()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    @contextmanager
+    def transaction(self, action, package=None, **extra):
+        """Klammert zusammengehörige Einträge und sichert sie am Ende mit fsync"""
+        started = time.monotonic()
+        self.record(f'{action}_start', package=package, **extra)
+        result = 'ok'
+        try:
+            yield
+        except Exception:
+            result = 'error'
+            raise
+        finally:
+            self.record(f'{action}_end', package=package, duration=time.monotonic() - started,
+                        result=result, **extra)
+            self.sync()
+
+    def _open(self):
+        if self._file is None:
+            self._prune()
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def _prune(self):
+        """Löscht Rotationen, die älter als max_age_days sind"""
+        cutoff = time.time() - self.max_age_days * 86400
+        for rotated in self.rotated_files():
+            try:
+                if rotated.stat().st_mtime < cutoff:
+                    rotated.unlink()
+            except OSError:
+                pass
+
+    def _rotate(self):
+        """Rotiert die Datei wenn sie zu groß ist: .jsonl -> .jsonl.1 -> .jsonl.2 ..."""
+        try:
+            if self.path.stat().st_size < self.max_bytes:
+                return
+        except OSError:
+            return
+
+        if self._file:
+            self._file.close()
+            self._file = None
+
+        # Gleiche Indizes wie rotated_files: .1 (neueste) bis .max_files
+        for index in range(self.max_files, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                if index == self.max_files:
+                    older.unlink()
+                else:
+                    os.replace(older, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+
+    def rotated_files(self):
+        """Rotierte Dateien, älteste zuerst"""
+        files = []
+        for index in range(self.max_files, 0, -1):
+            rotated = self.path.with_name(f"{self.path.name}.{index}")
+            if rotated.exists():
+                files.append(rotated)
+        return files
+
+    def _write(self, lines, fsync=False):
+        try:
+            self._rotate()
+            f = self._open()
+            if lines:
+                f.write(''.join(lines))
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+                # Transaktionsgrenze: auch ohne Rotation alte Dateien aufräumen
+                self._prune()
+        except OSError:
+            # Protokoll darf die eigentliche Arbeit nie verhindern
+            pass
+
+    def _run(self):
+        """Schreib-Thread: sammelt Einträge und schreibt sie blockweise"""
+        buffer = []
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, threading.Event):
+                self._write(buffer, fsync=True)
+                buffer = []
+                last_flush = time.monotonic()
+                item.set()
+                continue
+
+            if item is not None:
+                buffer.append(json.dumps(item, ensure_ascii=False) + '\n')
+
+            if buffer and (len(buffer) >= 1000 or time.monotonic() - last_flush >= self.flush_interval):
+                self._write(buffer)
+                buffer = []
+                last_flush = time.monotonic()
+
+    def query(self, action=None, package=None, result=None, since=None, until=None):
+        """
+        Durchsucht das Protokoll inklusive Rotationen (älteste zuerst).
+        since/until sind datetime-Objekte, action darf ein Präfix sein.
+        """
+        self.sync()
+        since_text = since.isoformat() if since else None
+        until_text = until.isoformat() if until else None
+
+        for log_path in self.rotated_files() + [self.path]:
+            try:
+                f = open(log_path, encoding='utf-8')
+            except OSError:
+                continue
+            with f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if action and not entry.get('action', '').startswith(action):
+                        continue
+                    if package and entry.get('package') != package:
+                        continue
+                    if result and entry.get('result') != result:
+                        continue
+                    if since_text and entry['ts'] < since_text:
+                        continue
+                    if until_text and entry['ts'] > until_text:
+                        continue
+                    yield entry
+
+
+class CleanupPlan:
+    """
+    Ergebnis einer Suche für ein Paket: gefundene Pfade, Größen und Befehle.
+    Wird pro Paket zwischengespeichert, damit Dialog, Zwischenablage, Export,
+    Bestätigung und Deinstallation nicht jedes Mal neu suchen müssen.
+    """
+
+    def __init__(self, package, files, deep, root_mtimes):
+        self.package = package
+        self.files = files
+        self.deep = deep
+        self.root_mtimes = root_mtimes
+        self.created = time.monotonic()
+
+    @property
+    def mode(self):
+        return 'deep' if self.deep else 'quick'
+
+    @property
+    def total_size(self):
+        return sum(info['size'] for info in self.files.values())
+
+    def is_valid(self, ttl):
+        """Günstige Prüfung: Alter und mtime der Such-Wurzeln"""
+        if time.monotonic() - self.created > ttl:
+            return False
+        return all(_path_mtime(root) == mtime for root, mtime in self.root_mtimes.items())
+
+    def uninstall_command(self, thorough=False, assume_yes=False):
+        """Befehl zum Entfernen des Programms selbst"""
+        source = self.package['source']
+        name = self.package['name']
+        yes = " -y" if assume_yes else ""
+
+        if source == 'apt':
+            return f"sudo apt-get {'purge' if thorough else 'remove'}{yes} {name}"
+        elif source == 'flatpak':
+            return f"flatpak uninstall{yes} {self.package.get('id', name)}"
+        elif source == 'snap':
+            return f"sudo snap remove {name}"
+        elif source == 'pip':
+            return f"pip uninstall{yes} {name}"
+        elif source == 'npm':
+            return f"npm uninstall -g {name}"
+        elif source == 'appimage':
+            return f"rm '{self.package.get('path', '')}'"
+        return ""
+
+    def remove_commands(self):
+        """rm-Befehle für alle gefundenen Dateien"""
+        return [f"rm -rf '{path}'" for path in sorted(self.files)]
+
+    def grouped(self):
+        """Gruppiert Funde nach Kategorie (gründlich) bzw. Eltern-Ordner (schnell)"""
+        groups = {}
+        for path, info in self.files.items():
+            group = info.get('category') or os.path.dirname(path)
+            groups.setdefault(group, []).append((path, info))
+        return groups
+
+    def format_report(self):
+        """Klartext-Bericht - wird nur auf Anfrage erzeugt"""
+        name = self.package['name']
+        lines = [
+            f"ANALYSE FÜR: {name}",
+            "=" * 80,
+            "",
+            f"SUCHMODUS: {'🔬 GRÜNDLICH (ganze Festplatte)' if self.deep else '⚡ SCHNELL (normale Orte)'}",
+            f"QUELLE: {self.package['source']}",
+            f"VERSION: {self.package.get('version', 'unknown')}",
+        ]
+
+        if self.package.get('protected', False):
+            lines += ["", "⚠️  WARNUNG: SYSTEMPAKET - NICHT LÖSCHEN!"]
+
+        lines += ["", "=" * 80, "GEFUNDENE DATEIEN UND ORTE:", "=" * 80, ""]
+
+        if not self.files:
+            lines.append("ℹ️  Keine zusätzlichen Dateien gefunden.")
+            if not self.deep:
+                lines += ["", "💡 TIP: Versuche die 'GRÜNDLICHE Suche' für eine vollständige Suche!"]
+            return "\n".join(lines) + "\n"
+
+        for group, items in sorted(self.grouped().items()):
+            lines += [f"📍 {group}:", "-" * 80]
+            for path, info in sorted(items):
+                icon = "📂" if info['type'] == 'directory' else "📄"
+                lines.append(f"{icon} {path}")
+                lines.append(f"   Größe: {info['size'] / (1024 * 1024):.2f} MB")
+
+                if info['type'] == 'directory' and not self.deep:
+                    # Ein einziger Durchlauf: 5 Beispiele merken, Rest nur zählen
+                    samples = []
+                    remaining = 0
+                    try:
+                        with _scandir(path) as entries:
+                            for entry in entries:
+                                if len(samples) < 5:
+                                    samples.append(entry.name)
+                                else:
+                                    remaining += 1
+                    except OSError:
+                        pass
+                    if samples:
+                        lines.append("   Inhalt (Beispiel):")
+                        lines += [f"      • {sample}" for sample in samples]
+                        if remaining:
+                            lines.append(f"      ... und {remaining} weitere")
+            lines.append("")
+
+        total_size = self.total_size
+        lines += [
+            "=" * 80,
+            "ZUSAMMENFASSUNG:",
+            f"  Dateien/Ordner gefunden: {len(self.files)}",
+            f"  Gesamtgröße: {total_size / (1024 * 1024):.2f} MB ({total_size / (1024 * 1024 * 1024):.2f} GB)",
+        ]
+
+        if self.deep:
+            lines += ["", "💡 TIP: Dies sind ALLE gefundenen Spuren auf der Festplatte!",
+                      "    Prüfe genau was du löschen willst."]
+
+        return "\n".join(lines) + "\n"
+
+
+def _intern(value):
+    """Wiederkehrende Strings (Quelle, Version) nur einmal im Speicher halten"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class PackageRecord:
+    """
+    Kompakter Paket-Eintrag mit festen Feldern statt eines dicts pro Paket.
+    Quelle und Version werden interniert. Lesender Zugriff wie bei einem
+    dict (pkg['name'], pkg.get('size'), 'id' in pkg) funktioniert weiterhin,
+    fehlende optionale Felder sind None.
+    """
+
+    FIELDS = ('name', 'version', 'source', 'protected', 'id', 'path', 'size', 'last_used')
+    __slots__ = FIELDS + ('search_name',)
+
+    def __init__(self, name, version=None, source=None, protected=False, id=None, path=None, size=None,
+                 last_used=None):
+        self.name = name
+        self.version = _intern(version)
+        self.source = _intern(source)
+        self.protected = protected
+        self.id = id
+        self.path = path
+        self.size = size
+        self.last_used = last_used
+        # Für die Suche im Filter vorberechnet (meist identisch mit name)
+        lower = name.lower()
+        self.search_name = name if lower == name else lower
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+        if key == 'name':
+            lower = value.lower()
+            self.search_name = value if lower == value else lower
+
+    def __contains__(self, key):
+        return key in self.FIELDS and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.FIELDS else None
+        return default if value is None else value
+
+    def to_dict(self):
+        """dict mit allen gesetzten Feldern (z.B. für JSON)"""
+        return {key: getattr(self, key) for key in self.FIELDS
+                if getattr(self, key) is not None or key in ('name', 'version', 'source', 'protected')}
+
+    def __repr__(self):
+        return f"PackageRecord({self.source}:{self.name} {self.version})"
+
+
+class InventoryExporter:
+    """
+    Schreibt das komplette Inventar zeilenweise als NDJSON, CSV oder SQLite.
+    Jedes Paket wird sofort geschrieben - der Speicherbedarf hängt nicht von
+    der Größe des Inventars ab. Überreste kommen aus dem Plan-Cache oder
+    (mit scan_residue) aus einer schnellen Suche pro Paket.
+    """
+
+    FORMATS = {
+        '.ndjson': 'ndjson',
+        '.jsonl': 'ndjson',
+        '.csv': 'csv',
+        '.sqlite': 'sqlite',
+        '.sqlite3': 'sqlite',
+        '.db': 'sqlite',
+    }
+    CSV_FIELDS = ['source', 'name', 'id', 'version', 'size', 'path', 'protected',
+                  'residue_mode', 'residue_count', 'residue_bytes', 'residue_paths']
+
+    def __init__(self, cleaner):
         self.cleaner = cleaner
-    
-    def run(self):
-        """Scannt alle Pakete"""
-        packages = self.cleaner.get_all_packages(progress_callback=self.progress.emit)
-        self.finished.emit(packages)
+
+    @classmethod
+    def detect_format(cls, path):
+        return cls.FORMATS.get(Path(path).suffix.lower(), 'ndjson')
+
+    def rows(self, packages, scan_residue=False):
+        """Erzeugt pro Paket einen Datensatz (Generator)"""
+        for pkg in packages:
+            if scan_residue:
+                residue = self.cleaner.find_package_files(
+                    pkg['name'], package_source=pkg.get('source'), package_id=pkg.get('id'))
+                mode = 'quick'
+            else:
+                plan = self.cleaner.peek_cleanup_plan(pkg)
+                residue = plan.files if plan else {}
+                mode = plan.mode if plan else None
+
+            yield {
+                'source': pkg['source'],
+                'name': pkg['name'],
+                'id': pkg.get('id'),
+                'version': pkg.get('version'),
+                'size': pkg.get('size'),
+                'path': pkg.get('path'),
+                'protected': bool(pkg.get('protected', False)),
+                'residue_mode': mode,
+                'residue_count': len(residue),
+                'residue_bytes': sum(info['size'] for info in residue.values()),
+                'residue': [
+                    {'path': path, 'type': info['type'], 'size': info['size'], 'category': info.get('category')}
+                    for path, info in residue.items()
+                ],
+            }
+
+    def export(self, packages, target, fmt=None, scan_residue=False, progress_callback=None):
+        """Exportiert nach target ('-' = stdout bei ndjson/csv), gibt Anzahl zurück"""
+        fmt = fmt or self.detect_format(target)
+        rows = self.rows(packages, scan_residue)
+        if progress_callback:
+            rows = self._with_progress(rows, progress_callback)
+
+        if fmt == 'sqlite':
+            return self._export_sqlite(rows, target)
+
+        if target == '-':
+            return self._export_text(rows, sys.stdout, fmt)
+        with open(target, 'w', newline='', encoding='utf-8') as f:
+            return self._export_text(rows, f, fmt)
+
+    @staticmethod
+    def _with_progress(rows, progress_callback):
+        for count, row in enumerate(rows, 1):
+            if count % 500 == 0:
+                progress_callback(f"Exportiere... {count} Pakete")
+            yield row
+
+    def _export_text(self, rows, f, fmt):
+        count = 0
+        if fmt == 'csv':
+            writer = csv.DictWriter(f, fieldnames=self.CSV_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for row in rows:
+                row['residue_paths'] = '|'.join(entry['path'] for entry in row['residue'])
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+                count += 1
+        return count
+
+    def _export_sqlite(self, rows, target):
+        if os.path.exists(target):
+            os.unlink(target)
+        db = sqlite3.connect(target)
+        try:
+            db.executescript("""
+                CREATE TABLE packages (
+                    id INTEGER PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    app_id TEXT,
+                    version TEXT,
+                    size INTEGER,
+                    path TEXT,
+                    protected INTEGER,
+                    residue_mode TEXT,
+                    residue_count INTEGER,
+                    residue_bytes INTEGER
+                );
+                CREATE TABLE residue (
+                    package_id INTEGER NOT NULL REFERENCES packages(id),
+                    path TEXT NOT NULL,
+                    type TEXT,
+                    size INTEGER,
+                    category TEXT
+                );
+            """)
+            count = 0
+            # Eine Transaktion für alles - deutlich schneller als Autocommit
+            with db:
+                for row in rows:
+                    cursor = db.execute(
+                        "INSERT INTO packages (source, name, app_id, version, size, path, protected,"
+                        " residue_mode, residue_count, residue_bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (row['source'], row['name'], row['id'], row['version'], row['size'], row['path'],
+                         int(row['protected']), row['residue_mode'], row['residue_count'], row['residue_bytes'])
+                    )
+                    if row['residue']:
+                        db.executemany(
+                            "INSERT INTO residue (package_id, path, type, size, category) VALUES (?, ?, ?, ?, ?)",
+                            ((cursor.lastrowid, e['path'], e['type'], e['size'], e['category']) for e in row['residue'])
+                        )
+                    count += 1
+            db.execute("CREATE INDEX packages_source ON packages(source)")
+            db.execute("CREATE INDEX residue_package ON residue(package_id)")
+            db.commit()
+        finally:
+            db.close()
+        return count
+
+
+class InventoryHistory:
+    """
+    Verlauf aller Scans in SQLite.
+    Gespeichert wird pro Snapshot nur die Änderung gegenüber dem vorherigen
+    (Delta mit altem und neuem Stand), dazu eine Tabelle mit dem aktuellen
+    Stand. Ein Vergleich zweier Snapshots liest nur die Deltas dazwischen.
+    """
+
+    def __init__(self, home):
+        self.path = home / '.local' / 'share' / 'app_cleaner' / 'history.sqlite'
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @staticmethod
+    def package_key(package):
+        """Stabiler Schlüssel eines Pakets über Scans hinweg"""
+        return f"{package['source']}:{package.get('id') or package.get('path') or package['name']}"
+
+    def _connect(self):
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.path))
+        if not self._ready:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    id INTEGER PRIMARY KEY,
+                    ts TEXT NOT NULL,
+                    package_count INTEGER,
+                    total_size INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS deltas (
+                    snapshot_id INTEGER NOT NULL,
+                    key TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    old_version TEXT,
+                    old_size INTEGER,
+                    new_version TEXT,
+                    new_size INTEGER,
+                    old_present INTEGER NOT NULL,
+                    new_present INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS deltas_snapshot ON deltas(snapshot_id);
+                CREATE TABLE IF NOT EXISTS current (
+                    key TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    version TEXT,
+                    size INTEGER
+                );
+            """)
+            self._ready = True
+        return db
+
+    def record(self, packages):
+        """Speichert einen Snapshot, gibt seine ID und die Anzahl Änderungen zurück"""
+        with self._lock:
+            db = self._connect()
+            try:
+                with db:
+                    previous = {
+                        row[0]: row[1:]
+                        for row in db.execute("SELECT key, source, name, version, size FROM current")
+                    }
+                    cursor = db.execute(
+                        "INSERT INTO snapshots (ts, package_count, total_size) VALUES (?, ?, ?)",
+                        (datetime.now().isoformat(timespec='seconds'), len(packages),
+                         sum(pkg.get('size') or 0 for pkg in packages))
+                    )
+                    snapshot_id = cursor.lastrowid
+
+                    deltas = []
+                    seen = set()
+                    for pkg in packages:
+                        key = self.package_key(pkg)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                        old = previous.get(key)
+                        version, size = pkg.get('version'), pkg.get('size')
+                        if old is None:
+                            deltas.append((snapshot_id, key, pkg['source'], pkg['name'],
+                                           None, None, version, size, 0, 1))
+                        elif old[2] != version or old[3] != size:
+                            deltas.append((snapshot_id, key, pkg['source'], pkg['name'],
+                                           old[2], old[3], version, size, 1, 1))
+                    for key, old in previous.items():
+                        if key not in seen:
+                            deltas.append((snapshot_id, key, old[0], old[1],
+                                           old[2], old[3], None, None, 1, 0))
+
+                    db.executemany("INSERT INTO deltas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", deltas)
+                    for delta in deltas:
+                        if delta[9]:
+                            db.execute("INSERT OR REPLACE INTO current VALUES (?, ?, ?, ?, ?)",
+                                       (delta[1], delta[2], delta[3], delta[6], delta[7]))
+                        else:
+                            db.execute("DELETE FROM current WHERE key = ?", (delta[1],))
+            finally:
+                db.close()
+        return snapshot_id, len(deltas)
+
+    def snapshots(self, limit=None):
+        """Snapshots (id, ts, package_count, total_size), neueste zuerst"""
+        with self._lock:
+            db = self._connect()
+            try:
+                query = "SELECT id, ts, package_count, total_size FROM snapshots ORDER BY id DESC"
+                if limit:
+                    query += f" LIMIT {int(limit)}"
+                return db.execute(query).fetchall()
+            finally:
+                db.close()
+
+    def diff(self, old_id, new_id):
+        """
+        Unterschied zwischen zwei Snapshots: die Deltas dazwischen werden pro
+        Paket zusammengefaltet (erster alter Stand, letzter neuer Stand).
+        """
+        if old_id > new_id:
+            old_id, new_id = new_id, old_id
+
+        folded = {}
+        with self._lock:
+            db = self._connect()
+            try:
+                rows = db.execute(
+                    "SELECT key, source, name, old_version, old_size, new_version, new_size,"
+                    " old_present, new_present FROM deltas"
+                    " WHERE snapshot_id > ? AND snapshot_id <= ? ORDER BY snapshot_id",
+                    (old_id, new_id)
+                )
+                for key, source, name, old_version, old_size, new_version, new_size, old_present, new_present in rows:
+                    entry = folded.get(key)
+                    if entry is None:
+                        folded[key] = [source, name, old_present, old_version, old_size,
+                                       new_present, new_version, new_size]
+                    else:
+                        entry[5:] = [new_present, new_version, new_size]
+            finally:
+                db.close()
+
+        result = {'added': [], 'removed': [], 'upgraded': [], 'size_change': {}}
+        for source, name, old_present, old_version, old_size, new_present, new_version, new_size in folded.values():
+            before = (old_size or 0) if old_present else 0
+            after = (new_size or 0) if new_present else 0
+            if old_present and new_present and (old_size is None or new_size is None):
+                # Größe erst nach der Nutzungsschätzung bekannt - keine Änderung
+                before = after
+            if before != after:
+                result['size_change'][source] = result['size_change'].get(source, 0) + after - before
+
+            if not old_present and new_present:
+                result['added'].append({'source': source, 'name': name, 'version': new_version, 'size': new_size})
+            elif old_present and not new_present:
+                result['removed'].append({'source': source, 'name': name, 'version': old_version, 'size': old_size})
+            elif old_present and new_present and old_version != new_version:
+                result['upgraded'].append({'source': source, 'name': name, 'old_version': old_version,
+                                           'version': new_version, 'size': new_size})
+        return result
+
+    @staticmethod
+    def format_diff(diff):
+        """Klartext eines Vergleichs"""
+        lines = []
+        for title, key in (("Neu installiert", 'added'), ("Entfernt", 'removed'), ("Aktualisiert", 'upgraded')):
+            entries = sorted(diff[key], key=lambda e: (e['source'], e['name']))
+            lines.append(f"{title} ({len(entries)}):")
+            for e in entries:
+                if key == 'upgraded':
+                    lines.append(f"  [{e['source']}] {e['name']}  {e['old_version']} → {e['version']}")
+                else:
+                    lines.append(f"  [{e['source']}] {e['name']}  {e['version'] or ''}")
+            lines.append("")
+
+        lines.append("Größenänderung pro Quelle:")
+        if not diff['size_change']:
+            lines.append("  keine")
+        for source, delta in sorted(diff['size_change'].items()):
+            lines.append(f"  {source:<10} {delta / (1024*1024):+.1f} MB")
+        return "\n".join(lines)
 
 
 class LinuxAppCleaner:
-    def __init__(self):
-        self.home = Path.home()
-        self.log_file = self.home / ".app_cleaner_log.txt"
-        
+    # Wie lange ein Such-Ergebnis wiederverwendet wird (Sekunden)
+    PLAN_TTL = 300
+    # Obergrenze für Einträge einer gründlichen Suche (Rest nur gezählt)
+    deep_search_max_entries = SearchResults.MAX_ENTRIES
+    # Maximale Suchtiefe für AppImages je Ort (0 = nur der Ordner selbst),
+    # z.B. ~/Applications/Kategorie/Programm/x.AppImage; --appimage-depth ORT=N
+    appimage_depths = {
+        'Applications': 3,
+        'Downloads': 2,
+        'opt': 3,
+        '.local/bin': 0,
+    }
+
+    def __init__(self, home=None, system_root=None, user=None, offline=False):
+        # Präfix für System-Pfade (/etc, /usr/share, ...) - z.B. für Benchmarks
+        self.system_root = Path(system_root) if system_root else Path('/')
+        # Offline: fremdes Wurzelverzeichnis (Image, chroot, Container) nur lesen,
+        # keine Programme starten und nichts darin verändern
+        self.offline = offline
+        if home:
+            self.home = Path(home)
+        elif user:
+            self.home = self.resolve_home(user)
+        elif offline:
+            # Nie das Home des laufenden Systems untersuchen - ohne Benutzer root im Image
+            self.home = self.system_path('root')
+        else:
+            self.home = Path.home()
+
+        # Eigene Daten (Protokoll, Quarantäne, Verlauf) nie im untersuchten System ablegen
+        state_home = Path.home() if offline else self.home
+        self.state_home = state_home
+        self.state_dir = state_home / '.local' / 'share' / 'app_cleaner'
+        # Zeitstempel-Caches gelten nur für ein System und ein Home - fremde
+        # Wurzeln (Images, Benchmarks) bekommen einen eigenen Ordner
+        if self.offline or self.system_root != Path('/'):
+            scope = hashlib.blake2b(f"{self.system_root.resolve()}\0{self.home}".encode(), digest_size=8)
+            self.cache_dir = self.state_dir / 'roots' / scope.hexdigest()
+        else:
+            self.cache_dir = self.state_dir
+        self.log_file = state_home / ".app_cleaner_log.jsonl"
+        self.audit = AuditLog(self.log_file)
+        self.quarantine = Quarantine(state_home)
+        self.history = InventoryHistory(state_home)
+        self.appimages = AppImageIndex(self.cache_dir / 'appimages.json', log=self.log)
+        self.dpkg_index = DpkgOwnershipIndex(self.system_path('var/lib/dpkg/info'))
+        self.desktop_index = DesktopEntryIndex(self.cache_dir / 'desktop_index.json', log=self.log)
+        # Starter aller Benutzer (scan_all_users)
+        self.users_desktop_index = DesktopEntryIndex(self.cache_dir / 'desktop_index_users.json', log=self.log)
+        self.usage = UsageEstimator(self.cache_dir / 'usage.json')
+        self._size_cache = {}
+        self._plan_cache = {}
+        self._plan_lock = threading.Lock()
+        # Quelle -> Fingerabdruck beim letzten Sammeln (für patch_inventory)
+        self.source_fingerprints = {}
+        self.tracer = Tracer()
+        self.runner = CommandRunner(self.tracer)
+
         # Kritische Systempakete die NICHT gelöscht werden dürfen
         self.protected_packages = {
             'linux-image', 'linux-headers', 'systemd', 'bash', 'coreutils',
@@ -53,25 +2810,33 @@ class LinuxAppCleaner:
         }
     
     def log(self, message):
-        """Log-Nachricht in Datei schreiben"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(self.log_file, 'a') as f:
-            f.write(f"[{timestamp}] {message}\n")
+        """Freie Log-Nachricht (strukturierte Einträge über self.audit.record)"""
+        self.audit.record('message', message=message)
     
-    def run_command(self, command):
-        """Sicheres Ausführen von Shell-Befehlen"""
-        try:
-            result = subprocess.run(
-                command, 
-                shell=True, 
-                capture_output=True, 
-                text=True,
-                timeout=30
-            )
-            return result.stdout, result.stderr, result.returncode
-        except Exception as e:
-            return "", str(e), 1
+    def run_command(self, argv, on_line=None, timeout=None):
+        """Sicheres Ausführen von Befehlen (ohne Shell, siehe CommandRunner)"""
+        return self.runner.run(argv, on_line=on_line, timeout=timeout)
     
+    def system_path(self, path):
+        """Löst einen System-Pfad relativ zu system_root auf"""
+        return self.system_root / path
+
+    def set_polite(self, enabled, rate=5000):
+        """Schonenden Modus für alle Durchläufe ein-/ausschalten"""
+        set_io_throttle(IOThrottle(rate=rate) if enabled else None)
+
+    @staticmethod
+    def polite_stats():
+        """Statistik des schonenden Modus oder None wenn er aus ist"""
+        return _io_throttle.stats() if _io_throttle is not None else None
+
+    def resolve_home(self, user):
+        """Home-Ordner eines Benutzers laut etc/passwd unter system_root"""
+        for entry in _read_passwd(self.system_path('etc/passwd')):
+            if entry['name'] == user:
+                return self.system_path(entry['home'].lstrip('/'))
+        raise ValueError(f"Benutzer {user} nicht in {self.system_path('etc/passwd')} gefunden")
+
     def is_protected(self, package_name):
         """Prüft ob Paket geschützt ist"""
         package_lower = package_name.lower()
@@ -83,20 +2848,25 @@ class LinuxAppCleaner:
             progress_callback("Scanne apt-Pakete...")
         
         packages = []
-        stdout, _, returncode = self.run_command("dpkg -l | grep '^ii'")
-        
-        if returncode == 0:
-            for line in stdout.split('\n'):
-                parts = line.split()
-                if len(parts) >= 3:
-                    name = parts[1]
-                    version = parts[2]
-                    packages.append({
-                        'name': name,
-                        'version': version,
-                        'source': 'apt',
-                        'protected': self.is_protected(name)
-                    })
+        
+        def parse(line):
+            # Status<TAB>Name<TAB>Version<TAB>Größe in KiB
+            parts = line.split('\t')
+            if len(parts) >= 3 and parts[0].startswith('ii'):
+                name = parts[1]
+                size = parts[3] if len(parts) > 3 else ''
+                packages.append(PackageRecord(
+                    name,
+                    version=parts[2],
+                    source='apt',
+                    size=int(size) * 1024 if size.isdigit() else None,
+                    protected=self.is_protected(name)
+                ))
+        
+        self.run_command(
+            ['dpkg-query', '-W', '-f=${db:Status-Abbrev}\t${Package}\t${Version}\t${Installed-Size}\n'],
+            on_line=parse
+        )
         return packages
     
     def get_flatpak_packages(self, progress_callback=None):
@@ -105,20 +2875,19 @@ class LinuxAppCleaner:
             progress_callback("Scanne Flatpak-Apps...")
         
         packages = []
-        stdout, _, returncode = self.run_command("flatpak list --app --columns=name,application,version")
-        
-        if returncode == 0:
-            for line in stdout.split('\n')[1:]:
-                if line.strip():
-                    parts = line.split('\t')
-                    if len(parts) >= 2:
-                        packages.append({
-                            'name': parts[0],
-                            'id': parts[1] if len(parts) > 1 else parts[0],
-                            'version': parts[2] if len(parts) > 2 else 'unknown',
-                            'source': 'flatpak',
-                            'protected': False
-                        })
+        
+        def parse(line):
+            parts = line.split('\t')
+            # Kopfzeile (nur bei manchen Versionen) überspringen
+            if len(parts) >= 2 and parts[1] != 'Application ID':
+                packages.append(PackageRecord(
+                    parts[0],
+                    id=parts[1],
+                    version=parts[2] if len(parts) > 2 and parts[2] else 'unknown',
+                    source='flatpak'
+                ))
+        
+        self.run_command(['flatpak', 'list', '--app', '--columns=name,application,version'], on_line=parse)
         return packages
     
     def get_snap_packages(self, progress_callback=None):
@@ -127,19 +2896,13 @@ class LinuxAppCleaner:
             progress_callback("Scanne Snap-Apps...")
         
         packages = []
-        stdout, _, returncode = self.run_command("snap list")
-        
-        if returncode == 0:
-            for line in stdout.split('\n')[1:]:
-                if line.strip():
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        packages.append({
-                            'name': parts[0],
-                            'version': parts[1],
-                            'source': 'snap',
-                            'protected': False
-                        })
+        
+        def parse(line):
+            parts = line.split()
+            if len(parts) >= 2 and parts[0] != 'Name':
+                packages.append(PackageRecord(parts[0], version=parts[1], source='snap'))
+        
+        self.run_command(['snap', 'list'], on_line=parse)
         return packages
     
     def get_pip_packages(self, progress_callback=None):
@@ -147,21 +2910,23 @@ class LinuxAppCleaner:
         if progress_callback:
             progress_callback("Scanne pip-Pakete...")
         
+        return self.parse_pip_list(self.run_command(['pip', 'list', '--format=json']).stdout)
+    
+    @staticmethod
+    def parse_pip_list(output):
+        """
+        Ausgabe von 'pip list --format=json'. Anders als das freeze-Format
+        enthält sie auch editierbare und per URL installierte Pakete
+        ('-e ...', 'name @ file://...') mit Name und Version.
+        """
+        try:
+            entries = json.loads(output or '[]')
+        except ValueError:
+            return []
         packages = []
-        stdout, _, returncode = self.run_command("pip list --format=json")
-        
-        if returncode == 0:
-            try:
-                pip_list = json.loads(stdout)
-                for pkg in pip_list:
-                    packages.append({
-                        'name': pkg['name'],
-                        'version': pkg['version'],
-                        'source': 'pip',
-                        'protected': False
-                    })
-            except:
-                pass
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, dict) and entry.get('name'):
+                packages.append(PackageRecord(entry['name'], version=entry.get('version') or 'unknown', source='pip'))
         return packages
     
     def get_npm_packages(self, progress_callback=None):
@@ -170,21 +2935,18 @@ class LinuxAppCleaner:
             progress_callback("Scanne npm-Pakete...")
         
         packages = []
-        stdout, _, returncode = self.run_command("npm list -g --depth=0 --json")
         
-        if returncode == 0:
-            try:
-                npm_data = json.loads(stdout)
-                if 'dependencies' in npm_data:
-                    for name, info in npm_data['dependencies'].items():
-                        packages.append({
-                            'name': name,
-                            'version': info.get('version', 'unknown'),
-                            'source': 'npm',
-                            'protected': False
-                        })
-            except:
-                pass
+        def parse(line):
+            # Format "/pfad/node_modules/name:name@version[:...]"
+            parts = line.split(':')
+            if len(parts) >= 2 and '/node_modules/' in parts[0]:
+                name, sep, version = parts[1].rpartition('@')
+                if sep and name:
+                    packages.append(PackageRecord(name, version=version or 'unknown', source='npm'))
+        
+        # npm beendet sich bei Abhängigkeits-Warnungen mit Fehlercode,
+        # die gelesenen Zeilen sind trotzdem gültig
+        self.run_command(['npm', 'ls', '-g', '--depth=0', '--parseable', '--long'], on_line=parse)
         return packages
     
     def get_appimages(self, progress_callback=None):
@@ -193,41 +2955,542 @@ class LinuxAppCleaner:
             progress_callback("Scanne AppImages...")
         
         packages = []
-        search_paths = [
-            self.home / 'Applications',
-            self.home / 'Downloads',
-            Path('/opt'),
-            self.home / '.local' / 'bin'
+        span = self.tracer.current()
+        for path, size in self.appimages.discover(self.get_appimage_search_paths(), span):
+            name = os.path.basename(path)
+            if name.lower().endswith('.appimage'):
+                name = name[:-len('.appimage')]
+            packages.append(PackageRecord(name, version='AppImage', source='appimage', path=path, size=size))
+        return packages
+
+    def get_appimage_search_paths(self):
+        """Orte für AppImages mit maximaler Suchtiefe"""
+        depths = self.appimage_depths
+        return [
+            (self.home / 'Applications', depths['Applications']),
+            (self.home / 'Downloads', depths['Downloads']),
+            (self.system_path('opt'), depths['opt']),
+            (self.home / '.local' / 'bin', depths['.local/bin']),
         ]
+    
+    def read_dpkg_status(self, progress_callback=None):
+        """apt-Pakete direkt aus var/lib/dpkg/status (ohne dpkg-query)"""
+        if progress_callback:
+            progress_callback("Lese dpkg-Status...")
         
-        for search_path in search_paths:
-            if search_path.exists():
-                for appimage in search_path.rglob('*.AppImage'):
-                    packages.append({
-                        'name': appimage.stem,
-                        'path': str(appimage),
-                        'version': 'AppImage',
-                        'source': 'appimage',
-                        'protected': False
-                    })
+        packages = []
+        fields = {}
+        
+        def flush():
+            if fields.get('Status', '').endswith(' installed') and 'Package' in fields:
+                name = fields['Package']
+                size = fields.get('Installed-Size', '')
+                packages.append(PackageRecord(
+                    name,
+                    version=fields.get('Version'),
+                    source='apt',
+                    size=int(size) * 1024 if size.isdigit() else None,
+                    protected=self.is_protected(name)
+                ))
+            fields.clear()
+        
+        try:
+            with open(self.system_path('var/lib/dpkg/status'), encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if line == '\n':
+                        flush()
+                    elif not line[0].isspace():
+                        key, sep, value = line.partition(':')
+                        if sep and key in ('Package', 'Status', 'Version', 'Installed-Size'):
+                            fields[key] = value.strip()
+            flush()
+        except OSError:
+            pass
+        return packages
+    
+    @staticmethod
+    def _read_metainfo(app_dir, app_id):
+        """Name und Version aus der AppStream-Datei einer Flatpak-App"""
+        for name in (f'{app_id}.metainfo.xml', f'{app_id}.appdata.xml'):
+            for folder in ('metainfo', 'appdata'):
+                try:
+                    with open(app_dir / 'files' / 'share' / folder / name, encoding='utf-8', errors='replace') as f:
+                        text = f.read(256 * 1024)
+                except OSError:
+                    continue
+                title = re.search(r'<name>([^<]+)</name>', text)
+                release = re.search(r'<release[^>]*\bversion="([^"]+)"', text)
+                return (title.group(1).strip() if title else None), (release.group(1) if release else None)
+        return None, None
+    
+    def read_flatpak_metadata(self, progress_callback=None):
+        """Flatpak-Apps aus den Installationsordnern (System und Benutzer)"""
+        if progress_callback:
+            progress_callback("Lese Flatpak-Installationen...")
+        
+        packages = []
+        seen = set()
+        for installation in (self.system_path('var/lib/flatpak/app'), self.home / '.local' / 'share' / 'flatpak' / 'app'):
+            try:
+                app_ids = sorted(os.listdir(installation))
+            except OSError:
+                continue
+            for app_id in app_ids:
+                active = installation / app_id / 'current' / 'active'
+                if app_id in seen or not (active / 'metadata').is_file():
+                    continue
+                seen.add(app_id)
+                title, version = self._read_metainfo(active, app_id)
+                packages.append(PackageRecord(
+                    title or app_id.rsplit('.', 1)[-1],
+                    id=app_id,
+                    version=version or 'unknown',
+                    source='flatpak'
+                ))
+        return packages
+    
+    def read_snap_metadata(self, progress_callback=None):
+        """Snaps aus var/lib/snapd/snaps und snap/<name>/current/meta/snap.yaml"""
+        if progress_callback:
+            progress_callback("Lese Snap-Installationen...")
+        
+        revisions = {}
+        for snap_file in glob.glob(str(self.system_path('var/lib/snapd/snaps/*.snap'))):
+            name, sep, revision = os.path.basename(snap_file)[:-len('.snap')].rpartition('_')
+            if sep:
+                revisions.setdefault(name, []).append(revision)
+        
+        packages = []
+        for name in sorted(revisions):
+            snap_dir = self.system_path('snap') / name
+            try:
+                current = os.readlink(snap_dir / 'current')
+            except OSError:
+                current = max(revisions[name], key=lambda r: (r.isdigit(), int(r) if r.isdigit() else 0))
+            version = None
+            try:
+                with open(snap_dir / current / 'meta' / 'snap.yaml', encoding='utf-8', errors='replace') as f:
+                    for line in f:
+                        if line.startswith('version:'):
+                            version = line.split(':', 1)[1].strip().strip('\'"')
+                            break
+            except OSError:
+                pass
+            packages.append(PackageRecord(name, version=version or f"r{current}", source='snap'))
+        return packages
+    
+    def get_python_site_dirs(self):
+        """site-/dist-packages-Ordner des Systems und des Benutzers"""
+        patterns = [
+            str(self.system_path('usr/lib/python3/dist-packages')),
+            str(self.system_path('usr/lib/python3*/site-packages')),
+            str(self.system_path('usr/local/lib/python3*/dist-packages')),
+            str(self.system_path('usr/local/lib/python3*/site-packages')),
+            str(self.home / '.local' / 'lib' / 'python3*' / 'site-packages'),
+        ]
+        return [site_dir for pattern in patterns for site_dir in sorted(glob.glob(pattern))]
+
+    def get_npm_roots(self):
+        """Globale node_modules-Ordner"""
+        return [
+            self.system_path('usr/lib/node_modules'),
+            self.system_path('usr/local/lib/node_modules'),
+            self.home / '.npm-global' / 'lib' / 'node_modules',
+            self.home / '.local' / 'lib' / 'node_modules',
+        ]
+
+    def find_python_dists(self, name):
+        """*.dist-info-/*.egg-info-Ordner eines Python-Pakets in allen site-Ordnern"""
+        stem = re.sub(r'[-_.]+', '_', name).lower()
+        found = []
+        for site_dir in self.get_python_site_dirs():
+            try:
+                entries = os.listdir(site_dir)
+            except OSError:
+                continue
+            found += [Path(site_dir) / entry for entry in entries
+                      if entry.endswith(('.dist-info', '.egg-info'))
+                      and re.sub(r'[-_.]+', '_', entry.rpartition('.')[0].partition('-')[0]).lower() == stem]
+        return found
+
+    def read_python_metadata(self, progress_callback=None):
+        """Python-Pakete aus den *.dist-info-Ordnern der site-/dist-packages"""
+        if progress_callback:
+            progress_callback("Lese Python-Pakete...")
+        
+        packages = []
+        seen = set()
+        for site_dir in self.get_python_site_dirs():
+            try:
+                names = os.listdir(site_dir)
+            except OSError:
+                continue
+            for entry in names:
+                stem, dot, suffix = entry.rpartition('.')
+                if suffix not in ('dist-info', 'egg-info'):
+                    continue
+                name, sep, version = stem.partition('-')
+                version = version.split('-py')[0]
+                if name.lower() in seen:
+                    continue
+                seen.add(name.lower())
+                packages.append(PackageRecord(name, version=version or 'unknown', source='pip'))
+        return packages
+    
+    def read_npm_metadata(self, progress_callback=None):
+        """Globale npm-Pakete aus den node_modules-Ordnern (package.json)"""
+        if progress_callback:
+            progress_callback("Lese npm-Pakete...")
+        
+        packages = []
+        for root in self.get_npm_roots():
+            try:
+                entries = sorted(os.listdir(root))
+            except OSError:
+                continue
+            package_dirs = []
+            for entry in entries:
+                if entry.startswith('@'):
+                    try:
+                        package_dirs.extend(root / entry / sub for sub in sorted(os.listdir(root / entry)))
+                    except OSError:
+                        pass
+                elif not entry.startswith('.'):
+                    package_dirs.append(root / entry)
+            for package_dir in package_dirs:
+                try:
+                    with open(package_dir / 'package.json', encoding='utf-8') as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                packages.append(PackageRecord(
+                    meta.get('name') or package_dir.name,
+                    version=meta.get('version') or 'unknown',
+                    source='npm'
+                ))
         return packages
     
+    def get_collectors(self):
+        """(Quelle, Sammel-Funktion, benötigtes Programm) für alle Paketquellen"""
+        if self.offline:
+            # Nur Dateien lesen - nie Programme aus dem fremden System starten
+            return [
+                ('apt', self.read_dpkg_status, None),
+                ('flatpak', self.read_flatpak_metadata, None),
+                ('snap', self.read_snap_metadata, None),
+                ('pip', self.read_python_metadata, None),
+                ('npm', self.read_npm_metadata, None),
+                ('appimage', self.get_appimages, None),
+            ]
+        return [
+                ('apt', self.get_apt_packages, 'dpkg-query'),
+                ('flatpak', self.get_flatpak_packages, 'flatpak'),
+                ('snap', self.get_snap_packages, 'snap'),
+                ('pip', self.get_pip_packages, 'pip'),
+                ('npm', self.get_npm_packages, 'npm'),
+                ('appimage', self.get_appimages, None),
+        ]
+
+    def get_source_state_paths(self, source):
+        """Dateien/Ordner, deren mtime sich bei (De-)Installationen einer Quelle ändert"""
+        if source == 'apt':
+            return [self.system_path('var/lib/dpkg/status')]
+        if source == 'flatpak':
+            return [self.system_path('var/lib/flatpak/app'), self.home / '.local' / 'share' / 'flatpak' / 'app']
+        if source == 'snap':
+            return [self.system_path('var/lib/snapd/snaps')]
+        if source == 'pip':
+            # Online fragt 'pip list' evtl. einen anderen Interpreter - dann immer neu lesen
+            return self.get_python_site_dirs() if self.offline else []
+        if source == 'npm':
+            return self.get_npm_roots()
+        if source == 'appimage':
+            return [path for path, _depth in self.get_appimage_search_paths()]
+        return []
+
+    def source_fingerprint(self, source):
+        """Günstiger Zustands-Fingerabdruck einer Quelle (nur stat-Aufrufe)"""
+        return tuple(_path_mtime(path) for path in self.get_source_state_paths(source))
+
+    def dpkg_installed(self, name):
+        """
+        Status laut var/lib/dpkg/status (None = nicht lesbar). Die .list-Datei
+        reicht nicht: Pakete im Zustand 'rc' (entfernt, Configs noch da) behalten sie.
+        """
+        name = name.split(':', 1)[0]
+        package = None
+        try:
+            with open(self.system_path('var/lib/dpkg/status'), encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if line.startswith('Package:'):
+                        package = line[8:].strip()
+                    elif package == name and line.startswith('Status:') and line.rstrip().endswith(' installed'):
+                        # Bei Multi-Arch reicht eine installierte Architektur
+                        return True
+        except OSError:
+            return None
+        return False
+
+    def is_installed(self, package):
+        """Schnelle Prüfung auf der Platte, ob ein Paket noch da ist (None = nicht feststellbar)"""
+        source = package['source']
+        name = package['name']
+        if source == 'apt':
+            return self.dpkg_installed(name)
+        if source == 'flatpak':
+            app_id = package.get('id', name)
+            return any((installation / app_id / 'current').exists()
+                       for installation in (self.system_path('var/lib/flatpak/app'),
+                                            self.home / '.local' / 'share' / 'flatpak' / 'app'))
+        if source == 'snap':
+            return os.path.lexists(self.system_path('snap') / name / 'current') or \
+                bool(glob.glob(str(self.system_path('var/lib/snapd/snaps') / f"{glob.escape(name)}_*.snap")))
+        if source == 'pip':
+            if self.find_python_dists(name):
+                return True
+            return False if self.offline else None
+        if source == 'npm':
+            return any((root / name).exists() for root in self.get_npm_roots())
+        if source == 'appimage':
+            return bool(package.get('path')) and os.path.exists(package['path'])
+        return None
+
+    def _collect(self, source, collector, progress_callback=None):
+        """Eine Quelle sammeln; der Fingerabdruck wird VOR dem Sammeln genommen"""
+        fingerprint = self.source_fingerprint(source)
+        with self.tracer.span(source, category='collect') as span:
+            packages = collector(progress_callback)
+            span.add(entries=len(packages))
+        self.source_fingerprints[source] = fingerprint
+        return packages
+
     def get_all_packages(self, progress_callback=None):
         """Sammelt alle installierten Programme"""
         all_packages = []
+        collectors = self.get_collectors()
+        
+        def collect(source, collector):
+            return self._collect(source, collector, progress_callback)
         
-        all_packages.extend(self.get_apt_packages(progress_callback))
-        all_packages.extend(self.get_flatpak_packages(progress_callback))
-        all_packages.extend(self.get_snap_packages(progress_callback))
-        all_packages.extend(self.get_pip_packages(progress_callback))
-        all_packages.extend(self.get_npm_packages(progress_callback))
-        all_packages.extend(self.get_appimages(progress_callback))
+        with self.tracer.span('get_all_packages', category='scan'):
+            # Nicht installierte Paketmanager gar nicht erst starten
+            available = self.runner.warm_up([program for _, _, program in collectors if program])
+            jobs = [
+                (collect, (source, collector))
+                for source, collector, program in collectors
+                if program is None or available[program]
+            ]
+            for packages in self.runner.run_many(jobs):
+                all_packages.extend(packages)
         
         return all_packages
+
+    EXECUTABLE_DIRS = ('/usr/bin/', '/usr/sbin/', '/usr/games/', '/bin/', '/sbin/', '/usr/local/bin/')
+
+    @staticmethod
+    def usage_key(package):
+        return f"{package['source']}:{package.get('id') or package['name']}"
+
+    def usage_candidates(self, package):
+        """Pfade, deren Zeitstempel die letzte Benutzung verraten: [(pfad, signal, atime_zählt)]"""
+        name = package['name']
+        source = package['source']
+        candidates = []
+        for variant in dict.fromkeys((name, name.lower())):
+            candidates += [
+                (self.home / '.config' / variant, 'config', False),
+                (self.home / '.cache' / variant, 'cache', False),
+                (self.home / '.local' / 'share' / variant, 'data', False),
+                (self.home / f'.{variant}', 'config', False),
+            ]
+
+        if source == 'apt':
+            executables = [path for path in self.dpkg_index.paths_of(name) if path.startswith(self.EXECUTABLE_DIRS)]
+            candidates += [(self.system_path(path.lstrip('/')), 'programm', True) for path in executables[:20]]
+        elif source == 'flatpak' and package.get('id'):
+            app_dir = self.home / '.var' / 'app' / package['id']
+            candidates += [(app_dir, 'data', False)]
+            candidates += [(app_dir / sub, sub, False) for sub in ('config', 'cache', 'data')]
+        elif source == 'snap':
+            candidates += [
+                (self.home / 'snap' / name, 'data', False),
+                (self.home / 'snap' / name / 'common', 'data', False),
+                (self.system_path('var/snap') / name / 'common', 'data', False),
+            ]
+        elif source == 'appimage' and package.get('path'):
+            # Die atime zählt nur, wenn die Erkennung sie nicht selbst gesetzt hat
+            try:
+                use_atime = AppImageIndex.keeps_atime(os.stat(package['path']))
+            except OSError:
+                use_atime = False
+            candidates.append((package['path'], 'programm', use_atime))
+
+        starters = self.desktop_index.lookup(self.get_search_terms(name, source, package.get('id')),
+                                             path=package.get('path'))
+        candidates += [(path, 'starter', False) for path in starters['launcher'] + starters['autostart']]
+        return candidates
+
+    @staticmethod
+    def _record_size(dist_dir):
+        """Summe der Größen-Spalte aus RECORD (ohne die Dateien anzufassen) oder None"""
+        total = 0
+        try:
+            with open(dist_dir / 'RECORD', encoding='utf-8', errors='replace', newline='') as f:
+                for row in csv.reader(f):
+                    if len(row) >= 3 and row[2].isdigit():
+                        total += int(row[2])
+        except OSError:
+            return None
+        return total
+
+    def package_size(self, package):
+        """Platzbedarf von Quellen ohne Größenangabe im Paketmanager (None = unbekannt)"""
+        source = package['source']
+        name = package['name']
+        if source == 'flatpak':
+            for installation in (self.system_path('var/lib/flatpak/app'),
+                                 self.home / '.local' / 'share' / 'flatpak' / 'app'):
+                active = installation / package.get('id', name) / 'current' / 'active'
+                if active.exists():
+                    # Deploy-Ordner der aktiven Version
+                    return _dir_size(os.path.realpath(active))
+            return None
+        if source == 'snap':
+            snaps = self.system_path('var/lib/snapd/snaps')
+            try:
+                snap_files = [str(snaps / f"{name}_{os.readlink(self.system_path('snap') / name / 'current')}.snap")]
+            except OSError:
+                snap_files = glob.glob(str(snaps / f"{glob.escape(name)}_*.snap"))
+            total = 0
+            for snap_file in snap_files:
+                try:
+                    total += os.stat(snap_file).st_size
+                except OSError:
+                    pass
+            # Daten der Revisionen unter var/snap und ~/snap
+            total += _dir_size(self.system_path('var/snap') / name) + _dir_size(self.home / 'snap' / name)
+            return total or None
+        if source == 'pip':
+            for dist_dir in self.find_python_dists(name):
+                size = self._record_size(dist_dir)
+                if size is None:
+                    # egg-info ohne RECORD: Paketordner daneben
+                    size = _dir_size(dist_dir.parent / re.sub(r'[-.]+', '_', name).lower())
+                if size:
+                    return size
+            return None
+        if source == 'npm':
+            for root in self.get_npm_roots():
+                if (root / name).is_dir():
+                    return _dir_size(root / name)
+            return None
+        return None
+
+    def estimate_sizes(self, packages):
+        """Trägt pkg.size für Flatpak/Snap/pip/npm nach (parallel, pro Sitzung zwischengespeichert)"""
+        todo = []
+        for pkg in packages:
+            if pkg.get('size') is not None or pkg['source'] not in ('flatpak', 'snap', 'pip', 'npm'):
+                continue
+            key = (self._inventory_key(pkg), pkg.get('version'))
+            if key in self._size_cache:
+                pkg['size'] = self._size_cache[key]
+            else:
+                todo.append((key, pkg))
+        with self.tracer.span('sizes', category='usage') as span:
+            with _walk_executor(8) as executor:
+                for (key, pkg), size in zip(todo, executor.map(lambda item: self.package_size(item[1]), todo)):
+                    pkg['size'] = self._size_cache[key] = size
+            span.add(entries=len(todo))
+
+    def estimate_usage(self, packages, force=False):
+        """Setzt pkg.last_used (und fehlende Größen) für alle Pakete (ein gebündelter Durchlauf, zwischengespeichert)"""
+        self.estimate_sizes(packages)
+        with self.tracer.span('usage', category='usage') as span:
+            self.dpkg_index.refresh()
+            self.desktop_index.refresh(self.get_desktop_index_roots())
+            candidates = {self.usage_key(pkg): self.usage_candidates(pkg) for pkg in packages}
+            results = self.usage.estimate(candidates, force=force, span=span)
+        for pkg in packages:
+            pkg['last_used'] = results.get(self.usage_key(pkg), (None, None))[0]
+        return results
+
+    @staticmethod
+    def removal_score(package, now=None):
+        """Unbenutzte Tage × Größe - je größer, desto besser zum Aufräumen (-1 = unbekannt)"""
+        if package.get('last_used') is None:
+            return -1
+        days = max(0.0, ((now or time.time()) - package['last_used']) / 86400)
+        return days * (package.get('size') or 0)
+
+    @staticmethod
+    def _inventory_key(package):
+        return (package['source'], package['name'], package.get('id'), package.get('path'))
+
+    def patch_inventory(self, packages, package):
+        """
+        Nach einer Deinstallation nur die betroffene Quelle abgleichen statt
+        alle Sammler neu zu starten. Hat sich ihr Fingerabdruck seit dem Scan
+        nicht geändert, wird nur das Paket selbst geprüft, sonst (oder ohne
+        Fingerabdruck) wird genau diese Quelle neu gelesen - so fallen auch
+        von apt mitentfernte Abhängigkeiten auf.
+        packages bleibt unverändert; Ergebnis für apply_inventory_changes:
+        {'removed': [...], 'added': [...], 'updated': [(alt, neu)]}
+        """
+        source = package['source']
+        current = [pkg for pkg in packages if pkg['source'] == source]
+        with self.tracer.span('patch_inventory', category='scan', source=source) as span:
+            fingerprint = self.source_fingerprint(source)
+            if fingerprint and fingerprint == self.source_fingerprints.get(source):
+                fresh = [pkg for pkg in current if pkg is not package or self.is_installed(pkg) is not False]
+            else:
+                collector = next((collector for name, collector, program in self.get_collectors()
+                                  if name == source), None)
+                fresh = self._collect(source, collector) if collector else current
+            span.add(entries=len(fresh))
+
+        old = {}
+        for pkg in current:
+            old.setdefault(self._inventory_key(pkg), []).append(pkg)
+        changes = {'removed': [], 'added': [], 'updated': []}
+        for pkg in fresh:
+            matches = old.get(self._inventory_key(pkg))
+            if not matches:
+                changes['added'].append(pkg)
+                continue
+            previous = matches.pop(0)
+            if pkg is previous:
+                continue
+            # Flatpak/Snap/pip/npm liefern keine Größe - die geschätzte bleibt gültig
+            if pkg['version'] != previous['version'] or \
+                    (pkg.get('size') is not None and pkg['size'] != previous.get('size')):
+                changes['updated'].append((previous, pkg))
+        for matches in old.values():
+            changes['removed'].extend(matches)
+        return changes
+
+    @staticmethod
+    def apply_inventory_changes(packages, changes):
+        """Übernimmt ein Ergebnis von patch_inventory in die Paketliste (in-place)"""
+        removed = {id(pkg) for pkg in changes['removed']}
+        packages[:] = [pkg for pkg in packages if id(pkg) not in removed]
+        for previous, pkg in changes['updated']:
+            # Der alte Eintrag bleibt, Größe und letzte Benutzung nur ersetzen wenn neu bekannt
+            previous['version'] = pkg['version']
+            if pkg.get('size') is not None:
+                previous['size'] = pkg['size']
+            if pkg.get('last_used') is not None:
+                previous['last_used'] = pkg['last_used']
+        packages.extend(changes['added'])
+
+    def dir_size(self, path):
+        """Größe eines Ordners - jede Berechnung wird als Span protokolliert"""
+        with self.tracer.span('size', category='size', path=str(path)) as span:
+            return _dir_size(path, span)
     
-    def find_package_files(self, package_name, package_source=None, package_id=None):
-        """Findet alle Dateien die zu einem Programm gehören"""
-        
+    def get_quick_search_dirs(self, package_name, package_source=None, package_id=None):
+        """Typische Orte für Config, Cache und Daten eines Programms"""
+
         # Basis-Verzeichnisse für normale Programme
         config_dirs = [
             self.home / '.config' / package_name,
@@ -264,13 +3527,29 @@ class LinuxAppCleaner:
             if snap_dir.exists():
                 data_dirs.append(snap_dir)
         
-        all_dirs = config_dirs + cache_dirs + data_dirs
-        
+        return config_dirs + cache_dirs + data_dirs
+
+    def is_excluded(self, path):
+        """
+        Eigene Daten (Protokoll-/Index-Ordner, Quarantäne) sind nie Überreste
+        eines Programms - sonst würde eine spätere Suche die einzige
+        wiederherstellbare Kopie finden und gründlich löschen.
+        """
+        path = str(path)
+        for excluded in (str(self.state_dir), str(self.quarantine.base_dir)):
+            if path == excluded or path.startswith(excluded + '/'):
+                return True
+        return Quarantine.STAGING_PREFIX in path
+
+    def find_package_files(self, package_name, package_source=None, package_id=None):
+        """Findet alle Dateien die zu einem Programm gehören"""
+        all_dirs = self.get_quick_search_dirs(package_name, package_source, package_id)
+
         found_files = {}
         for dir_path in all_dirs:
-            if dir_path.exists():
+            if dir_path.exists() and not self.is_excluded(dir_path):
                 try:
-                    size = sum(f.stat().st_size for f in dir_path.rglob('*') if f.is_file())
+                    size = self.dir_size(dir_path)
                     # Nur hinzufügen wenn größer als 0
                     if size > 0:
                         found_files[str(dir_path)] = {
@@ -283,14 +3562,230 @@ class LinuxAppCleaner:
         
         return found_files
     
-    def deep_search_files(self, package_name, package_source=None, package_id=None, progress_callback=None):
-        """
-        GRÜNDLICHE Suche: Durchsucht die GESAMTE Festplatte nach allen Spuren
-        Dies kann mehrere Minuten dauern!
+    def get_deep_search_paths(self, home=None):
+        """Wichtige Suchpfade für die gründliche Suche (sortiert nach Wichtigkeit)"""
+        home = home or self.home
+        return [
+            # Benutzer-Daten (am wichtigsten)
+            (home / '.config', 'Config'),
+            (home / '.cache', 'Cache'),
+            (home / '.local' / 'share', 'Daten'),
+            (home / '.local' / 'state', 'Status'),
+            
+            # Flatpak & Snap
+            (home / '.var' / 'app', 'Flatpak'),
+            (home / 'snap', 'Snap'),
+            
+            # Desktop-Integration
+            (home / '.local' / 'share' / 'applications', 'Desktop-Dateien'),
+            (home / '.local' / 'share' / 'icons', 'Icons'),
+            (self.system_path('usr/share/applications'), 'System-Desktop-Dateien'),
+            (self.system_path('usr/share/icons'), 'System-Icons'),
+            
+            # Autostart
+            (home / '.config' / 'autostart', 'Autostart'),
+            
+            # Versteckte Dateien im Home
+            (home, 'Home-Dotfiles'),
+            
+            # Temporäre Dateien
+            (self.system_path('tmp'), 'Temp'),
+            (self.system_path('var/tmp'), 'Var-Temp'),
+            
+            # System-Configs (nur lesbar mit sudo)
+            (self.system_path('etc'), 'System-Config'),
+            
+            # Logs
+            (home / '.local' / 'share' / 'systemd', 'User-Logs'),
+            (self.system_path('var/log'), 'System-Logs'),
+            
+            # Weitere mögliche Orte
+            (home / 'Applications', 'Applications'),
+            (home / 'Downloads', 'Downloads'),
+            (home / '.wine', 'Wine'),
+            (self.system_path('opt'), 'Optional-Apps'),
+        ]
+
+    def get_duplicate_search_roots(self):
+        """Orte an denen sich typischerweise doppelte Dateien sammeln"""
+        roots = [
+            self.home / '.cache',
+            self.home / '.local' / 'share',
+            self.home / 'Downloads',
+        ]
+        roots.extend(sorted((self.home / '.var' / 'app').glob('*/cache')))
+        return [root for root in roots if root.is_dir()]
+
+    def find_duplicates(self, roots=None, min_size=4096, progress_callback=None):
+        """Doppelte Dateien in Cache- und Datenordnern"""
+        finder = DuplicateFinder(min_size=min_size, exclude=self.is_excluded)
+        return _run_walk(finder.find, roots or self.get_duplicate_search_roots(),
+                         tracer=self.tracer, progress_callback=progress_callback)
+
+    def get_python_env_search_paths(self):
+        """Orte für virtuelle Umgebungen mit maximaler Suchtiefe"""
+        return [
+            (self.home, 6),
+            (self.system_path('opt'), 2),
+        ]
+
+    def find_python_envs(self, roots=None):
+        """Alle venv-, tox-, Poetry-, pipx- und conda-Umgebungen"""
+        if roots is None:
+            roots = self.get_python_env_search_paths()
+        return _run_walk(PythonEnvFinder().find, roots, tracer=self.tracer)
+
+    def remove_python_env(self, env, mode='quarantine'):
+        """Entfernt eine Umgebung als Ganzes (Quarantäne oder endgültig)"""
+        results = {'success': False, 'quarantine_id': None, 'errors': []}
+        if self.offline:
+            results['errors'].append(f"Offline-Modus ({self.system_root}): nur Analyse, keine Änderungen")
+            return results
+        package = PackageRecord(env['name'], version=env.get('interpreter'), source='venv', path=env['path'])
+        files = {env['path']: {'type': 'directory', 'size': env.get('size', 0)}}
+
+        with self.audit.transaction('remove_env', env['name'], path=env['path'], mode=mode):
+            started = time.monotonic()
+            if mode == 'quarantine':
+                transaction_id, moved, errors = self.quarantine.move_to_quarantine(package, files)
+                results['quarantine_id'] = transaction_id
+                results['errors'].extend(errors)
+                results['success'] = bool(moved)
+                action = 'quarantine'
+            else:
+                try:
+                    shutil.rmtree(env['path'])
+                    results['success'] = True
+                except OSError as e:
+                    results['errors'].append(f"Fehler beim Löschen von {env['path']}: {str(e)}")
+                action = 'delete'
+            self.audit.record(action, package=env['name'], path=env['path'], size=env.get('size'),
+                              duration=time.monotonic() - started,
+                              result='ok' if results['success'] else 'error',
+                              transaction=results['quarantine_id'])
+        return results
+
+    def get_runtime_reclaimer(self):
+        return RuntimeReclaimer(
+            [(self.system_path('var/lib/flatpak'), 'system'),
+             (self.home / '.local' / 'share' / 'flatpak', 'user')],
+            self.system_path('var/lib/snapd/snaps'),
+            self.system_path('snap'),
+            self.system_path('var/snap'),
+        )
+
+    def find_reclaimable(self):
+        """Unbenutzte Flatpak-Runtimes/Extensions und alte Snap-Revisionen"""
+        with self.tracer.span('reclaim:analyze', category='reclaim') as span:
+            return self.get_runtime_reclaimer().analyze(span)
+
+    def reclaim(self, items):
         """
-        found_files = {}
-        
-        # Verschiedene Schreibweisen des Programmnamens
+        Entfernt Einträge aus find_reclaimable() - eine Protokoll-Transaktion
+        pro Paketverwaltung (Flatpak: ein Aufruf pro Installation). Als entfernt
+        zählt ein Eintrag erst, wenn sein Pfad wirklich weg ist - der Exit-Code
+        eines Sammel-Aufrufs sagt nichts über die einzelnen Refs.
+        """
+        results = {'removed': [], 'freed': 0, 'errors': []}
+        if self.offline:
+            results['errors'].append(f"Offline-Modus ({self.system_root}): nur Analyse, keine Änderungen")
+            return results
+
+        def done(item, result):
+            removed = not os.path.lexists(item['path'])
+            self.audit.record('reclaim', package=item['name'], path=item['path'],
+                              size=item['reclaimable'] if removed else 0,
+                              result='ok' if removed else 'error', source=item['manager'], ref=item['ref'])
+            if removed:
+                results['removed'].append(item)
+                results['freed'] += item['reclaimable']
+            elif result.ok:
+                results['errors'].append(f"{item['name']} ({item['ref']}) ist noch vorhanden")
+
+        flatpak = [item for item in items if item['manager'] == 'flatpak']
+        if flatpak:
+            with self.audit.transaction('reclaim', source='flatpak', count=len(flatpak)):
+                for scope in ('system', 'user'):
+                    batch = [item for item in flatpak if item['scope'] == scope]
+                    if not batch:
+                        continue
+                    result = self.run_command(['flatpak', 'uninstall', '-y', '--noninteractive', f'--{scope}']
+                                              + [item['ref'] for item in batch])
+                    if not result.ok:
+                        results['errors'].append(f"Flatpak-Fehler: {result.stderr}")
+                    for item in batch:
+                        done(item, result)
+
+        snap = [item for item in items if item['manager'] == 'snap']
+        if snap:
+            # snapd kennt kein Entfernen mehrerer Revisionen in einem Aufruf
+            with self.audit.transaction('reclaim', source='snap', count=len(snap)):
+                for item in snap:
+                    result = self.run_command(['sudo', 'snap', 'remove', item['name'], f"--revision={item['ref']}"])
+                    if not result.ok:
+                        results['errors'].append(f"Snap-Fehler ({item['name']} r{item['ref']}): {result.stderr}")
+                    done(item, result)
+        return results
+
+    def get_cache_roots(self):
+        """Cache-Ordner des Benutzers und aller Flatpak-Apps"""
+        roots = [self.home / '.cache']
+        roots.extend(sorted((self.home / '.var' / 'app').glob('*/cache')))
+        return [root for root in roots if root.is_dir()]
+
+    def attribute_path(self, path, packages):
+        """Ordnet einen Cache-Pfad einem bekannten Paket zu (oder None)"""
+        flatpak_dir = self.home / '.var' / 'app'
+        try:
+            relative = Path(path).relative_to(flatpak_dir)
+            app_id = relative.parts[0]
+            for pkg in packages:
+                if pkg.get('id') == app_id:
+                    return pkg['name']
+            return app_id
+        except ValueError:
+            pass
+
+        try:
+            top = Path(path).relative_to(self.home / '.cache').parts[0].lower()
+        except (ValueError, IndexError):
+            return None
+        for pkg in packages:
+            name = pkg['name'].lower()
+            if top == name or top == (pkg.get('id') or '').lower():
+                return pkg['name']
+        # Sonst nur ganze Namensteile: 'google-chrome' passt zu 'google-chrome-stable',
+        # kurze Ordner wie 'go' oder 'pip' aber nicht zu 'gimp' oder 'pipewire'
+        top_tokens = self._name_tokens(top)
+        for pkg in packages:
+            name_tokens = self._name_tokens(pkg['name'])
+            if self._contains_tokens(name_tokens, top_tokens) or self._contains_tokens(top_tokens, name_tokens):
+                return pkg['name']
+        return None
+
+    @staticmethod
+    def _name_tokens(name):
+        return tuple(token for token in re.split(r'[-_.+ ]+', name.lower()) if token)
+
+    @staticmethod
+    def _contains_tokens(tokens, part):
+        """part kommt als zusammenhängende Folge ganzer Teile in tokens vor"""
+        if not part:
+            return False
+        return any(tokens[i:i + len(part)] == part for i in range(len(tokens) - len(part) + 1))
+
+    def analyze_caches(self, stale_days=90, top=20, packages=None):
+        """Größte lange unbenutzte Cache-Teilbäume und Bytes pro Altersgruppe"""
+        analyzer = CacheAnalyzer(stale_days=stale_days, top=top)
+        with self.tracer.span('cache_analysis', category='cache') as span:
+            report = analyzer.analyze(self.get_cache_roots(), span)
+        for entry in report['top']:
+            entry['package'] = self.attribute_path(entry['path'], packages or [])
+        return report
+
+    @staticmethod
+    def get_search_terms(package_name, package_source=None, package_id=None):
+        """Verschiedene Schreibweisen des Programmnamens"""
         search_terms = [
             package_name,
             package_name.lower(),
@@ -305,153 +3800,317 @@ class LinuxAppCleaner:
         if package_source == 'flatpak' and package_id:
             search_terms.append(package_id)
             search_terms.append(package_id.split('.')[-1])  # Nur letzter Teil
-        
-        # Wichtige Suchpfade (sortiert nach Wichtigkeit)
-        search_paths = [
-            # Benutzer-Daten (am wichtigsten)
-            (self.home / '.config', 'Config'),
-            (self.home / '.cache', 'Cache'),
-            (self.home / '.local' / 'share', 'Daten'),
-            (self.home / '.local' / 'state', 'Status'),
-            
-            # Flatpak & Snap
-            (self.home / '.var' / 'app', 'Flatpak'),
-            (self.home / 'snap', 'Snap'),
-            
-            # Desktop-Integration
-            (self.home / '.local' / 'share' / 'applications', 'Desktop-Dateien'),
-            (self.home / '.local' / 'share' / 'icons', 'Icons'),
-            (Path('/usr/share/applications'), 'System-Desktop-Dateien'),
-            (Path('/usr/share/icons'), 'System-Icons'),
-            
-            # Autostart
-            (self.home / '.config' / 'autostart', 'Autostart'),
-            
-            # Versteckte Dateien im Home
-            (self.home, 'Home-Dotfiles'),
-            
-            # Temporäre Dateien
-            (Path('/tmp'), 'Temp'),
-            (Path('/var/tmp'), 'Var-Temp'),
-            
-            # System-Configs (nur lesbar mit sudo)
-            (Path('/etc'), 'System-Config'),
-            
-            # Logs
-            (self.home / '.local' / 'share' / 'systemd', 'User-Logs'),
-            (Path('/var/log'), 'System-Logs'),
-            
-            # Weitere mögliche Orte
-            (self.home / 'Applications', 'Applications'),
-            (self.home / 'Downloads', 'Downloads'),
-            (self.home / '.wine', 'Wine'),
-            (Path('/opt'), 'Optional-Apps'),
-        ]
-        
-        total_paths = len(search_paths)
-        
-        for idx, (base_path, category) in enumerate(search_paths):
-            if progress_callback:
-                progress_callback(f"Durchsuche {category} ({idx+1}/{total_paths})...")
-            
-            if not base_path.exists():
+        return search_terms
+
+    def get_system_users(self):
+        """Echte Benutzer laut etc/passwd (UID >= 1000, Login-Shell, Home vorhanden)"""
+        users = []
+        for entry in _read_passwd(self.system_path('etc/passwd')):
+            if entry['uid'] < 1000 or entry['uid'] == 65534:
                 continue
-            
+            if entry['shell'].endswith(('nologin', 'false', 'sync')):
+                continue
+            home = self.system_path(entry['home'].lstrip('/'))
+            if home.is_dir():
+                users.append({'name': entry['name'], 'uid': entry['uid'], 'home': home})
+        return users
+
+    # Kategorien, deren Treffer aus dem Desktop-Index kommen statt aus Suchmustern
+    DESKTOP_INDEX_CATEGORIES = {'Desktop-Dateien', 'System-Desktop-Dateien', 'Icons', 'System-Icons', 'Autostart'}
+
+    def _match_root(self, base_path, category, matcher, found_files, span):
+        """
+        Durchsucht einen Suchpfad in einem Durchlauf nach allen Schreibweisen
+        (TermMatcher). Passende Ordner werden mit Größe übernommen und nicht
+        weiter betreten, schon gefundene (found_files: SearchResults) übersprungen.
+        Home-Dotfiles, Temp und Downloads nur in der ersten Ebene.
+        """
+        def add(entry, is_dir):
             try:
-                # Durchsuche diesen Pfad nach allen Varianten des Programmnamens
-                for search_term in search_terms:
-                    search_lower = search_term.lower()
-                    
-                    # Spezial-Behandlung für verschiedene Pfade
-                    if category == 'Home-Dotfiles':
-                        # Nur versteckte Dateien/Ordner im Home
-                        for item in base_path.glob(f'.{search_lower}*'):
-                            if item.is_dir() and item != base_path:
-                                try:
-                                    size = sum(f.stat().st_size for f in item.rglob('*') if f.is_file())
-                                    if size > 0:
-                                        found_files[str(item)] = {
-                                            'type': 'directory',
-                                            'size': size,
-                                            'category': category
-                                        }
-                                except (PermissionError, OSError):
-                                    pass
-                    
-                    elif category == 'Desktop-Dateien' or category == 'System-Desktop-Dateien':
-                        # .desktop Dateien
-                        for item in base_path.glob(f'*{search_lower}*.desktop'):
-                            if item.is_file():
-                                try:
-                                    found_files[str(item)] = {
-                                        'type': 'file',
-                                        'size': item.stat().st_size,
-                                        'category': category
-                                    }
-                                except (PermissionError, OSError):
-                                    pass
-                    
-                    elif category in ['Temp', 'Var-Temp', 'Downloads']:
-                        # Nur erste Ebene durchsuchen (zu viele Dateien)
-                        try:
-                            for item in base_path.glob(f'*{search_lower}*'):
-                                if item.is_file():
-                                    found_files[str(item)] = {
-                                        'type': 'file',
-                                        'size': item.stat().st_size,
-                                        'category': category
-                                    }
-                                elif item.is_dir():
-                                    size = sum(f.stat().st_size for f in item.rglob('*') if f.is_file())
-                                    if size > 0:
-                                        found_files[str(item)] = {
-                                            'type': 'directory',
-                                            'size': size,
-                                            'category': category
-                                        }
-                        except (PermissionError, OSError):
-                            pass
-                    
-                    else:
-                        # Normale Ordner rekursiv durchsuchen
+                size = self.dir_size(entry.path) if is_dir else entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                return
+            if size > 0 or not is_dir:
+                found_files[entry.path] = {
+                    'type': 'directory' if is_dir else 'file',
+                    'size': size,
+                    'category': category
+                }
+
+        recursive = category not in ('Home-Dotfiles', 'Desktop-Dateien', 'System-Desktop-Dateien',
+                                     'Temp', 'Var-Temp', 'Downloads')
+        stack = [str(base_path)]
+        while stack:
+            try:
+                with _scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        span.add(entries=1)
+                        if self.is_excluded(entry.path) or found_files.covers(entry.path):
+                            continue
                         try:
-                            for item in base_path.rglob(f'*{search_lower}*'):
-                                if item.is_file():
-                                    found_files[str(item)] = {
-                                        'type': 'file',
-                                        'size': item.stat().st_size,
-                                        'category': category
-                                    }
-                                elif item.is_dir() and str(item) not in found_files:
-                                    try:
-                                        size = sum(f.stat().st_size for f in item.rglob('*') if f.is_file())
-                                        if size > 0:
-                                            found_files[str(item)] = {
-                                                'type': 'directory',
-                                                'size': size,
-                                                'category': category
-                                            }
-                                    except (PermissionError, OSError):
-                                        pass
-                        except (PermissionError, OSError):
-                            # Kein Zugriff auf diesen Pfad
-                            pass
-            
-            except Exception as e:
-                # Fehler beim Durchsuchen dieses Pfads ignorieren
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            is_file = entry.is_file(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        if category == 'Home-Dotfiles':
+                            if is_dir and matcher.matches_dotfile(entry.name):
+                                add(entry, True)
+                        elif category in ('Desktop-Dateien', 'System-Desktop-Dateien'):
+                            if is_file and entry.name.endswith('.desktop') and matcher.matches(entry.name):
+                                add(entry, False)
+                        elif matcher.matches(entry.name):
+                            if is_dir or is_file:
+                                add(entry, is_dir)
+                        elif is_dir and recursive:
+                            stack.append(entry.path)
+            except OSError:
                 pass
+
+    def scan_all_users(self, package_name, package_source=None, package_id=None,
+                       progress_callback=None, max_workers=4, max_entries=None):
+        """
+        Überreste eines Programms in den Homes ALLER Benutzer.
+        System-Orte (/etc, /usr/share, /var/log, ...) werden nur einmal
+        durchsucht, die Homes parallel - mit denselben Regeln wie
+        deep_search_files (Desktop-Index, SearchResults, dpkg-Zuordnung).
+        """
+        matcher = TermMatcher(self.get_search_terms(package_name, package_source, package_id))
+        users = self.get_system_users()
+        homes = [user['home'] for user in users]
+
+        def is_home_path(path):
+            return any(path == home or home in path.parents for home in homes) \
+                or path == self.home or self.home in path.parents
+
+        system_roots = [(path, category) for path, category in self.get_deep_search_paths()
+                        if not is_home_path(path) and category not in self.DESKTOP_INDEX_CATEGORIES]
+
+        # Ein Index über die Starter aller Benutzer, damit geteilte Icons überall gleich gelten
+        desktop_files = self.find_desktop_files(package_name, package_source, package_id,
+                                                index=self.users_desktop_index, homes=homes)
+
+        def scan(roots, label, home):
+            found = SearchResults(max_entries or self.deep_search_max_entries)
+            found.update((path, info) for path, info in desktop_files.items()
+                         if (home is None and not any(path.startswith(f"{h}/") for h in homes))
+                         or (home is not None and path.startswith(f"{home}/")))
+            with self.tracer.span(f"users:{label}", category='deep_search') as span:
+                for path, category in roots:
+                    if path.exists():
+                        self._match_root(path, category, matcher, found, span)
+            self.tag_ownership(package_name, package_source, found)
+            if found.overflow:
+                self.log(f"Suche {package_name} ({label}): {found.overflow_text()}")
+            if progress_callback:
+                progress_callback(f"{label}: {len(found)} Funde")
+            return found
+
+        jobs = [('System', system_roots, None)]
+        for user in users:
+            home_roots = [(path, category) for path, category in self.get_deep_search_paths(user['home'])
+                          if (path == user['home'] or user['home'] in path.parents)
+                          and category not in self.DESKTOP_INDEX_CATEGORIES]
+            jobs.append((user['name'], home_roots, user['home']))
+
+        with _walk_executor(max_workers) as executor:
+            found = list(executor.map(lambda job: scan(job[1], job[0], job[2]), jobs))
+
+        results = {'system': found[0], 'users': {}, 'total_files': 0, 'total_size': 0}
+        for user, files in zip(users, found[1:]):
+            results['users'][user['name']] = {
+                'home': str(user['home']),
+                'files': files,
+                'size': sum(info['size'] for info in files.values()),
+            }
+        for files in found:
+            results['total_files'] += len(files)
+            results['total_size'] += sum(info['size'] for info in files.values())
+        return results
+
+    def get_desktop_index_roots(self, homes=None):
+        """Ordner mit Starter-, Autostart- und Icon-Dateien (Homes: Standard nur das eigene)"""
+        roots = []
+        for home in homes or [self.home]:
+            roots += [
+                (home / '.local' / 'share' / 'applications', 'launcher'),
+                (home / '.local' / 'share' / 'flatpak' / 'exports' / 'share' / 'applications', 'launcher'),
+                (home / '.config' / 'autostart', 'autostart'),
+                (home / '.local' / 'share' / 'icons', 'icon'),
+            ]
+        return roots + [
+            (self.system_path('usr/share/applications'), 'launcher'),
+            (self.system_path('usr/local/share/applications'), 'launcher'),
+            (self.system_path('var/lib/flatpak/exports/share/applications'), 'launcher'),
+            (self.system_path('var/lib/snapd/desktop/applications'), 'launcher'),
+            (self.system_path('etc/xdg/autostart'), 'autostart'),
+            (self.system_path('usr/share/icons'), 'icon'),
+            (self.system_path('usr/share/pixmaps'), 'icon'),
+            (self.system_path('var/lib/flatpak/exports/share/icons'), 'icon'),
+        ]
+
+    def find_desktop_files(self, package_name, package_source=None, package_id=None, package_path=None,
+                           index=None, homes=None):
+        """Starter, Autostart-Einträge und Icons eines Pakets aus dem Desktop-Index"""
+        index = index or self.desktop_index
+        homes = homes or [self.home]
+        home_prefixes = tuple(f"{home}/" for home in homes)
+        with self.tracer.span('desktop_index', category='deep_search') as span:
+            index.refresh(self.get_desktop_index_roots(homes))
+            matches = index.lookup(
+                self.get_search_terms(package_name, package_source, package_id), path=package_path)
+
+            found_files = {}
+            for kind, paths in matches.items():
+                for path in paths:
+                    user_path = path.startswith(home_prefixes)
+                    category = {
+                        'launcher': 'Desktop-Dateien' if user_path else 'System-Desktop-Dateien',
+                        'autostart': 'Autostart',
+                        'icon': 'Icons' if user_path else 'System-Icons',
+                    }[kind]
+                    try:
+                        size = os.stat(path).st_size
+                    except OSError:
+                        continue
+                    found_files[path] = {'type': 'file', 'size': size, 'category': category}
+            span.add(entries=len(found_files))
+        return found_files
+
+    def to_system_path(self, path):
+        """Pfad unter system_root -> Pfad wie im untersuchten System ('/etc/...')"""
+        try:
+            return '/' + str(Path(path).relative_to(self.system_root))
+        except ValueError:
+            return None
+
+    def tag_ownership(self, package_name, package_source, found_files):
+        """Markiert Funde als owned/foreign/unowned laut dpkg-Dateilisten"""
+        with self.tracer.span('dpkg_ownership', category='deep_search') as span:
+            self.dpkg_index.refresh()
+            # Ohne Quellangabe (CLI) zählt der Name, sofern dpkg ihn kennt
+            owner = None
+            if package_source == 'apt' or (package_source is None and self.dpkg_index.paths_of(package_name)):
+                owner = package_name
+            home = str(self.home)
+            for path, info in found_files.items():
+                system_path = self.to_system_path(path)
+                if path.startswith(home) or system_path is None:
+                    info['ownership'] = 'unowned'
+                else:
+                    info['ownership'] = self.dpkg_index.classify(system_path, owner)
+            span.add(entries=len(found_files))
+
+    def deep_search_files(self, package_name, package_source=None, package_id=None, progress_callback=None,
+                          max_entries=None):
+        """
+        GRÜNDLICHE Suche: Durchsucht die GESAMTE Festplatte nach allen Spuren
+        Dies kann mehrere Minuten dauern!
+        Ergebnis ist ein SearchResults (dict) mit höchstens max_entries Einträgen.
+        """
+        found_files = SearchResults(max_entries or self.deep_search_max_entries)
+        # Alle Schreibweisen in einem Durchlauf pro Suchpfad
+        matcher = TermMatcher(self.get_search_terms(package_name, package_source, package_id))
+        
+        # Starter, Autostart und Icons kommen aus dem Desktop-Index statt aus Suchmustern
+        found_files.update(self.find_desktop_files(package_name, package_source, package_id))
+        search_paths = [(path, category) for path, category in self.get_deep_search_paths()
+                        if category not in self.DESKTOP_INDEX_CATEGORIES]
+        total_paths = len(search_paths)
+        
+        def search():
+            for idx, (base_path, category) in enumerate(search_paths):
+                if progress_callback:
+                    progress_callback(f"Durchsuche {category} ({idx+1}/{total_paths})...")
+                
+                if not base_path.exists():
+                    continue
+                
+                with self.tracer.span(category, category='deep_search', root=str(base_path)) as span:
+                    self._match_root(base_path, category, matcher, found_files, span)
+        
+        # Im schonenden Modus in einem eigenen Worker - der Aufrufer startet danach evtl. apt
+        _run_walk(search)
+        
+        self.tag_ownership(package_name, package_source, found_files)
         
         if progress_callback:
             progress_callback(f"Suche abgeschlossen! {len(found_files)} Dateien/Ordner gefunden.")
+        if found_files.overflow:
+            self.log(f"Gründliche Suche {package_name}: {found_files.overflow_text()}")
         
         return found_files
-    
-    def uninstall_package(self, package, mode='safe'):
+
+    def _plan_key(self, package):
+        return (package['source'], package['name'], package.get('id'))
+
+    def get_cleanup_plan(self, package, deep=False, exact=False, progress_callback=None):
+        """
+        Gibt den Lösch-Plan für ein Paket zurück (aus dem Cache wenn gültig).
+        Eine gültige gründliche Suche wird auch für schnelle Anfragen benutzt,
+        außer exact=True verlangt genau den angeforderten Modus.
+        """
+        key = self._plan_key(package)
+        if exact:
+            modes = [deep]
+        else:
+            modes = [True] if deep else [True, False]
+
+        with self._plan_lock:
+            for mode in modes:
+                plan = self._plan_cache.get((key, mode))
+                if plan and plan.is_valid(self.PLAN_TTL):
+                    return plan
+
+        name = package['name']
+        source = package.get('source')
+        package_id = package.get('id')
+
+        # mtimes VOR der Suche merken, damit Änderungen währenddessen auffallen
+        if deep:
+            roots = [path for path, _ in self.get_deep_search_paths()]
+        else:
+            roots = {path.parent for path in self.get_quick_search_dirs(name, source, package_id)}
+        root_mtimes = {str(root): _path_mtime(root) for root in roots}
+
+        if deep:
+            files = self.deep_search_files(
+                name,
+                package_source=source,
+                package_id=package_id,
+                progress_callback=progress_callback
+            )
+        else:
+            files = self.find_package_files(name, package_source=source, package_id=package_id)
+
+        plan = CleanupPlan(package, files, deep, root_mtimes)
+        with self._plan_lock:
+            self._plan_cache[(key, deep)] = plan
+        return plan
+
+    def peek_cleanup_plan(self, package):
+        """Gültiger Plan aus dem Cache (gründlich bevorzugt) ohne neue Suche, sonst None"""
+        key = self._plan_key(package)
+        with self._plan_lock:
+            for mode in (True, False):
+                plan = self._plan_cache.get((key, mode))
+                if plan and plan.is_valid(self.PLAN_TTL):
+                    return plan
+        return None
+
+    def invalidate_plan(self, package):
+        """Verwirft zwischengespeicherte Pläne eines Pakets"""
+        key = self._plan_key(package)
+        with self._plan_lock:
+            self._plan_cache.pop((key, True), None)
+            self._plan_cache.pop((key, False), None)
+
+    def uninstall_package(self, package, mode='safe', plan=None):
         """Deinstalliert ein Paket"""
         results = {
             'success': False,
             'removed_program': False,
             'removed_files': [],
+            'quarantine_id': None,
             'errors': []
         }
         
@@ -459,96 +4118,149 @@ class LinuxAppCleaner:
             results['errors'].append(f"GESCHÜTZT: {package['name']} ist ein Systempaket!")
             return results
         
+        if self.offline:
+            results['errors'].append(f"Offline-Modus ({self.system_root}): nur Analyse, keine Deinstallation")
+            return results
+        
         source = package['source']
         name = package['name']
         
-        try:
-            if source == 'apt':
-                cmd = f"sudo apt-get remove -y {name}"
-                if mode == 'thorough':
-                    cmd = f"sudo apt-get purge -y {name}"
+        with self.audit.transaction('uninstall', package=name, source=source, mode=mode):
+            self._uninstall_package(package, mode, plan, results)
+        
+        results['success'] = results['removed_program']
+        return results
+
+    def _uninstall_package(self, package, mode, plan, results):
+        """Eigentliche Deinstallation innerhalb einer Protokoll-Transaktion"""
+        source = package['source']
+        name = package['name']
+        started = time.monotonic()
+        
+        with self.tracer.span('remove_program', category='uninstall', package=name):
+            try:
+                if source == 'apt':
+                    # Quarantäne nutzt remove statt purge, damit System-Configs erhalten bleiben
+                    cmd = ['sudo', 'apt-get', 'remove', '-y', name]
+                    if mode == 'thorough':
+                        cmd = ['sudo', 'apt-get', 'purge', '-y', name]
                 
-                stdout, stderr, returncode = self.run_command(cmd)
-                if returncode == 0:
-                    results['removed_program'] = True
-                    self.log(f"APT: Entfernt {name}")
-                else:
-                    results['errors'].append(f"APT-Fehler: {stderr}")
-            
-            elif source == 'flatpak':
-                cmd = f"flatpak uninstall -y {package.get('id', name)}"
-                stdout, stderr, returncode = self.run_command(cmd)
-                if returncode == 0:
-                    results['removed_program'] = True
-                    self.log(f"Flatpak: Entfernt {name}")
-                else:
-                    results['errors'].append(f"Flatpak-Fehler: {stderr}")
+                    result = self.run_command(cmd)
+                    if result.ok:
+                        results['removed_program'] = True
+                    else:
+                        results['errors'].append(f"APT-Fehler: {result.stderr}")
             
-            elif source == 'snap':
-                cmd = f"sudo snap remove {name}"
-                stdout, stderr, returncode = self.run_command(cmd)
-                if returncode == 0:
-                    results['removed_program'] = True
-                    self.log(f"Snap: Entfernt {name}")
-                else:
-                    results['errors'].append(f"Snap-Fehler: {stderr}")
+                elif source == 'flatpak':
+                    cmd = ['flatpak', 'uninstall', '-y', package.get('id', name)]
+                    result = self.run_command(cmd)
+                    if result.ok:
+                        results['removed_program'] = True
+                    else:
+                        results['errors'].append(f"Flatpak-Fehler: {result.stderr}")
             
-            elif source == 'pip':
-                cmd = f"pip uninstall -y {name}"
-                stdout, stderr, returncode = self.run_command(cmd)
-                if returncode == 0:
-                    results['removed_program'] = True
-                    self.log(f"pip: Entfernt {name}")
-                else:
-                    results['errors'].append(f"pip-Fehler: {stderr}")
+                elif source == 'snap':
+                    cmd = ['sudo', 'snap', 'remove', name]
+                    result = self.run_command(cmd)
+                    if result.ok:
+                        results['removed_program'] = True
+                    else:
+                        results['errors'].append(f"Snap-Fehler: {result.stderr}")
             
-            elif source == 'npm':
-                cmd = f"npm uninstall -g {name}"
-                stdout, stderr, returncode = self.run_command(cmd)
-                if returncode == 0:
-                    results['removed_program'] = True
-                    self.log(f"npm: Entfernt {name}")
-                else:
-                    results['errors'].append(f"npm-Fehler: {stderr}")
+                elif source == 'pip':
+                    cmd = ['pip', 'uninstall', '-y', name]
+                    result = self.run_command(cmd)
+                    if result.ok:
+                        results['removed_program'] = True
+                    else:
+                        results['errors'].append(f"pip-Fehler: {result.stderr}")
             
-            elif source == 'appimage':
-                appimage_path = Path(package.get('path', ''))
-                if appimage_path.exists():
-                    appimage_path.unlink()
-                    results['removed_program'] = True
-                    self.log(f"AppImage gelöscht: {appimage_path}")
-        
-        except Exception as e:
-            results['errors'].append(f"Fehler bei Deinstallation: {str(e)}")
-        
-        if mode == 'thorough' and results['removed_program']:
-            # Nutze deep search für wirklich ALLE Dateien
-            package_files = self.deep_search_files(
-                name, 
-                package_source=source,
-                package_id=package.get('id')
-            )
+                elif source == 'npm':
+                    cmd = ['npm', 'uninstall', '-g', name]
+                    result = self.run_command(cmd)
+                    if result.ok:
+                        results['removed_program'] = True
+                    else:
+                        results['errors'].append(f"npm-Fehler: {result.stderr}")
             
-            for file_path in package_files:
-                try:
-                    path = Path(file_path)
-                    if path.exists():
-                        if path.is_dir():
-                            shutil.rmtree(path)
-                        else:
-                            path.unlink()
-                        results['removed_files'].append(file_path)
-                        self.log(f"Gelöscht: {file_path}")
-                except Exception as e:
-                    results['errors'].append(f"Fehler beim Löschen von {file_path}: {str(e)}")
+                elif source == 'appimage':
+                    appimage_path = Path(package.get('path', ''))
+                    if appimage_path.exists():
+                        appimage_path.unlink()
+                        results['removed_program'] = True
         
-        results['success'] = results['removed_program']
-        return results
+            except Exception as e:
+                results['errors'].append(f"Fehler bei Deinstallation: {str(e)}")
+        
+        self.audit.record(
+            'remove_program',
+            package=name,
+            path=package.get('path'),
+            duration=time.monotonic() - started,
+            result='ok' if results['removed_program'] else 'error',
+            source=source,
+            error=results['errors'][-1] if results['errors'] else None
+        )
+        
+        if mode in ('thorough', 'quarantine') and results['removed_program']:
+            # Nutze deep search für wirklich ALLE Dateien - aus dem Dialog
+            # bereits vorhandene Ergebnisse werden wiederverwendet
+            if plan is None or not plan.deep:
+                with self.tracer.span('residue_search', category='uninstall', package=name):
+                    plan = self.get_cleanup_plan(package, deep=True)
+            # Ein älterer Plan kann noch eigene Daten enthalten - nie anfassen
+            package_files = {path: info for path, info in plan.files.items() if not self.is_excluded(path)}
+
+            # Was laut dpkg einem anderen Paket gehört, wird nicht angefasst
+            foreign = [path for path, info in package_files.items() if info.get('ownership') == 'foreign']
+            if foreign:
+                package_files = {path: info for path, info in package_files.items() if path not in foreign}
+                results['skipped_files'] = foreign
+                for file_path in foreign:
+                    self.audit.record('skip', package=name, path=file_path, reason='foreign')
+
+            if mode == 'quarantine':
+                # Nur verschieben - kann rückgängig gemacht werden
+                with self.tracer.span('residue_quarantine', category='uninstall', package=name) as span:
+                    transaction_id, moved, errors = self.quarantine.move_to_quarantine(package, package_files)
+                    span.add(entries=len(moved))
+                results['quarantine_id'] = transaction_id
+                results['removed_files'].extend(moved)
+                results['errors'].extend(errors)
+                for file_path in moved:
+                    self.audit.record('quarantine', package=name, path=file_path,
+                                      size=package_files[file_path].get('size'),
+                                      transaction=transaction_id)
+                package_files = {}
+
+            with self.tracer.span('residue_delete', category='uninstall', package=name) as span:
+                for file_path in package_files:
+                    delete_started = time.monotonic()
+                    try:
+                        path = Path(file_path)
+                        if path.exists():
+                            if path.is_dir():
+                                shutil.rmtree(path)
+                            else:
+                                path.unlink()
+                            results['removed_files'].append(file_path)
+                            span.add(entries=1, bytes=package_files[file_path].get('size', 0))
+                            self.audit.record('delete', package=name, path=file_path,
+                                              size=package_files[file_path].get('size'),
+                                              duration=time.monotonic() - delete_started)
+                    except Exception as e:
+                        results['errors'].append(f"Fehler beim Löschen von {file_path}: {str(e)}")
+                        self.audit.record('delete', package=name, path=file_path,
+                                          duration=time.monotonic() - delete_started,
+                                          result='error', error=str(e))
+        
+        if results['removed_program']:
+            self.invalidate_plan(package)
 
 
 class DeepSearchThread(QThread):
     """Thread für Tiefensuche"""
-    finished = pyqtSignal(dict)
+    finished = pyqtSignal(object)
     progress = pyqtSignal(str)
     
     def __init__(self, cleaner, package):
@@ -558,13 +4270,138 @@ class DeepSearchThread(QThread):
     
     def run(self):
         """Führt Tiefensuche durch"""
-        results = self.cleaner.deep_search_files(
-            self.package['name'],
-            package_source=self.package.get('source'),
-            package_id=self.package.get('id'),
+        plan = self.cleaner.get_cleanup_plan(
+            self.package,
+            deep=True,
             progress_callback=self.progress.emit
         )
-        self.finished.emit(results)
+        self.finished.emit(plan)
+
+
+class DuplicateThread(QThread):
+    """Thread für die Duplikat-Suche"""
+    finished = pyqtSignal(object)
+    progress = pyqtSignal(str)
+    
+    def __init__(self, cleaner):
+        super().__init__()
+        self.cleaner = cleaner
+    
+    def run(self):
+        groups = self.cleaner.find_duplicates(progress_callback=self.progress.emit)
+        self.finished.emit(groups)
+
+
+class CacheAnalysisThread(QThread):
+    """Thread für die Cache-Analyse"""
+    finished = pyqtSignal(object)
+    
+    def __init__(self, cleaner, packages):
+        super().__init__()
+        self.cleaner = cleaner
+        self.packages = packages
+    
+    def run(self):
+        self.finished.emit(self.cleaner.analyze_caches(packages=self.packages))
+
+
+class PythonEnvThread(QThread):
+    """Thread für die Suche nach Python-Umgebungen"""
+    finished = pyqtSignal(object)
+    
+    def __init__(self, cleaner):
+        super().__init__()
+        self.cleaner = cleaner
+    
+    def run(self):
+        self.finished.emit(self.cleaner.find_python_envs())
+
+
+class InventoryPatchThread(QThread):
+    """Gleicht nach einer Deinstallation nur die betroffene Quelle ab"""
+    finished = pyqtSignal(object)
+    
+    def __init__(self, cleaner, packages, package):
+        super().__init__()
+        self.cleaner = cleaner
+        self.packages = packages
+        self.package = package
+    
+    def run(self):
+        self.finished.emit(self.cleaner.patch_inventory(self.packages, self.package))
+
+
+class UsageThread(QThread):
+    """Schätzt im Hintergrund, wann die Pakete zuletzt benutzt wurden"""
+    finished = pyqtSignal(object)
+    
+    def __init__(self, cleaner, packages):
+        super().__init__()
+        self.cleaner = cleaner
+        self.packages = packages
+    
+    def run(self):
+        self.cleaner.estimate_usage(self.packages)
+        self.finished.emit(self.packages)
+
+
+class ReclaimThread(QThread):
+    """Thread für die Analyse unbenutzter Runtimes und Revisionen"""
+    finished = pyqtSignal(object)
+    
+    def __init__(self, cleaner):
+        super().__init__()
+        self.cleaner = cleaner
+    
+    def run(self):
+        self.finished.emit(self.cleaner.find_reclaimable())
+
+
+class ReclaimRemoveThread(QThread):
+    """Thread für das Entfernen von Runtimes und Revisionen (flatpak/snap laufen lange)"""
+    finished = pyqtSignal(object)
+    
+    def __init__(self, cleaner, items):
+        super().__init__()
+        self.cleaner = cleaner
+        self.items = items
+    
+    def run(self):
+        self.finished.emit(self.cleaner.reclaim(self.items))
+
+
+class SizeWorker(QThread):
+    """Berechnet Ordnergrößen für die Baumansicht im Hintergrund"""
+    size_ready = pyqtSignal(str, object)
+
+    def __init__(self):
+        super().__init__()
+        self.queue = queue.Queue()
+
+    def request(self, path):
+        self.queue.put(path)
+
+    def clear(self):
+        """Verwirft noch nicht bearbeitete Anfragen"""
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def stop(self):
+        """Offene Anfragen verwerfen, der laufende Ordner wird noch fertig"""
+        self.clear()
+        self.queue.put(None)
+
+    def run(self):
+        # Eigener Thread nur für Größen - darf im schonenden Modus abgesenkt werden
+        _prioritize_walker()
+        while True:
+            path = self.queue.get()
+            if path is None:
+                break
+            self.size_ready.emit(path, _dir_size(path))
 
 
 class AnalyzeDialog(QWidget):
@@ -576,7 +4413,14 @@ class AnalyzeDialog(QWidget):
         self.cleaner = cleaner
         self.setWindowTitle(f"🔍 Analyse: {package['name']}")
         self.setGeometry(100, 100, 900, 700)
-        self.deep_search_results = None
+        self.plan = None
+        self.report_dirty = True
+        self.pending_sizes = {}
+
+        self.size_worker = SizeWorker()
+        self.size_worker.size_ready.connect(self.on_size_ready)
+        self.size_worker.start()
+
         self.init_ui()
     
     def init_ui(self):
@@ -611,10 +4455,15 @@ class AnalyzeDialog(QWidget):
         files_tab = QWidget()
         files_layout = QVBoxLayout()
         
-        self.files_text = QTextEdit()
-        self.files_text.setReadOnly(True)
-        self.files_text.setFont(QFont("Monospace", 10))
-        files_layout.addWidget(self.files_text)
+        self.files_summary = QLabel()
+        files_layout.addWidget(self.files_summary)
+        
+        # Baum wird erst beim Aufklappen befüllt
+        self.files_tree = QTreeWidget()
+        self.files_tree.setHeaderLabels(['Pfad', 'Größe', 'Typ'])
+        self.files_tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.files_tree.itemExpanded.connect(self.on_item_expanded)
+        files_layout.addWidget(self.files_tree)
         
         files_tab.setLayout(files_layout)
         self.tabs.addTab(files_tab, "📁 Dateien & Orte")
@@ -631,6 +4480,13 @@ class AnalyzeDialog(QWidget):
         commands_tab.setLayout(commands_layout)
         self.tabs.addTab(commands_tab, "💻 Befehle")
         
+        # Tab 3: Klartext-Bericht (wird erst beim Öffnen erzeugt)
+        self.report_text = QTextEdit()
+        self.report_text.setReadOnly(True)
+        self.report_text.setFont(QFont("Monospace", 10))
+        self.report_tab_index = self.tabs.addTab(self.report_text, "📄 Bericht")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+        
         layout.addWidget(self.tabs)
         
         # Buttons
@@ -673,10 +4529,10 @@ class AnalyzeDialog(QWidget):
         self.search_thread.finished.connect(self.on_deep_search_finished)
         self.search_thread.start()
     
-    def on_deep_search_finished(self, results):
+    def on_deep_search_finished(self, plan):
         """Wird aufgerufen wenn Tiefensuche fertig ist"""
         self.progress_dialog.close()
-        self.deep_search_results = results
+        self.plan = plan
         self.load_analysis(deep=True)
         
         # Info
@@ -684,181 +4540,465 @@ class AnalyzeDialog(QWidget):
             self,
             "Suche abgeschlossen",
             f"Gründliche Suche abgeschlossen!\n\n"
-            f"Gefunden: {len(results)} Dateien/Ordner\n"
-            f"Größe: {sum(r['size'] for r in results.values()) / (1024*1024):.2f} MB"
+            f"Gefunden: {len(plan.files)} Dateien/Ordner\n"
+            f"Größe: {plan.total_size / (1024*1024):.2f} MB"
         )
     
     def load_analysis(self, deep=False):
-        """Lädt Analyse-Daten"""
-        pkg_name = self.package['name']
-        
-        if deep and self.deep_search_results:
-            pkg_files = self.deep_search_results
-        elif deep:
-            # Deep search wurde angefordert aber noch nicht durchgeführt
-            return
-        else:
-            # Schnelle Suche
-            pkg_files = self.cleaner.find_package_files(
-                pkg_name,
-                package_source=self.package.get('source'),
-                package_id=self.package.get('id')
-            )
-        
-        # Dateien-Tab
-        files_info = f"ANALYSE FÜR: {pkg_name}\n"
-        files_info += "=" * 80 + "\n\n"
-        files_info += f"SUCHMODUS: {'🔬 GRÜNDLICH (ganze Festplatte)' if deep else '⚡ SCHNELL (normale Orte)'}\n"
-        files_info += f"QUELLE: {self.package['source']}\n"
-        files_info += f"VERSION: {self.package.get('version', 'unknown')}\n"
-        
-        if self.package.get('protected', False):
-            files_info += "\n⚠️  WARNUNG: SYSTEMPAKET - NICHT LÖSCHEN!\n"
-        
-        files_info += f"\n{'=' * 80}\n"
-        files_info += "GEFUNDENE DATEIEN UND ORTE:\n"
-        files_info += "=" * 80 + "\n\n"
-        
-        if pkg_files:
-            total_size = 0
-            
-            # Gruppiere nach Kategorie wenn Deep Search
-            if deep and 'category' in list(pkg_files.values())[0]:
-                # Gruppiere nach Kategorie
-                categories = {}
-                for path, info in pkg_files.items():
-                    cat = info.get('category', 'Unbekannt')
-                    if cat not in categories:
-                        categories[cat] = []
-                    categories[cat].append((path, info))
-                
-                # Zeige pro Kategorie
-                for category, items in sorted(categories.items()):
-                    files_info += f"\n📍 {category}:\n"
-                    files_info += "-" * 80 + "\n"
-                    
-                    for path, info in sorted(items):
-                        size_mb = info['size'] / (1024 * 1024)
-                        total_size += info['size']
-                        
-                        icon = "📂" if info['type'] == 'directory' else "📄"
-                        files_info += f"{icon} {path}\n"
-                        files_info += f"   Größe: {size_mb:.2f} MB\n"
-                    
-                    files_info += "\n"
-            else:
-                # Normale Anzeige
-                for path, info in sorted(pkg_files.items()):
-                    size_mb = info['size'] / (1024 * 1024)
-                    total_size += info['size']
-                    
-                    files_info += f"📂 {path}\n"
-                    files_info += f"   Größe: {size_mb:.2f} MB\n"
-                    
-                    try:
-                        path_obj = Path(path)
-                        if path_obj.exists() and path_obj.is_dir():
-                            contents = list(path_obj.iterdir())[:5]
-                            if contents:
-                                files_info += "   Inhalt (Beispiel):\n"
-                                for item in contents:
-                                    files_info += f"      • {item.name}\n"
-                                if len(list(path_obj.iterdir())) > 5:
-                                    files_info += f"      ... und {len(list(path_obj.iterdir())) - 5} weitere\n"
-                    except:
-                        pass
-                    
-                    files_info += "\n"
-            
-            total_mb = total_size / (1024 * 1024)
-            files_info += "=" * 80 + "\n"
-            files_info += f"ZUSAMMENFASSUNG:\n"
-            files_info += f"  Dateien/Ordner gefunden: {len(pkg_files)}\n"
-            files_info += f"  Gesamtgröße: {total_mb:.2f} MB ({total_size / (1024*1024*1024):.2f} GB)\n"
-            
-            if deep:
-                files_info += f"\n💡 TIP: Dies sind ALLE gefundenen Spuren auf der Festplatte!\n"
-                files_info += f"    Prüfe genau was du löschen willst.\n"
+        """Lädt Analyse-Daten"""
+        pkg_name = self.package['name']
+        
+        if deep and not (self.plan and self.plan.deep):
+            # Deep search wurde angefordert aber noch nicht durchgeführt
+            return
+        elif not deep:
+            # Schnelle Suche (aus dem Cache wenn noch gültig)
+            self.plan = self.cleaner.get_cleanup_plan(self.package, exact=True)
+
+        pkg_files = self.plan.files
+        
+        # Zusammenfassung
+        summary = f"SUCHMODUS: {'🔬 GRÜNDLICH (ganze Festplatte)' if deep else '⚡ SCHNELL (normale Orte)'}   "
+        summary += f"QUELLE: {self.package['source']}   "
+        summary += f"VERSION: {self.package.get('version', 'unknown')}\n"
+        if pkg_files:
+            total_size = self.plan.total_size
+            summary += f"Dateien/Ordner gefunden: {len(pkg_files)}   "
+            summary += f"Gesamtgröße: {total_size / (1024*1024):.2f} MB ({total_size / (1024*1024*1024):.2f} GB)"
+            if getattr(pkg_files, 'collapsed', 0):
+                summary += f"\n📦 {pkg_files.collapsed} Treffer in gefundenen Ordnern zusammengefasst"
+            if getattr(pkg_files, 'overflow', None):
+                summary += f"\n⚠️  {pkg_files.overflow_text()}"
         else:
-            files_info += "ℹ️  Keine zusätzlichen Dateien gefunden.\n"
+            summary += "ℹ️  Keine zusätzlichen Dateien gefunden."
             if not deep:
-                files_info += "\n💡 TIP: Versuche die 'GRÜNDLICHE Suche' für eine vollständige Suche!\n"
+                summary += "\n💡 TIP: Versuche die 'GRÜNDLICHE Suche' für eine vollständige Suche!"
+        if self.package.get('protected', False):
+            summary += "\n⚠️  WARNUNG: SYSTEMPAKET - NICHT LÖSCHEN!"
+        self.files_summary.setText(summary)
+        
+        # Dateien-Tab: nur Gruppen anlegen, Inhalte erst beim Aufklappen
+        self.files_tree.clear()
+        self.size_worker.clear()
+        self.pending_sizes = {}
+        self.groups = self.plan.grouped()
+        
+        for group, items in sorted(self.groups.items()):
+            group_size = sum(info['size'] for _, info in items)
+            group_item = QTreeWidgetItem([f"📍 {group}", self.format_size(group_size), f"{len(items)} Einträge"])
+            group_item.setData(0, Qt.UserRole, ('group', group))
+            group_item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            self.files_tree.addTopLevelItem(group_item)
+        
+        if len(self.groups) == 1:
+            self.files_tree.topLevelItem(0).setExpanded(True)
         
-        self.files_text.setText(files_info)
+        self.report_dirty = True
+        if self.tabs.currentIndex() == self.report_tab_index:
+            self.on_tab_changed(self.report_tab_index)
         
         # Befehle-Tab
         commands_info = f"BEFEHLE ZUM LÖSCHEN VON: {pkg_name}\n"
         commands_info += "=" * 80 + "\n\n"
         
-        source = self.package['source']
-        
         commands_info += "🟢 SICHER LÖSCHEN:\n"
         commands_info += "-" * 80 + "\n"
-        
-        self.complete_cmd = ""
-        
-        if source == 'apt':
-            self.complete_cmd = f"sudo apt-get remove {pkg_name}"
-            commands_info += f"{self.complete_cmd}\n"
-        elif source == 'flatpak':
-            self.complete_cmd = f"flatpak uninstall {self.package.get('id', pkg_name)}"
-            commands_info += f"{self.complete_cmd}\n"
-        elif source == 'snap':
-            self.complete_cmd = f"sudo snap remove {pkg_name}"
-            commands_info += f"{self.complete_cmd}\n"
-        elif source == 'pip':
-            self.complete_cmd = f"pip uninstall {pkg_name}"
-            commands_info += f"{self.complete_cmd}\n"
-        elif source == 'npm':
-            self.complete_cmd = f"npm uninstall -g {pkg_name}"
-            commands_info += f"{self.complete_cmd}\n"
-        elif source == 'appimage':
-            self.complete_cmd = f"rm '{self.package.get('path', '')}'"
-            commands_info += f"{self.complete_cmd}\n"
+        commands_info += f"{self.plan.uninstall_command()}\n"
         
         commands_info += "\n🔴 GRÜNDLICH LÖSCHEN:\n"
         commands_info += "-" * 80 + "\n"
+        commands_info += f"{self.plan.uninstall_command(thorough=True)}\n"
         
-        if source == 'apt':
-            commands_info += f"sudo apt-get purge {pkg_name}\n"
-        else:
-            commands_info += f"{self.complete_cmd}\n"
-        
-        if pkg_files:
-            for path in sorted(pkg_files.keys()):
-                commands_info += f"rm -rf '{path}'\n"
+        commands_info += "\n".join(self.plan.remove_commands())
         
         self.commands_text.setText(commands_info)
     
+    @staticmethod
+    def format_size(size):
+        if size is None:
+            return "…"
+        return f"{size / (1024 * 1024):.2f} MB"
+
+    OWNERSHIP_LABELS = {
+        'owned': "gehört zum Paket",
+        'foreign': "⚠️ anderes Paket - wird nicht gelöscht",
+    }
+
+    def add_path_item(self, parent, path, label, is_dir, size, ownership=None, matches=None):
+        """Fügt einen Pfad in den Baum ein - Ordner bekommen ihre Kinder erst beim Aufklappen"""
+        icon = "📂" if is_dir else "📄"
+        kind = "Ordner" if is_dir else "Datei"
+        if matches and matches > 1:
+            kind += f", {matches} Treffer"
+        if ownership in self.OWNERSHIP_LABELS:
+            kind += f" ({self.OWNERSHIP_LABELS[ownership]})"
+        item = QTreeWidgetItem([f"{icon} {label}", self.format_size(size), kind])
+        item.setToolTip(0, path)
+        if is_dir:
+            item.setData(0, Qt.UserRole, ('dir', path))
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+            if size is None:
+                # Größe wird im Hintergrund nachgereicht
+                self.pending_sizes.setdefault(path, []).append(item)
+                self.size_worker.request(path)
+        parent.addChild(item)
+        return item
+
+    def on_item_expanded(self, item):
+        """Befüllt einen Knoten beim ersten Aufklappen"""
+        data = item.data(0, Qt.UserRole)
+        if not data or item.data(0, Qt.UserRole + 1):
+            return
+        item.setData(0, Qt.UserRole + 1, True)
+        kind, payload = data
+        
+        if kind == 'group':
+            for path, info in sorted(self.groups.get(payload, [])):
+                self.add_path_item(item, path, path, info['type'] == 'directory', info['size'],
+                                   info.get('ownership'), info.get('matches'))
+        else:
+            limit = 1000
+            entries = []
+            hidden = 0
+            try:
+                with os.scandir(payload) as it:
+                    for entry in it:
+                        if len(entries) < limit:
+                            entries.append(entry)
+                        else:
+                            hidden += 1
+            except OSError as e:
+                item.addChild(QTreeWidgetItem([f"⚠️ {e.strerror}", "", ""]))
+                return
+            
+            # Ordner zuerst, dann alphabetisch
+            entries.sort(key=lambda e: (not e.is_dir(follow_symlinks=False), e.name))
+            for entry in entries:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                size = None
+                if not is_dir:
+                    try:
+                        size = entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        size = 0
+                self.add_path_item(item, entry.path, entry.name, is_dir, size)
+            
+            if hidden:
+                item.addChild(QTreeWidgetItem([f"... und {hidden} weitere", "", ""]))
+        
+        if item.childCount() == 0:
+            item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicatorWhenChildless)
+
+    def on_size_ready(self, path, size):
+        """Trägt eine im Hintergrund berechnete Größe ein"""
+        for item in self.pending_sizes.pop(path, []):
+            item.setText(1, self.format_size(size))
+
+    def on_tab_changed(self, index):
+        """Erzeugt den Klartext-Bericht erst wenn er angesehen wird"""
+        if index == self.report_tab_index and self.report_dirty and self.plan:
+            self.report_text.setText(self.plan.format_report())
+            self.report_dirty = False
+
+    def closeEvent(self, event):
+        # Thread erst freigeben wenn er beendet ist
+        self.size_worker.stop()
+        self.size_worker.wait()
+        super().closeEvent(event)
+
     def copy_commands(self):
         """Kopiert Befehle in Zwischenablage"""
         clipboard = QApplication.clipboard()
         
-        cmd_text = self.complete_cmd + "\n"
-        pkg_files = self.cleaner.find_package_files(
-            self.package['name'],
-            package_source=self.package.get('source'),
-            package_id=self.package.get('id')
-        )
-        
-        for path in sorted(pkg_files.keys()):
-            cmd_text += f"rm -rf '{path}'\n"
+        # Gleicher Plan wie im Dialog angezeigt - keine neue Suche
+        cmd_text = self.plan.uninstall_command() + "\n"
+        for command in self.plan.remove_commands():
+            cmd_text += f"{command}\n"
         
         clipboard.setText(cmd_text)
         QMessageBox.information(self, "Kopiert", "Befehle in Zwischenablage kopiert!")
 
 
+class HistoryDialog(QWidget):
+    """Vergleich zweier gespeicherter Scans"""
+    
+    def __init__(self, cleaner, parent=None):
+        super().__init__(parent)
+        self.cleaner = cleaner
+        self.setWindowTitle("🕒 Verlauf")
+        self.setGeometry(150, 150, 800, 600)
+        
+        layout = QVBoxLayout()
+        choice = QHBoxLayout()
+        self.old_combo = QComboBox()
+        self.new_combo = QComboBox()
+        for snapshot_id, ts, count, _size in self.cleaner.history.snapshots(limit=500):
+            label = f"#{snapshot_id}  {ts}  ({count} Pakete)"
+            self.old_combo.addItem(label, snapshot_id)
+            self.new_combo.addItem(label, snapshot_id)
+        if self.old_combo.count() > 1:
+            self.old_combo.setCurrentIndex(1)
+        choice.addWidget(QLabel("Von:"))
+        choice.addWidget(self.old_combo)
+        choice.addWidget(QLabel("Bis:"))
+        choice.addWidget(self.new_combo)
+        layout.addLayout(choice)
+        
+        self.diff_text = QTextEdit()
+        self.diff_text.setReadOnly(True)
+        self.diff_text.setFont(QFont("Monospace", 10))
+        layout.addWidget(self.diff_text)
+        self.setLayout(layout)
+        
+        self.old_combo.currentIndexChanged.connect(self.show_diff)
+        self.new_combo.currentIndexChanged.connect(self.show_diff)
+        self.show_diff()
+    
+    def show_diff(self):
+        old_id = self.old_combo.currentData()
+        new_id = self.new_combo.currentData()
+        if old_id is None or new_id is None:
+            self.diff_text.setPlainText("Noch keine Scans gespeichert.")
+            return
+        diff = self.cleaner.history.diff(old_id, new_id)
+        self.diff_text.setPlainText(InventoryHistory.format_diff(diff))
+
+
+class DuplicatesDialog(QWidget):
+    """Zeigt Gruppen identischer Dateien"""
+    
+    MAX_GROUPS = 2000
+    
+    def __init__(self, groups, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("♊ Doppelte Dateien")
+        self.setGeometry(150, 150, 900, 600)
+        
+        layout = QVBoxLayout()
+        total = sum(group['reclaimable'] for group in groups)
+        summary = QLabel(f"{len(groups)} Gruppen, {AnalyzeDialog.format_size(total)} könnten frei werden")
+        summary.setFont(QFont("Arial", 11, QFont.Bold))
+        layout.addWidget(summary)
+        
+        tree = QTreeWidget()
+        tree.setHeaderLabels(['Datei', 'Größe', 'Frei werdend'])
+        tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        for group in groups[:self.MAX_GROUPS]:
+            node = QTreeWidgetItem([
+                f"{len(group['paths'])}× {os.path.basename(group['paths'][0])}",
+                AnalyzeDialog.format_size(group['size']),
+                AnalyzeDialog.format_size(group['reclaimable']),
+            ])
+            for path in group['paths']:
+                node.addChild(QTreeWidgetItem([path, AnalyzeDialog.format_size(group['size']), '']))
+            tree.addTopLevelItem(node)
+        layout.addWidget(tree)
+        self.setLayout(layout)
+
+
+class CacheReportDialog(QWidget):
+    """Zeigt große, lange unbenutzte Cache-Ordner"""
+    
+    def __init__(self, report, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("🧹 Cache-Analyse")
+        self.setGeometry(150, 150, 900, 600)
+        
+        layout = QVBoxLayout()
+        summary = QLabel(
+            f"Cache gesamt: {AnalyzeDialog.format_size(report['total'])} | "
+            f"davon lange unbenutzt: {AnalyzeDialog.format_size(report['stale_bytes'])}"
+        )
+        summary.setFont(QFont("Arial", 11, QFont.Bold))
+        layout.addWidget(summary)
+        
+        buckets = QLabel("   ".join(f"{label}: {AnalyzeDialog.format_size(size)}" for label, size in report['buckets']))
+        buckets.setWordWrap(True)
+        layout.addWidget(buckets)
+        
+        table = QTableWidget(len(report['top']), 4)
+        table.setHorizontalHeaderLabels(['Pfad', 'Größe', 'Unbenutzt seit', 'Programm'])
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        for row, entry in enumerate(report['top']):
+            table.setItem(row, 0, QTableWidgetItem(entry['path']))
+            table.setItem(row, 1, QTableWidgetItem(AnalyzeDialog.format_size(entry['size'])))
+            table.setItem(row, 2, QTableWidgetItem(f"{entry['age_days']} Tagen"))
+            table.setItem(row, 3, QTableWidgetItem(entry['package'] or '-'))
+        layout.addWidget(table)
+        self.setLayout(layout)
+
+
+class PythonEnvDialog(QWidget):
+    """Liste aller Python-Umgebungen, einzeln als Ganzes entfernbar"""
+    
+    def __init__(self, envs, cleaner, parent=None):
+        super().__init__(parent)
+        self.envs = envs
+        self.cleaner = cleaner
+        self.setWindowTitle("🐍 Python-Umgebungen")
+        self.setGeometry(150, 150, 1000, 600)
+        
+        layout = QVBoxLayout()
+        self.summary = QLabel()
+        self.summary.setFont(QFont("Arial", 11, QFont.Bold))
+        layout.addWidget(self.summary)
+        
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(['Pfad', 'Art', 'Python', 'Pakete', 'Größe', 'Zuletzt benutzt'])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+        
+        button_layout = QHBoxLayout()
+        remove_btn = QPushButton("🟡 Ausgewählte in Quarantäne")
+        remove_btn.clicked.connect(self.remove_selected)
+        button_layout.addWidget(remove_btn)
+        button_layout.addStretch()
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+        self.show_envs()
+    
+    def show_envs(self):
+        total = sum(env['size'] for env in self.envs)
+        self.summary.setText(f"{len(self.envs)} Umgebungen, zusammen {AnalyzeDialog.format_size(total)}")
+        self.table.setRowCount(len(self.envs))
+        for row, env in enumerate(self.envs):
+            last_used = datetime.fromtimestamp(env['last_used']).strftime('%Y-%m-%d') if env['last_used'] else '-'
+            values = [env['path'], env['kind'], env['interpreter'] or '?', str(env['packages']),
+                      AnalyzeDialog.format_size(env['size']), last_used]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+    
+    def remove_selected(self):
+        rows = sorted({index.row() for index in self.table.selectedIndexes()}, reverse=True)
+        if not rows:
+            return
+        
+        total = sum(self.envs[row]['size'] for row in rows)
+        reply = QMessageBox.question(
+            self, "Bestätigung",
+            f"{len(rows)} Umgebung(en) ({AnalyzeDialog.format_size(total)}) in die Quarantäne verschieben?",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        
+        errors = []
+        for row in rows:
+            result = self.cleaner.remove_python_env(self.envs[row])
+            if result['success']:
+                del self.envs[row]
+            errors.extend(result['errors'])
+        self.show_envs()
+        if errors:
+            QMessageBox.warning(self, "Fehler", "\n".join(errors[:10]))
+
+
+class ReclaimDialog(QWidget):
+    """Unbenutzte Flatpak-Runtimes/Extensions und alte Snap-Revisionen"""
+    
+    def __init__(self, report, cleaner, parent=None):
+        super().__init__(parent)
+        self.items = list(report['items'])
+        self.dependencies = report['dependencies']
+        self.cleaner = cleaner
+        self.remove_thread = None
+        self.setWindowTitle("♻️ Runtimes & Revisionen")
+        self.setGeometry(150, 150, 1000, 600)
+        
+        layout = QVBoxLayout()
+        self.summary = QLabel()
+        self.summary.setFont(QFont("Arial", 11, QFont.Bold))
+        layout.addWidget(self.summary)
+        
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(['Name', 'Art', 'Version', 'Installation', 'Größe', 'Wird frei'])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+        
+        button_layout = QHBoxLayout()
+        self.remove_btn = QPushButton("🔴 Ausgewählte entfernen")
+        self.remove_btn.clicked.connect(self.remove_selected)
+        button_layout.addWidget(self.remove_btn)
+        button_layout.addStretch()
+        layout.addLayout(button_layout)
+        
+        self.setLayout(layout)
+        self.show_items()
+    
+    def show_items(self):
+        total = sum(item['reclaimable'] for item in self.items)
+        self.summary.setText(f"{len(self.items)} unbenutzte Einträge, {AnalyzeDialog.format_size(total)} frei "
+                             f"({len(self.dependencies)} Flatpak-Apps geprüft)")
+        self.table.setRowCount(len(self.items))
+        for row, item in enumerate(self.items):
+            values = [item['name'], item['kind'], item['version'], item['scope'],
+                      AnalyzeDialog.format_size(item['size']), AnalyzeDialog.format_size(item['reclaimable'])]
+            for column, value in enumerate(values):
+                cell = QTableWidgetItem(value)
+                cell.setToolTip(item['path'])
+                self.table.setItem(row, column, cell)
+    
+    def remove_selected(self):
+        rows = sorted({index.row() for index in self.table.selectedIndexes()})
+        if not rows:
+            return
+        
+        selected = [self.items[row] for row in rows]
+        total = sum(item['reclaimable'] for item in selected)
+        reply = QMessageBox.question(
+            self, "Bestätigung",
+            f"{len(selected)} Einträge entfernen? Es werden etwa {AnalyzeDialog.format_size(total)} frei.",
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
+        
+        self.remove_btn.setEnabled(False)
+        self.summary.setText(f"Entferne {len(selected)} Einträge...")
+        self.remove_thread = ReclaimRemoveThread(self.cleaner, selected)
+        self.remove_thread.finished.connect(self.on_removed)
+        self.remove_thread.start()
+    
+    def on_removed(self, result):
+        removed = {id(item) for item in result['removed']}
+        self.items = [item for item in self.items if id(item) not in removed]
+        self.show_items()
+        self.remove_btn.setEnabled(True)
+        if result['errors']:
+            QMessageBox.warning(self, "Fehler", "\n".join(result['errors'][:10]))
+    
+    def closeEvent(self, event):
+        # flatpak/snap nicht mitten im Entfernen abreißen
+        if self.remove_thread is not None:
+            self.remove_thread.wait()
+        super().closeEvent(event)
+
+
 class AppCleanerGUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, cleaner=None):
         super().__init__()
-        self.cleaner = LinuxAppCleaner()
+        self.cleaner = cleaner or LinuxAppCleaner()
         self.packages = []
         self.filtered_packages = []
+        # Laufende Hintergrund-Threads (Referenz halten bis sie fertig sind)
+        self.background_threads = []
+        # Deinstallierte Pakete, deren Quelle noch abgeglichen werden muss
+        self.patch_queue = []
+        self.patch_running = False
         self.init_ui()
+        self.cleaner.quarantine.start_collector()
         self.refresh_packages()
     
     def init_ui(self):
-        self.setWindowTitle("Linux App Cleaner - PyQt5")
+        title = "Linux App Cleaner - PyQt5"
+        if self.cleaner.offline:
+            title += f" - Offline: {self.cleaner.system_root} (nur Analyse)"
+        self.setWindowTitle(title)
         self.setGeometry(100, 100, 1200, 800)
         
         # Central Widget
@@ -889,12 +5029,19 @@ class AppCleanerGUI(QMainWindow):
         self.source_filter.currentTextChanged.connect(self.filter_packages)
         top_layout.addWidget(self.source_filter)
         
+        top_layout.addWidget(QLabel("Sortierung:"))
+        
+        self.sort_order = QComboBox()
+        self.sort_order.addItems(['Name', 'Kandidaten (unbenutzt × Größe)'])
+        self.sort_order.currentTextChanged.connect(self.filter_packages)
+        top_layout.addWidget(self.sort_order)
+        
         layout.addLayout(top_layout)
         
         # Table
         self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(['Name', 'Version', 'Quelle', 'Status'])
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(['Name', 'Version', 'Quelle', 'Größe', 'Zuletzt benutzt', 'Status'])
         self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
         self.table.setSelectionBehavior(QTableWidget.SelectRows)
         self.table.setSelectionMode(QTableWidget.SingleSelection)
@@ -928,13 +5075,62 @@ class AppCleanerGUI(QMainWindow):
         thorough_btn.clicked.connect(lambda: self.uninstall_selected('thorough'))
         thorough_btn.setStyleSheet("background-color: #f44336; color: white; padding: 10px;")
         button_layout.addWidget(thorough_btn)
-        
+
+        quarantine_btn = QPushButton("🟡 Quarantäne Löschen")
+        quarantine_btn.clicked.connect(lambda: self.uninstall_selected('quarantine'))
+        quarantine_btn.setStyleSheet("background-color: #FFC107; color: black; padding: 10px;")
+        button_layout.addWidget(quarantine_btn)
+
+        undo_btn = QPushButton("↩️ Rückgängig")
+        undo_btn.clicked.connect(self.restore_last_quarantine)
+        button_layout.addWidget(undo_btn)
+
         export_btn = QPushButton("💾 Export Liste")
         export_btn.clicked.connect(self.export_analysis)
         button_layout.addWidget(export_btn)
         
         layout.addLayout(button_layout)
         
+        # Werkzeuge
+        tools_layout = QHBoxLayout()
+        
+        duplicates_btn = QPushButton("♊ Duplikate finden")
+        duplicates_btn.clicked.connect(self.find_duplicates)
+        tools_layout.addWidget(duplicates_btn)
+        
+        envs_btn = QPushButton("🐍 Python-Umgebungen")
+        envs_btn.clicked.connect(self.find_python_envs)
+        tools_layout.addWidget(envs_btn)
+        
+        reclaim_btn = QPushButton("♻️ Runtimes & Revisionen")
+        reclaim_btn.clicked.connect(self.find_reclaimable)
+        tools_layout.addWidget(reclaim_btn)
+        
+        cache_btn = QPushButton("🧹 Cache-Analyse")
+        cache_btn.clicked.connect(self.analyze_caches)
+        tools_layout.addWidget(cache_btn)
+        
+        history_btn = QPushButton("🕒 Verlauf")
+        history_btn.clicked.connect(self.show_history)
+        tools_layout.addWidget(history_btn)
+        
+        inventory_btn = QPushButton("📦 Inventar exportieren")
+        inventory_btn.clicked.connect(self.export_inventory)
+        tools_layout.addWidget(inventory_btn)
+        
+        trace_btn = QPushButton("⏱️ Trace speichern")
+        trace_btn.clicked.connect(self.export_trace)
+        tools_layout.addWidget(trace_btn)
+        
+        self.polite_check = QCheckBox("🐢 Schonend")
+        self.polite_check.setToolTip("Niedrige Priorität und begrenzte Dateizugriffe - bremst bei hoher Systemlast")
+        self.polite_check.setChecked(self.cleaner.polite_stats() is not None)
+        self.polite_check.toggled.connect(self.cleaner.set_polite)
+        tools_layout.addWidget(self.polite_check)
+        
+        tools_layout.addStretch()
+        layout.addLayout(tools_layout)
+        
         # Status Bar
         self.status_label = QLabel("Bereit")
         layout.addWidget(self.status_label)
@@ -944,6 +5140,7 @@ class AppCleanerGUI(QMainWindow):
     def refresh_packages(self):
         """Lädt alle Pakete neu"""
         self.status_label.setText("Lade Programme...")
+        self.cleaner.tracer.reset()
         
         # Progress Dialog
         progress = QProgressDialog("Scanne installierte Programme...", None, 0, 0, self)
@@ -959,11 +5156,33 @@ class AppCleanerGUI(QMainWindow):
     def on_packages_loaded(self, packages, progress):
         """Wird aufgerufen wenn Pakete geladen wurden"""
         self.packages = packages
-        self.filtered_packages = packages
-        self.display_packages()
+        self.filter_packages()
         progress.close()
-        self.status_label.setText(f"{len(packages)} Programme gefunden")
+        
+        # Ein älterer Lauf darf weiterlaufen, sein Ergebnis wird verworfen
+        self.start_background(UsageThread(self.cleaner, packages), self.on_usage_estimated)
+        
+        # Wo ist die Zeit geblieben? Langsamste Quellen anzeigen
+        scan = self.cleaner.tracer.summary(category='scan', top=1)
+        timing = ""
+        if scan:
+            timing = f"  ⏱️ Scan {scan[0]['seconds']:.2f}s ({self.cleaner.tracer.format_summary(category='collect')})"
+        polite = self.cleaner.polite_stats()
+        if polite:
+            timing += f"  🐢 {polite['throttled_seconds']:.1f}s gebremst"
+        self.status_label.setText(f"{len(packages)} Programme gefunden{timing}")
+        
+        try:
+            if not self.cleaner.offline:
+                self.cleaner.history.record(packages)
+        except sqlite3.Error as e:
+            self.cleaner.log(f"Verlauf nicht gespeichert: {e}")
     
+    def on_usage_estimated(self, packages):
+        """Zuletzt-benutzt-Werte sind da - Tabelle neu aufbauen"""
+        if packages is self.packages:
+            self.filter_packages()
+
     def filter_packages(self):
         """Filtert Paketliste"""
         search_term = self.search_box.text().lower()
@@ -971,14 +5190,18 @@ class AppCleanerGUI(QMainWindow):
         
         self.filtered_packages = []
         for pkg in self.packages:
-            if source_filter != 'Alle' and pkg['source'] != source_filter:
+            if source_filter != 'Alle' and pkg.source != source_filter:
                 continue
             
-            if search_term and search_term not in pkg['name'].lower():
+            if search_term and search_term not in pkg.search_name:
                 continue
             
             self.filtered_packages.append(pkg)
         
+        if self.sort_order.currentIndex() == 1:
+            now = time.time()
+            self.filtered_packages.sort(key=lambda pkg: LinuxAppCleaner.removal_score(pkg, now), reverse=True)
+        
         self.display_packages()
     
     def display_packages(self):
@@ -988,21 +5211,80 @@ class AppCleanerGUI(QMainWindow):
         for pkg in self.filtered_packages:
             row = self.table.rowCount()
             self.table.insertRow(row)
-            
-            self.table.setItem(row, 0, QTableWidgetItem(pkg['name']))
-            self.table.setItem(row, 1, QTableWidgetItem(pkg.get('version', 'unknown')))
-            self.table.setItem(row, 2, QTableWidgetItem(pkg['source']))
-            
-            status = "🔒 GESCHÜTZT" if pkg.get('protected', False) else "✓"
-            status_item = QTableWidgetItem(status)
-            
-            if pkg.get('protected', False):
-                status_item.setBackground(QColor(255, 200, 200))
-            
-            self.table.setItem(row, 3, status_item)
+            self.set_package_row(row, pkg)
+        
+        self.status_label.setText(f"{len(self.filtered_packages)} Programme gefunden")
+    
+    def set_package_row(self, row, pkg):
+        """Füllt eine Tabellenzeile"""
+        self.table.setItem(row, 0, QTableWidgetItem(pkg.name))
+        self.table.setItem(row, 1, QTableWidgetItem(pkg.version or 'unknown'))
+        self.table.setItem(row, 2, QTableWidgetItem(pkg.source))
+        self.table.setItem(row, 3, QTableWidgetItem(
+            AnalyzeDialog.format_size(pkg.size) if pkg.size is not None else ''))
+        self.table.setItem(row, 4, QTableWidgetItem(self.format_last_used(pkg.last_used)))
+        
+        status = "🔒 GESCHÜTZT" if pkg.protected else "✓"
+        status_item = QTableWidgetItem(status)
+        
+        if pkg.protected:
+            status_item.setBackground(QColor(255, 200, 200))
         
+        self.table.setItem(row, 5, status_item)
+    
+    def package_row(self, pkg):
+        """Tabellenzeile eines Pakets oder None, wenn es gerade ausgefiltert ist"""
+        return next((row for row, shown in enumerate(self.filtered_packages) if shown is pkg), None)
+    
+    def apply_inventory_changes(self, changes):
+        """Nur die geänderten Zeilen anfassen statt die Tabelle neu aufzubauen"""
+        LinuxAppCleaner.apply_inventory_changes(self.packages, changes)
+        for pkg in changes['removed']:
+            row = self.package_row(pkg)
+            if row is not None:
+                self.table.removeRow(row)
+                del self.filtered_packages[row]
+        for pkg, _fresh in changes['updated']:
+            row = self.package_row(pkg)
+            if row is not None:
+                self.set_package_row(row, pkg)
+        if changes['added']:
+            self.filter_packages()
         self.status_label.setText(f"{len(self.filtered_packages)} Programme gefunden")
     
+    def start_background(self, thread, slot):
+        """Startet einen Thread; die Referenz bleibt bis zum Ende erhalten"""
+        self.background_threads = [t for t in self.background_threads if not t.isFinished()]
+        self.background_threads.append(thread)
+        thread.finished.connect(slot)
+        thread.start()
+    
+    def start_next_patch(self):
+        """Abgleiche nacheinander - jeder sieht das Ergebnis des vorigen"""
+        if self.patch_running or not self.patch_queue:
+            return
+        self.patch_running = True
+        pkg = self.patch_queue.pop(0)
+        self.start_background(InventoryPatchThread(self.cleaner, list(self.packages), pkg),
+                              self.on_inventory_patched)
+    
+    def on_inventory_patched(self, changes):
+        self.patch_running = False
+        self.apply_inventory_changes(changes)
+        try:
+            if not self.cleaner.offline:
+                self.cleaner.history.record(self.packages)
+        except sqlite3.Error as e:
+            self.cleaner.log(f"Verlauf nicht gespeichert: {e}")
+        self.start_next_patch()
+    
+    @staticmethod
+    def format_last_used(timestamp):
+        if timestamp is None:
+            return ''
+        days = int((time.time() - timestamp) // 86400)
+        return "heute" if days <= 0 else f"vor {days} Tagen"
+    
     def on_selection_changed(self):
         """Wird aufgerufen wenn Auswahl geändert wird"""
         selected = self.table.selectedItems()
@@ -1015,6 +5297,8 @@ class AppCleanerGUI(QMainWindow):
                     info = f"Programm: {pkg['name']}\n"
                     info += f"Version: {pkg.get('version', 'unknown')}\n"
                     info += f"Quelle: {pkg['source']}\n"
+                    if pkg.get('last_used'):
+                        info += f"Zuletzt benutzt: {datetime.fromtimestamp(pkg['last_used']).strftime('%Y-%m-%d')}\n"
                     
                     if pkg.get('protected', False):
                         info += "\n⚠️ WARNUNG: Dies ist ein SYSTEMPAKET!\n"
@@ -1067,7 +5351,8 @@ class AppCleanerGUI(QMainWindow):
             return
         
         # Bestätigung
-        mode_text = "SICHER" if mode == 'safe' else "GRÜNDLICH"
+        plan = None
+        mode_text = {'safe': "SICHER", 'thorough': "GRÜNDLICH", 'quarantine': "QUARANTÄNE"}[mode]
         
         if mode == 'safe':
             msg = f"🟢 SICHER LÖSCHEN\n\n"
@@ -1079,15 +5364,14 @@ class AppCleanerGUI(QMainWindow):
             msg += "• Config-Dateien\n"
             msg += "• Cache und Daten\n"
         else:
-            files = self.cleaner.find_package_files(
-                pkg['name'],
-                package_source=pkg.get('source'),
-                package_id=pkg.get('id')
-            )
-            total_size = sum(info['size'] for info in files.values())
-            size_mb = total_size / (1024 * 1024)
+            plan = self.cleaner.get_cleanup_plan(pkg)
+            files = plan.files
+            size_mb = plan.total_size / (1024 * 1024)
             
-            msg = f"🔴 GRÜNDLICH LÖSCHEN\n\n"
+            if mode == 'quarantine':
+                msg = f"🟡 QUARANTÄNE LÖSCHEN\n\n"
+            else:
+                msg = f"🔴 GRÜNDLICH LÖSCHEN\n\n"
             msg += f"Programm: {pkg['name']}\n"
             msg += f"Quelle: {pkg['source']}\n\n"
             msg += "Was wird gelöscht:\n"
@@ -1097,6 +5381,10 @@ class AppCleanerGUI(QMainWindow):
             msg += "• Alle Programm-Daten\n\n"
             msg += f"Dateien: {len(files)}\n"
             msg += f"Größe: {size_mb:.2f} MB\n"
+
+            if mode == 'quarantine':
+                msg += "\n💡 Daten werden nur verschoben und können mit\n"
+                msg += "   '↩️ Rückgängig' wiederhergestellt werden.\n"
         
         msg += "\nMöchtest du fortfahren?"
         
@@ -1114,7 +5402,7 @@ class AppCleanerGUI(QMainWindow):
         self.status_label.setText(f"Deinstalliere {pkg['name']}...")
         QApplication.processEvents()
         
-        results = self.cleaner.uninstall_package(pkg, mode)
+        results = self.cleaner.uninstall_package(pkg, mode, plan=plan)
         
         # Ergebnis
         if results['success']:
@@ -1123,7 +5411,9 @@ class AppCleanerGUI(QMainWindow):
             if results['removed_program']:
                 msg += "✓ Programm entfernt\n"
             
-            if results['removed_files']:
+            if results['removed_files'] and results['quarantine_id']:
+                msg += f"✓ {len(results['removed_files'])} Dateien in Quarantäne verschoben\n"
+            elif results['removed_files']:
                 msg += f"✓ {len(results['removed_files'])} Dateien gelöscht\n"
             
             if results['errors']:
@@ -1131,8 +5421,12 @@ class AppCleanerGUI(QMainWindow):
                 for error in results['errors']:
                     msg += f"  • {error}\n"
             
+            # Zeile sofort entfernen, die Quelle wird im Hintergrund nachgeprüft
+            if self.cleaner.is_installed(pkg) is False:
+                self.apply_inventory_changes({'removed': [pkg], 'added': [], 'updated': []})
+            self.patch_queue.append(pkg)
+            self.start_next_patch()
             QMessageBox.information(self, "Erfolg", msg)
-            self.refresh_packages()
         else:
             msg = f"❌ Fehler beim Deinstallieren von {pkg['name']}\n\n"
             for error in results['errors']:
@@ -1141,7 +5435,137 @@ class AppCleanerGUI(QMainWindow):
             QMessageBox.critical(self, "Fehler", msg)
         
         self.status_label.setText("Bereit")
+
+    def restore_last_quarantine(self):
+        """Stellt die letzte Quarantäne-Deinstallation wieder her"""
+        transactions = self.cleaner.quarantine.list_transactions()
+        if not transactions:
+            QMessageBox.information(self, "Info", "Keine Daten in Quarantäne!")
+            return
+
+        last = transactions[0]
+        total_size = sum(e.get('size', 0) for e in last['entries'])
+        reply = QMessageBox.question(
+            self,
+            "Rückgängig",
+            f"↩️ Daten von {last['package']} wiederherstellen?\n\n"
+            f"Quelle: {last['source']}\n"
+            f"Einträge: {len(last['entries'])}\n"
+            f"Größe: {total_size / (1024 * 1024):.2f} MB\n\n"
+            "Hinweis: Das Programm selbst muss neu installiert werden.",
+            QMessageBox.Yes | QMessageBox.No
+        )
+
+        if reply != QMessageBox.Yes:
+            return
+
+        with self.cleaner.audit.transaction('restore', package=last['package'], transaction=last['id']):
+            results = self.cleaner.quarantine.restore(last['id'])
+            for path in results['restored']:
+                self.cleaner.audit.record('restore', package=last['package'], path=path)
+
+        msg = f"✓ {len(results['restored'])} Einträge wiederhergestellt\n"
+        if results['errors']:
+            msg += "\n⚠️ Warnungen:\n"
+            for error in results['errors']:
+                msg += f"  • {error}\n"
+        QMessageBox.information(self, "Rückgängig", msg)
+
+    def find_duplicates(self):
+        """Sucht doppelte Dateien in Cache-, Daten- und Download-Ordnern"""
+        progress = QProgressDialog("Suche doppelte Dateien...", None, 0, 0, self)
+        progress.setWindowTitle("Duplikate")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.show()
+        
+        self.duplicate_thread = DuplicateThread(self.cleaner)
+        self.duplicate_thread.progress.connect(progress.setLabelText)
+        self.duplicate_thread.finished.connect(lambda groups: self.on_duplicates_found(groups, progress))
+        self.duplicate_thread.start()
+    
+    def on_duplicates_found(self, groups, progress):
+        progress.close()
+        self.duplicates_dialog = DuplicatesDialog(groups)
+        self.duplicates_dialog.show()
+
+    def find_python_envs(self):
+        """Sucht alle virtuellen Python- und conda-Umgebungen"""
+        self.status_label.setText("Suche Python-Umgebungen...")
+        self.env_thread = PythonEnvThread(self.cleaner)
+        self.env_thread.finished.connect(self.on_python_envs_found)
+        self.env_thread.start()
+    
+    def on_python_envs_found(self, envs):
+        self.status_label.setText("Bereit")
+        self.env_dialog = PythonEnvDialog(envs, self.cleaner)
+        self.env_dialog.show()
+
+    def find_reclaimable(self):
+        """Sucht unbenutzte Flatpak-Runtimes und alte Snap-Revisionen"""
+        self.status_label.setText("Prüfe Runtimes und Snap-Revisionen...")
+        self.reclaim_thread = ReclaimThread(self.cleaner)
+        self.reclaim_thread.finished.connect(self.on_reclaimable_found)
+        self.reclaim_thread.start()
+    
+    def on_reclaimable_found(self, report):
+        self.status_label.setText("Bereit")
+        self.reclaim_dialog = ReclaimDialog(report, self.cleaner)
+        self.reclaim_dialog.show()
+
+    def analyze_caches(self):
+        """Sucht große, lange unbenutzte Cache-Ordner"""
+        self.status_label.setText("Analysiere Caches...")
+        self.cache_thread = CacheAnalysisThread(self.cleaner, list(self.packages))
+        self.cache_thread.finished.connect(self.on_cache_report)
+        self.cache_thread.start()
     
+    def on_cache_report(self, report):
+        self.status_label.setText("Bereit")
+        self.cache_dialog = CacheReportDialog(report)
+        self.cache_dialog.show()
+
+    def show_history(self):
+        """Zeigt Unterschiede zwischen gespeicherten Scans"""
+        self.history_dialog = HistoryDialog(self.cleaner)
+        self.history_dialog.show()
+
+    def export_inventory(self):
+        """Exportiert alle Pakete maschinenlesbar"""
+        if not self.packages:
+            QMessageBox.information(self, "Info", "Noch keine Pakete geladen!")
+            return
+        
+        filename, _ = QFileDialog.getSaveFileName(
+            self,
+            "Inventar exportieren",
+            str(self.cleaner.home / "app_cleaner_inventar.ndjson"),
+            "JSON Lines (*.ndjson *.jsonl);;CSV (*.csv);;SQLite (*.sqlite *.db)"
+        )
+        
+        if not filename:
+            return
+        
+        self.status_label.setText("Exportiere Inventar...")
+        QApplication.processEvents()
+        count = InventoryExporter(self.cleaner).export(self.packages, filename)
+        self.status_label.setText("Bereit")
+        QMessageBox.information(self, "Export", f"{count} Pakete exportiert nach:\n{filename}")
+
+    def export_trace(self):
+        """Speichert die Zeitmessung für chrome://tracing bzw. Perfetto"""
+        filename, _ = QFileDialog.getSaveFileName(
+            self,
+            "Trace speichern",
+            str(self.cleaner.home / "app_cleaner_trace.json"),
+            "Trace Files (*.json)"
+        )
+        
+        if not filename:
+            return
+        
+        self.cleaner.tracer.export_chrome(filename)
+        QMessageBox.information(self, "Trace", f"Trace gespeichert nach:\n{filename}\n\nÖffnen mit ui.perfetto.dev")
+
     def export_analysis(self):
         """Exportiert Analyse"""
         pkg = self.get_selected_package()
@@ -1159,11 +5583,8 @@ class AppCleanerGUI(QMainWindow):
         if not filename:
             return
         
-        pkg_files = self.cleaner.find_package_files(
-            pkg['name'],
-            package_source=pkg.get('source'),
-            package_id=pkg.get('id')
-        )
+        plan = self.cleaner.get_cleanup_plan(pkg)
+        pkg_files = plan.files
         
         with open(filename, 'w') as f:
             f.write(f"LINUX APP CLEANER - EXPORT\n")
@@ -1187,33 +5608,281 @@ class AppCleanerGUI(QMainWindow):
                 f.write(f"\nGesamtgröße: {total_mb:.2f} MB\n")
             
             f.write("\nLösch-Befehle:\n")
-            source = pkg['source']
-            if source == 'apt':
-                f.write(f"  sudo apt-get purge -y {pkg['name']}\n")
-            elif source == 'flatpak':
-                f.write(f"  flatpak uninstall -y {pkg.get('id', pkg['name'])}\n")
-            elif source == 'snap':
-                f.write(f"  sudo snap remove {pkg['name']}\n")
-            elif source == 'pip':
-                f.write(f"  pip uninstall -y {pkg['name']}\n")
-            elif source == 'npm':
-                f.write(f"  npm uninstall -g {pkg['name']}\n")
+            f.write(f"  {plan.uninstall_command(thorough=True, assume_yes=True)}\n")
             
             if pkg_files:
                 f.write("\nDateien löschen:\n")
-                for path in sorted(pkg_files.keys()):
-                    f.write(f"  rm -rf '{path}'\n")
+                for command in plan.remove_commands():
+                    f.write(f"  {command}\n")
         
         QMessageBox.information(self, "Export", f"Analyse exportiert nach:\n{filename}")
 
 
+def scan_roots(roots, user=None, max_workers=4):
+    """
+    Inventar mehrerer fremder Wurzelverzeichnisse (Images, chroots) parallel.
+    Gibt {root: (cleaner, packages)} zurück; Fehler landen als Exception-Text
+    statt der Paketliste.
+    """
+    def scan(root):
+        try:
+            cleaner = LinuxAppCleaner(system_root=root, user=user, offline=True)
+            return root, (cleaner, cleaner.get_all_packages())
+        except ValueError as e:
+            return root, (None, str(e))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(executor.map(scan, roots))
+
+
+def run_batch(args):
+    """Mehrere Wurzelverzeichnisse: Übersicht und ggf. ein Export pro Image"""
+    fmt = args.format or 'ndjson'
+    if args.export_inventory:
+        os.makedirs(args.export_inventory, exist_ok=True)
+    
+    for root, (cleaner, packages) in scan_roots(args.root, user=args.user).items():
+        if cleaner is None:
+            print(f"{root}: {packages}")
+            continue
+        counts = {}
+        for pkg in packages:
+            counts[pkg.source] = counts.get(pkg.source, 0) + 1
+        print(f"{root}: {len(packages)} Programme  "
+              + "  ".join(f"{source} {count}" for source, count in sorted(counts.items())))
+        if args.export_inventory:
+            name = Path(root).resolve().name or 'root'
+            target = os.path.join(args.export_inventory, f"{name}.{fmt}")
+            InventoryExporter(cleaner).export(packages, target, fmt=fmt)
+            print(f"  exportiert nach {target}")
+
+
+def run_headless(args):
+    """Kommandozeilen-Modus ohne GUI"""
+    if args.root and len(args.root) > 1:
+        run_batch(args)
+        return
+    
+    if args.root:
+        cleaner = LinuxAppCleaner(system_root=args.root[0], user=args.user, offline=True)
+    else:
+        cleaner = LinuxAppCleaner()
+    # Bei Export nach stdout gehören Meldungen nach stderr
+    out = sys.stderr if args.export_inventory == '-' else sys.stdout
+    
+    packages = cleaner.get_all_packages() if (args.scan or args.export_inventory or args.cache_report or args.candidates) else []
+    
+    if args.export_inventory:
+        count = InventoryExporter(cleaner).export(
+            packages, args.export_inventory, fmt=args.format, scan_residue=args.with_residue)
+        print(f"{count} Pakete exportiert nach {args.export_inventory}", file=out)
+    
+    if args.scan:
+        if not cleaner.offline:
+            cleaner.history.record(packages)
+        counts = {}
+        for pkg in packages:
+            counts[pkg['source']] = counts.get(pkg['source'], 0) + 1
+        print(f"{len(packages)} Programme gefunden")
+        for source, count in sorted(counts.items()):
+            print(f"  {source:<10} {count}")
+    
+    if args.candidates:
+        cleaner.estimate_usage(packages)
+        now = time.time()
+        ranked = sorted(packages, key=lambda pkg: LinuxAppCleaner.removal_score(pkg, now), reverse=True)
+        print(f"\nBeste Aufräum-Kandidaten (unbenutzte Tage × Größe):")
+        for pkg in ranked[:args.candidates]:
+            if pkg.last_used is None:
+                break
+            days = (now - pkg.last_used) / 86400
+            print(f"  {(pkg.size or 0) / (1024*1024):10.1f} MB  {days:6.0f} Tage  {pkg.source:<8} {pkg.name}")
+    
+    if args.history:
+        for snapshot_id, ts, count, total_size in cleaner.history.snapshots(limit=50):
+            print(f"  #{snapshot_id:<5} {ts}  {count:6} Pakete  {(total_size or 0) / (1024*1024):10.1f} MB")
+    
+    if args.diff is not None:
+        ids = args.diff or [row[0] for row in cleaner.history.snapshots(limit=2)]
+        if len(ids) != 2:
+            print("Zum Vergleich werden zwei Scans benötigt")
+        else:
+            print(f"Scan #{min(ids)} → #{max(ids)}")
+            print(InventoryHistory.format_diff(cleaner.history.diff(*ids)))
+    
+    if args.python_envs is not None:
+        roots = [(Path(path).expanduser(), 6) for path in args.python_envs] or None
+        envs = cleaner.find_python_envs(roots)
+        total = sum(env['size'] for env in envs)
+        print(f"{len(envs)} Python-Umgebungen, zusammen {total / (1024*1024):.1f} MB")
+        for env in envs:
+            last_used = datetime.fromtimestamp(env['last_used']).strftime('%Y-%m-%d') if env['last_used'] else '-'
+            print(f"  {env['size'] / (1024*1024):10.1f} MB  {env['kind']:<7} {env['interpreter'] or '?':<8} "
+                  f"{env['packages']:5} Pakete  {last_used}  {env['path']}")
+    
+    if args.reclaim:
+        report = cleaner.find_reclaimable()
+        print(f"{len(report['items'])} unbenutzte Runtimes/Revisionen, "
+              f"{report['reclaimable'] / (1024*1024):.1f} MB frei ({len(report['dependencies'])} Flatpak-Apps geprüft)")
+        for item in report['items']:
+            print(f"  {item['reclaimable'] / (1024*1024):10.1f} MB  {item['kind']:<13} {item['scope']:<6} "
+                  f"{item['name']} {item['version']}")
+    
+    if args.cache_report:
+        report = cleaner.analyze_caches(stale_days=args.stale_days, top=args.top, packages=packages)
+        print(f"Cache gesamt {report['total'] / (1024*1024):.1f} MB, "
+              f"davon seit > {args.stale_days} Tagen unbenutzt {report['stale_bytes'] / (1024*1024):.1f} MB")
+        for label, size in report['buckets']:
+            print(f"  {label:<20} {size / (1024*1024):10.1f} MB")
+        print()
+        for entry in report['top']:
+            print(f"  {entry['size'] / (1024*1024):10.1f} MB  {entry['age_days']:5} Tage  "
+                  f"{entry['package'] or '-':<20} {entry['path']}")
+    
+    if args.duplicates:
+        groups = cleaner.find_duplicates(min_size=args.min_size)
+        total = sum(group['reclaimable'] for group in groups)
+        print(f"{len(groups)} Gruppen doppelter Dateien, {total / (1024*1024):.2f} MB könnten frei werden")
+        for group in groups[:50]:
+            print(f"  {group['reclaimable'] / (1024*1024):8.2f} MB  {len(group['paths'])}× {group['size']} Bytes")
+            for path in group['paths']:
+                print(f"      {path}")
+    
+    if args.owner or args.files_of:
+        cleaner.dpkg_index.refresh()
+    if args.owner:
+        owners = cleaner.dpkg_index.who_owns(args.owner)
+        print(f"{args.owner}: {', '.join(owners) if owners else 'keinem Paket zugeordnet'}")
+    if args.files_of:
+        for path in cleaner.dpkg_index.paths_of(args.files_of):
+            print(path)
+    
+    if args.all_users:
+        report = cleaner.scan_all_users(args.all_users, max_entries=args.max_results)
+        print(f"{report['total_files']} Funde für {args.all_users} "
+              f"({report['total_size'] / (1024*1024):.2f} MB) bei {len(report['users'])} Benutzern")
+        sections = [('System', report['system'])]
+        sections.extend((f"{name} ({entry['home']})", entry['files']) for name, entry in sorted(report['users'].items()))
+        for title, files in sections:
+            size = sum(info['size'] for info in files.values())
+            print(f"\n{title}: {len(files)} Funde, {size / (1024*1024):.2f} MB")
+            if files.overflow:
+                print(f"  {files.overflow_text()}")
+            for path in sorted(files):
+                print(f"  {path}")
+    
+    if args.deep_search:
+        files = cleaner.deep_search_files(args.deep_search, max_entries=args.max_results)
+        total_size = sum(info['size'] for info in files.values())
+        print(f"{len(files)} Dateien/Ordner für {args.deep_search} ({total_size / (1024*1024):.2f} MB)")
+        if files.collapsed:
+            print(f"{files.collapsed} Treffer in gefundenen Ordnern zusammengefasst")
+        if files.overflow:
+            print(files.overflow_text())
+        for path in sorted(files):
+            ownership = files[path].get('ownership')
+            print(f"  {path}" + (f"  [{ownership}]" if ownership and ownership != 'unowned' else ""))
+    
+    print("\nZeitverteilung:", file=out)
+    for entry in cleaner.tracer.summary(top=10):
+        details = ""
+        if entry.get('entries'):
+            details += f"  {entry['entries']} Einträge"
+        if entry.get('bytes'):
+            details += f"  {entry['bytes'] / (1024*1024):.1f} MB"
+        if entry.get('subprocess_time'):
+            details += f"  Subprozess {entry['subprocess_time']:.2f}s"
+        print(f"  {entry['name']:<30} {entry['seconds']:8.3f}s  x{entry['count']}{details}", file=out)
+    
+    polite = cleaner.polite_stats()
+    if polite:
+        print(f"\nSchonender Modus: {polite['throttled_seconds']:.2f}s gebremst "
+              f"({polite['waits']} Pausen, {polite['ops']} Zugriffe)", file=out)
+    
+    if args.trace:
+        cleaner.tracer.export_chrome(args.trace)
+        print(f"\nTrace gespeichert: {args.trace}", file=out)
+
+
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Linux App Cleaner")
+    parser.add_argument('--scan', action='store_true', help="Pakete ohne GUI scannen")
+    parser.add_argument('--deep-search', metavar='NAME', help="Gründliche Suche ohne GUI")
+    parser.add_argument('--max-results', type=int, metavar='N',
+                        help=f"Höchstens N Einträge bei --deep-search und --all-users (Standard: {SearchResults.MAX_ENTRIES})")
+    parser.add_argument('--trace', metavar='DATEI', help="Zeitmessung als Chrome-Trace speichern")
+    parser.add_argument('--export-inventory', metavar='DATEI',
+                        help="Komplettes Inventar exportieren (.ndjson/.csv/.sqlite, '-' = stdout)")
+    parser.add_argument('--format', choices=['ndjson', 'csv', 'sqlite'], help="Export-Format (sonst nach Endung)")
+    parser.add_argument('--with-residue', action='store_true', help="Beim Export Überreste pro Paket suchen")
+    parser.add_argument('--candidates', type=int, metavar='N',
+                        help="Die N Pakete, die am längsten unbenutzt und am größten sind")
+    parser.add_argument('--history', action='store_true', help="Gespeicherte Scans auflisten")
+    parser.add_argument('--duplicates', action='store_true', help="Doppelte Dateien in Cache/Daten/Downloads suchen")
+    parser.add_argument('--python-envs', nargs='*', metavar='ORDNER',
+                        help="Virtuelle Python-/conda-Umgebungen auflisten (optional nur unter ORDNER)")
+    parser.add_argument('--reclaim', action='store_true',
+                        help="Unbenutzte Flatpak-Runtimes und alte Snap-Revisionen anzeigen")
+    parser.add_argument('--cache-report', action='store_true', help="Große, lange unbenutzte Cache-Ordner anzeigen")
+    parser.add_argument('--stale-days', type=int, default=90, metavar='TAGE',
+                        help="Ab wann ein Cache-Ordner als unbenutzt gilt")
+    parser.add_argument('--top', type=int, default=20, help="Anzahl der angezeigten Cache-Ordner")
+    parser.add_argument('--min-size', type=int, default=4096, metavar='BYTES',
+                        help="Kleinere Dateien bei der Duplikat-Suche ignorieren")
+    parser.add_argument('--diff', nargs='*', type=int, metavar='ID',
+                        help="Zwei Scans vergleichen (ohne IDs: die letzten beiden)")
+    parser.add_argument('--owner', metavar='PFAD', help="Welches dpkg-Paket hat diesen Pfad installiert?")
+    parser.add_argument('--files-of', metavar='PAKET', help="Alle von einem dpkg-Paket installierten Pfade")
+    parser.add_argument('--all-users', metavar='NAME',
+                        help="Überreste eines Programms in den Homes aller Benutzer suchen")
+    parser.add_argument('--polite', action='store_true',
+                        help="Schonender Modus: niedrige Priorität, begrenzte Dateizugriffe, bremst bei Last")
+    parser.add_argument('--polite-rate', type=int, default=5000, metavar='N',
+                        help="Maximale Verzeichnis-/stat-Zugriffe pro Sekunde im schonenden Modus")
+    parser.add_argument('--root', action='append', metavar='ORDNER',
+                        help="Fremdes System offline untersuchen (Image, chroot, Container); mehrfach = parallel")
+    parser.add_argument('--user', help="Benutzer im fremden System (Home laut dessen etc/passwd)")
+    defaults = LinuxAppCleaner.appimage_depths
+    parser.add_argument('--appimage-depth', action='append', metavar='ORT=N',
+                        help="Suchtiefe für AppImages (Orte: " +
+                             ", ".join(f"{place}={depth}" for place, depth in defaults.items()) +
+                             "; nur N gilt für alle)")
+    args, qt_args = parser.parse_known_args()
+    
+    if args.appimage_depth:
+        depths = dict(defaults)
+        for option in args.appimage_depth:
+            place, sep, depth = option.rpartition('=')
+            if not depth.isdigit() or (sep and place not in depths):
+                parser.error(f"Ungültige --appimage-depth: {option}")
+            for key in ([place] if sep else depths):
+                depths[key] = int(depth)
+        LinuxAppCleaner.appimage_depths = depths
+    
+    if args.polite:
+        set_io_throttle(IOThrottle(rate=args.polite_rate))
+    
+    headless = [
+        args.scan, args.deep_search, args.all_users, args.owner, args.files_of, args.export_inventory, args.history, args.duplicates,
+        args.cache_report, args.reclaim, args.candidates, args.diff is not None, args.python_envs is not None,
+    ]
+    batch_actions = [args.scan, args.export_inventory]
+    if args.root and len(args.root) > 1 and (not any(batch_actions) or sum(map(bool, headless)) > sum(map(bool, batch_actions))):
+        # Mehrere Wurzeln gibt es nur als Übersicht/Export (run_batch), nie stillschweigend die erste
+        parser.error("Mehrere --root nur mit --scan oder --export-inventory")
+    if any(headless):
+        run_headless(args)
+        return
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     
     # Dark Mode Support
     app.setStyle('Fusion')
     
-    window = AppCleanerGUI()
+    cleaner = None
+    if args.root:
+        cleaner = LinuxAppCleaner(system_root=args.root[0], user=args.user, offline=True)
+    window = AppCleanerGUI(cleaner)
     window.show()
     
     sys.exit(app.exec_())
@@ -0,0 +1,44 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import linux_app_cleaner  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def host_home(tmp_path, monkeypatch):
+    """Eigene Daten (Protokoll, Caches, Quarantäne) nie im echten Home ablegen"""
+    home = tmp_path / 'host'
+    home.mkdir()
+    monkeypatch.setenv('HOME', str(home))
+    return home
+
+
+@pytest.fixture
+def image(tmp_path):
+    """Leeres Wurzelverzeichnis für den Offline-Modus"""
+    root = tmp_path / 'image'
+    (root / 'root').mkdir(parents=True)
+    return root
+
+
+def add_flatpak(root, app_id, size=1000):
+    """Legt eine installierte Flatpak-App (aktiver Deploy-Ordner) an"""
+    app_dir = root / 'var' / 'lib' / 'flatpak' / 'app' / app_id
+    deploy = app_dir / 'x86_64' / 'stable' / 'abc'
+    (deploy / 'files').mkdir(parents=True)
+    (deploy / 'metadata').write_text('[Application]\n')
+    (deploy / 'files' / 'bin').write_bytes(b'\0' * size)
+    os.symlink('abc', app_dir / 'x86_64' / 'stable' / 'active')
+    os.symlink('x86_64/stable', app_dir / 'current')
+    return app_dir
+
+
+@pytest.fixture
+def offline_cleaner(image):
+    return linux_app_cleaner.LinuxAppCleaner(system_root=image, offline=True)
@@ -0,0 +1,42 @@
+import json
+import os
+
+from linux_app_cleaner import AuditLog
+
+
+def entries(log):
+    return list(log.query())
+
+
+def test_record_writes_size_as_bytes(tmp_path):
+    log = AuditLog(tmp_path / 'log.jsonl')
+    log.record('delete', package='foo', path='/tmp/x', size=123)
+    log.sync()
+    assert [(entry['action'], entry['bytes']) for entry in entries(log)] == [('delete', 123)]
+
+
+def test_rotation_keeps_max_files_and_query_reads_them(tmp_path):
+    log = AuditLog(tmp_path / 'log.jsonl', max_bytes=300, max_files=3)
+    for i in range(60):
+        log.record('step', package=f'pkg{i:02}', note='x' * 60)
+        log.sync()
+
+    rotated = log.rotated_files()
+    assert [path.name for path in rotated] == ['log.jsonl.3', 'log.jsonl.2', 'log.jsonl.1']
+    assert not (tmp_path / 'log.jsonl.4').exists()
+    packages = [entry['package'] for entry in entries(log)]
+    # Älteste zuerst, lückenlos bis zum neuesten Eintrag
+    assert packages == sorted(packages) and packages[-1] == 'pkg59'
+    assert len(packages) == len(set(packages))
+
+
+def test_old_rotations_are_pruned_without_size_rotation(tmp_path):
+    path = tmp_path / 'log.jsonl'
+    for index in (1, 2):
+        (tmp_path / f'log.jsonl.{index}').write_text(json.dumps({'ts': '2000', 'action': 'old'}) + '\n')
+    os.utime(tmp_path / 'log.jsonl.2', (1, 1))
+
+    log = AuditLog(path, max_bytes=10 ** 6, max_age_days=1)
+    with log.transaction('check'):
+        pass
+    assert [p.name for p in log.rotated_files()] == ['log.jsonl.1']
@@ -0,0 +1,33 @@
+import os
+import time
+
+from linux_app_cleaner import CacheAnalyzer, LinuxAppCleaner, PackageRecord
+
+
+def test_attribute_path_matches_whole_name_parts(tmp_path):
+    cleaner = LinuxAppCleaner(home=tmp_path / 'home')
+    packages = [PackageRecord(name, version='1', source='apt')
+                for name in ('gimp', 'pipewire', 'google-chrome-stable', 'golang-go')]
+    cache = cleaner.home / '.cache'
+
+    assert cleaner.attribute_path(str(cache / 'gi' / 'x'), packages) is None
+    assert cleaner.attribute_path(str(cache / 'pip'), packages) is None
+    assert cleaner.attribute_path(str(cache / 'gimp'), packages) == 'gimp'
+    assert cleaner.attribute_path(str(cache / 'google-chrome'), packages) == 'google-chrome-stable'
+    assert cleaner.attribute_path(str(cache / 'go'), packages) == 'golang-go'
+
+
+def test_stale_children_are_capped_per_directory(tmp_path):
+    old = time.time() - 400 * 86400
+    root = tmp_path / 'cache'
+    for i in range(30):
+        child = root / 'fresh-parent' / f'old{i:02}'
+        child.mkdir(parents=True)
+        (child / 'blob').write_bytes(b'\0' * (i + 1))
+        os.utime(child / 'blob', (old, old))
+    (root / 'fresh-parent' / 'new').write_bytes(b'\0')
+
+    report = CacheAnalyzer(stale_days=90, top=5).analyze([root])
+    assert [entry['path'].rsplit('/', 1)[-1] for entry in report['top']] == \
+        ['old29', 'old28', 'old27', 'old26', 'old25']
+    assert report['stale_bytes'] == sum(range(1, 31))
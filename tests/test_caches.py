@@ -0,0 +1,53 @@
+import json
+import threading
+
+import linux_app_cleaner
+from linux_app_cleaner import LinuxAppCleaner, scan_roots
+
+
+def add_appimage(home, name):
+    folder = home / 'Applications'
+    folder.mkdir(parents=True, exist_ok=True)
+    (folder / name).write_bytes(b'\x7fELF\x02\x01\x01\x00AI\x02' + b'\0' * 2048)
+
+
+def make_image(tmp_path, name, appimage):
+    root = tmp_path / name
+    add_appimage(root / 'root', appimage)
+    return root
+
+
+def test_offline_scan_leaves_host_cache_alone(tmp_path, host_home):
+    add_appimage(host_home, 'Host.AppImage')
+    host = LinuxAppCleaner()
+    assert [pkg.name for pkg in host.get_appimages()] == ['Host']
+    host_cache = json.loads(host.appimages.cache_file.read_text())
+
+    image = LinuxAppCleaner(system_root=make_image(tmp_path, 'img', 'Image.AppImage'), offline=True)
+    assert [pkg.name for pkg in image.get_appimages()] == ['Image']
+
+    assert image.appimages.cache_file != host.appimages.cache_file
+    assert image.desktop_index.cache_file != host.desktop_index.cache_file
+    assert json.loads(host.appimages.cache_file.read_text()) == host_cache
+
+
+def test_scan_roots_keeps_separate_caches(tmp_path, host_home):
+    roots = [make_image(tmp_path, f'img{i}', f'App{i}.AppImage') for i in range(4)]
+    results = scan_roots(roots)
+    for i, root in enumerate(roots):
+        cleaner, packages = results[root]
+        assert [pkg.name for pkg in packages if pkg.source == 'appimage'] == [f'App{i}']
+        assert cleaner.appimages.cache_file.exists()
+    assert not list(host_home.rglob('*.tmp'))
+
+
+def test_write_json_is_safe_for_concurrent_writers(tmp_path):
+    target = tmp_path / 'state' / 'cache.json'
+    threads = [threading.Thread(target=linux_app_cleaner._write_json, args=(target, {'writer': i}))
+               for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert json.loads(target.read_text())['writer'] in range(16)
+    assert [path.name for path in target.parent.iterdir()] == ['cache.json']
@@ -0,0 +1,39 @@
+import os
+
+from linux_app_cleaner import CleanupPlan, LinuxAppCleaner, PackageRecord
+
+
+def test_plan_expires_after_ttl_and_on_root_change(tmp_path):
+    root = tmp_path / 'root'
+    root.mkdir()
+    os.utime(root, (1_000_000, 1_000_000))
+    plan = CleanupPlan(PackageRecord('fooapp', source='apt'), {}, False,
+                       {str(root): root.stat().st_mtime_ns})
+    assert plan.is_valid(300)
+
+    plan.created -= 301
+    assert not plan.is_valid(300)
+
+    plan.created += 301
+    os.utime(root, (2_000_000, 2_000_000))
+    assert not plan.is_valid(300)
+
+
+def test_cleaner_reuses_plan_until_search_root_changes(tmp_path):
+    cleaner = LinuxAppCleaner(home=tmp_path / 'home')
+    config = cleaner.home / '.config'
+    (config / 'fooapp').mkdir(parents=True)
+    (config / 'fooapp' / 'settings.ini').write_text('x=1\n')
+    os.utime(config, (1_000_000, 1_000_000))
+    package = PackageRecord('fooapp', version='1', source='apt')
+
+    plan = cleaner.get_cleanup_plan(package)
+    assert str(config / 'fooapp') in plan.files
+    assert cleaner.get_cleanup_plan(package) is plan
+
+    # Neuer Ordner neben dem alten ändert die mtime der Such-Wurzel
+    (config / 'FooApp').mkdir()
+    os.utime(config, (2_000_000, 2_000_000))
+    fresh = cleaner.get_cleanup_plan(package)
+    assert fresh is not plan
+    assert cleaner.get_cleanup_plan(package) is fresh
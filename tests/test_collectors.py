@@ -0,0 +1,20 @@
+import json
+
+from linux_app_cleaner import LinuxAppCleaner
+
+
+def test_pip_list_keeps_editable_and_url_installs():
+    output = json.dumps([
+        {'name': 'requests', 'version': '2.31.0'},
+        {'name': 'mytool', 'version': '0.1.dev0', 'editable_project_location': '/src/mytool'},
+        {'name': 'vendored', 'version': '1.2'},
+        {'version': '9'},
+    ])
+    packages = LinuxAppCleaner.parse_pip_list(output)
+    assert [(pkg.name, pkg.version, pkg.source) for pkg in packages] == [
+        ('requests', '2.31.0', 'pip'), ('mytool', '0.1.dev0', 'pip'), ('vendored', '1.2', 'pip')]
+
+
+def test_pip_list_tolerates_broken_output():
+    assert LinuxAppCleaner.parse_pip_list('') == []
+    assert LinuxAppCleaner.parse_pip_list('WARNING: pip is old') == []
@@ -0,0 +1,32 @@
+import os
+
+from linux_app_cleaner import DesktopEntryIndex
+
+
+def test_symlinked_icon_dirs_are_not_followed(tmp_path):
+    icons = tmp_path / 'icons'
+    theme = icons / 'hicolor' / '48x48' / 'apps'
+    theme.mkdir(parents=True)
+    (theme / 'fooapp.png').write_bytes(b'png')
+    # Schleife und zweiter Weg in denselben Baum
+    os.symlink('..', icons / 'hicolor' / 'loop')
+    os.symlink('hicolor', icons / 'default')
+
+    index = DesktopEntryIndex(tmp_path / 'cache.json')
+    index.refresh([(icons, 'icon')])
+    assert index.lookup(['fooapp'])['icon'] == [str(theme / 'fooapp.png')]
+
+
+def test_shared_theme_icon_is_kept(tmp_path):
+    apps = tmp_path / 'apps'
+    apps.mkdir()
+    (apps / 'foo.desktop').write_text('[Desktop Entry]\nExec=foo\nIcon=utilities-terminal\n')
+    (apps / 'bar.desktop').write_text('[Desktop Entry]\nExec=bar\nIcon=utilities-terminal\n')
+    icons = tmp_path / 'icons'
+    icons.mkdir()
+    (icons / 'utilities-terminal.png').write_bytes(b'png')
+
+    index = DesktopEntryIndex(tmp_path / 'cache.json')
+    index.refresh([(apps, 'launcher'), (icons, 'icon')])
+    assert index.lookup(['foo'])['icon'] == []
+    assert index.lookup(['foo', 'bar'])['icon'] == [str(icons / 'utilities-terminal.png')]
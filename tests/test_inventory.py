@@ -0,0 +1,46 @@
+import shutil
+
+from linux_app_cleaner import LinuxAppCleaner, PackageRecord
+
+from conftest import add_flatpak
+
+
+def test_patch_removes_only_uninstalled_flatpak_and_keeps_sizes(image, offline_cleaner):
+    for app_id in ('org.a.App', 'org.b.App', 'org.c.App'):
+        add_flatpak(image, app_id)
+    packages = offline_cleaner.get_all_packages()
+    offline_cleaner.estimate_sizes(packages)
+    sizes = {pkg.id: pkg.size for pkg in packages}
+    assert all(sizes.values())
+
+    removed = next(pkg for pkg in packages if pkg.id == 'org.b.App')
+    shutil.rmtree(image / 'var' / 'lib' / 'flatpak' / 'app' / 'org.b.App')
+    changes = offline_cleaner.patch_inventory(packages, removed)
+
+    assert changes['removed'] == [removed]
+    assert changes['added'] == [] and changes['updated'] == []
+    LinuxAppCleaner.apply_inventory_changes(packages, changes)
+    assert {pkg.id: pkg.size for pkg in packages} == {'org.a.App': sizes['org.a.App'],
+                                                      'org.c.App': sizes['org.c.App']}
+
+
+def test_apply_inventory_changes_keeps_known_size_and_last_used():
+    old = PackageRecord('tool', version='1.0', source='pip', size=500, last_used=123.0)
+    same = PackageRecord('other', version='2.0', source='pip', size=42)
+    packages = [old, same]
+    fresh = PackageRecord('tool', version='1.1', source='pip')
+    added = PackageRecord('new', version='0.1', source='pip')
+
+    LinuxAppCleaner.apply_inventory_changes(
+        packages, {'removed': [same], 'added': [added], 'updated': [(old, fresh)]})
+
+    assert packages == [old, added]
+    assert (old.version, old.size, old.last_used) == ('1.1', 500, 123.0)
+
+
+def test_patch_reports_version_change(offline_cleaner):
+    old = PackageRecord('tool', version='1.0', source='apt', size=500)
+    offline_cleaner.get_collectors = lambda: [
+        ('apt', lambda progress=None: [PackageRecord('tool', version='2.0', source='apt', size=700)], None)]
+    changes = offline_cleaner.patch_inventory([old], old)
+    assert [(prev.version, new.version) for prev, new in changes['updated']] == [('1.0', '2.0')]
@@ -0,0 +1,49 @@
+from linux_app_cleaner import PackageRecord, Quarantine
+
+
+def make_residue(home):
+    config = home / '.config' / 'fooapp'
+    config.mkdir(parents=True)
+    (config / 'settings.ini').write_text('x=1\n')
+    state = home / '.fooapp'
+    state.write_text('1')
+    return {str(config): {'type': 'directory', 'size': 4, 'category': 'config'},
+            str(state): {'type': 'file', 'size': 1, 'category': 'config'}}
+
+
+def test_move_and_restore_roundtrip(tmp_path):
+    home = tmp_path / 'home'
+    files = make_residue(home)
+    quarantine = Quarantine(home)
+
+    tid, moved, errors = quarantine.move_to_quarantine(PackageRecord('fooapp', source='apt'), files)
+    assert sorted(moved) == sorted(files) and not errors
+    assert not any((home / name).exists() for name in ('.config/fooapp', '.fooapp'))
+    assert [m['id'] for m in quarantine.list_transactions()] == [tid]
+
+    results = quarantine.restore(tid)
+    assert sorted(results['restored']) == sorted(files) and not results['errors']
+    assert (home / '.config' / 'fooapp' / 'settings.ini').read_text() == 'x=1\n'
+    assert (home / '.fooapp').read_text() == '1'
+    assert quarantine.list_transactions() == []
+
+
+def test_restore_keeps_entries_that_would_overwrite(tmp_path):
+    home = tmp_path / 'home'
+    files = make_residue(home)
+    quarantine = Quarantine(home)
+    tid, _, _ = quarantine.move_to_quarantine(PackageRecord('fooapp', source='apt'), files)
+
+    # Programm wurde inzwischen neu gestartet und hat die Datei neu angelegt
+    (home / '.fooapp').write_text('neu')
+    results = quarantine.restore(tid)
+    assert results['restored'] == [str(home / '.config' / 'fooapp')]
+    assert len(results['errors']) == 1
+    assert (home / '.fooapp').read_text() == 'neu'
+
+    [manifest] = quarantine.list_transactions()
+    assert [entry['original'] for entry in manifest['entries']] == [str(home / '.fooapp')]
+    (home / '.fooapp').unlink()
+    assert quarantine.restore(tid)['restored'] == [str(home / '.fooapp')]
+    assert (home / '.fooapp').read_text() == '1'
+    assert quarantine.list_transactions() == []
@@ -0,0 +1,46 @@
+from linux_app_cleaner import LinuxAppCleaner, SearchResults
+
+
+def make_image(tmp_path):
+    root = tmp_path / 'image'
+    (root / 'etc').mkdir(parents=True)
+    (root / 'etc' / 'passwd').write_text('alice:x:1000:1000::/home/alice:/bin/bash\n')
+    home = root / 'home' / 'alice'
+    for folder in ('.config/fooapp', '.cache/FooApp/blobs', '.local/share/fooapp-data', '.local/share/applications'):
+        (home / folder).mkdir(parents=True)
+    (home / '.config' / 'fooapp' / 'settings.ini').write_text('x=1\n')
+    (home / '.cache' / 'FooApp' / 'blobs' / 'a').write_bytes(b'\0' * 100)
+    (home / '.local' / 'share' / 'fooapp-data' / 'db').write_bytes(b'\0' * 10)
+    (home / '.local' / 'share' / 'applications' / 'fooapp.desktop').write_text(
+        '[Desktop Entry]\nExec=fooapp\nIcon=utilities-terminal\n')
+    (home / '.fooapp').mkdir()
+    (home / '.fooapp' / 'state').write_text('1')
+    (root / 'etc' / 'fooapp.conf').write_text('a=b\n')
+    (root / 'usr' / 'share' / 'applications').mkdir(parents=True)
+    (root / 'usr' / 'share' / 'applications' / 'term.desktop').write_text(
+        '[Desktop Entry]\nExec=term\nIcon=utilities-terminal\n')
+    icons = root / 'usr' / 'share' / 'icons'
+    icons.mkdir(parents=True)
+    (icons / 'utilities-terminal.png').write_bytes(b'png')
+    return root
+
+
+def test_single_user_and_all_users_search_agree(tmp_path):
+    cleaner = LinuxAppCleaner(system_root=make_image(tmp_path), user='alice', offline=True)
+    single = cleaner.deep_search_files('fooapp')
+    report = cleaner.scan_all_users('fooapp')
+
+    combined = dict(report['system'])
+    combined.update(report['users']['alice']['files'])
+    assert isinstance(report['users']['alice']['files'], SearchResults)
+    assert sorted(combined) == sorted(single)
+    assert {path.rsplit('/', 1)[-1] for path in single} == {
+        'fooapp', 'FooApp', 'fooapp-data', '.fooapp', 'fooapp.desktop', 'fooapp.conf'}
+    # Geteiltes Theme-Icon gehört nicht zum Paket, dpkg-Zuordnung in beiden Modi
+    assert all(info.get('ownership') for info in combined.values())
+
+
+def test_search_results_cap_applies_to_all_users(tmp_path):
+    cleaner = LinuxAppCleaner(system_root=make_image(tmp_path), user='alice', offline=True)
+    files = cleaner.scan_all_users('fooapp', max_entries=2)['users']['alice']['files']
+    assert len(files) == 2 and files.overflow
@@ -0,0 +1,27 @@
+import os
+
+from linux_app_cleaner import LinuxAppCleaner, PackageRecord
+
+
+def make_image(tmp_path, name, mtime):
+    root = tmp_path / name
+    data = root / 'root' / '.var' / 'app' / 'org.a.App'
+    data.mkdir(parents=True)
+    os.utime(data, (mtime, mtime))
+    return root
+
+
+def test_usage_cache_is_per_root(tmp_path):
+    first = LinuxAppCleaner(system_root=make_image(tmp_path, 'one', 1_000_000), offline=True)
+    second = LinuxAppCleaner(system_root=make_image(tmp_path, 'two', 2_000_000), offline=True)
+    assert first.usage.cache_file != second.usage.cache_file
+
+    for cleaner, expected in ((first, 1_000_000), (second, 2_000_000), (first, 1_000_000)):
+        pkg = PackageRecord('App', id='org.a.App', version='1', source='flatpak')
+        cleaner.estimate_usage([pkg])
+        assert pkg.last_used == expected
+
+
+def test_live_system_keeps_state_dir_cache():
+    cleaner = LinuxAppCleaner()
+    assert cleaner.cache_dir == cleaner.state_dir